@@ -1,11 +1,29 @@
-from flask import Flask, jsonify, request
+import hashlib
+import time
+
+# El arranque se mide desde aquí: importaciones (incluidas las tablas del
+# evaluador) y precarga
+INICIO_ARRANQUE = time.perf_counter()
+
+from flask import (
+    Blueprint, Flask, Response, current_app, g, has_request_context, jsonify, request, stream_with_context,
+)
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
 # ==========================
 # IMPORTAR UTILIDADES
 # ==========================
-from utils.generator import generar_dataset
-from utils.analyzer import analizar_mano_fases
+from utils.acumulados import acumulados, registrar_manos
+from utils.analyzer import analizar_mano_fases, analizar_mano_fases_progresivo
+from utils.cache import cache_respuestas, estadisticas_cache
+from utils.lotes import analizar_lote, cancelar_lote, cerrar_lote, iterar_peticiones, registrar_lote
+from utils.indices import FILTROS
+from utils.metricas import PERFILES_HABILITADOS, PerfilMuestreado, arranque, cronometrar, exportar, peticiones
+from utils.precarga import precargar
+from utils.process import firma_dataset
+from utils.serializacion import a_json, codificacion_pedida, comprimir, formato_pedido, serializar
+from utils.trabajos import cancelar_trabajo, encolar_generacion, estado_trabajo, listar_trabajos
 from utils.stats import (
     estadisticas_generales,
     winrate_por_posicion,
@@ -15,21 +33,84 @@ from utils.stats import (
     riesgo_winrate,
     bote_agresividad,
     timeline_profit,
+    equity_realizacion,
+    dashboard,
+    PUNTOS_TIMELINE,
 )
 
 # ==========================
 # CONFIGURACIÓN FLASK
 # ==========================
-app = Flask(__name__)
+# Las rutas se registran en la aplicación que arma crear_app()
+api = Blueprint("api", __name__)
+
+
+# ==========================
+# MÉTRICAS Y PERFILADO
+# ==========================
+class ProveedorJSON(DefaultJSONProvider):
+    # JSON con orjson (arrays de NumPy sin pasar por listas) o MessagePack si
+    # el cliente lo pide en Accept; se mide cuánto se va en serializar
+    def dumps(self, obj, **kwargs):
+        with cronometrar("serializacion_json"):
+            return a_json(obj, self.sort_keys).decode()
+
+    def response(self, *args, **kwargs):
+        datos = self._prepare_response_obj(args, kwargs)
+        formato = formato_pedido(request.accept_mimetypes) if has_request_context() else "json"
+        with cronometrar(f"serializacion_{formato}"):
+            cuerpo, mimetype = serializar(datos, formato, self.sort_keys)
+        response = self._app.response_class(cuerpo, mimetype=mimetype)
+        response.vary.add("Accept")
+        return response
+
+
+@api.before_app_request
+def iniciar_medicion():
+    g.inicio = time.perf_counter()
+    if PERFILES_HABILITADOS and request.args.get("perfil") == "1":
+        g.perfil = PerfilMuestreado().iniciar()
+
+
+def _comprimir(response):
+    # gzip / brotli según Accept-Encoding, salvo streaming o si la ruta ya lo hizo
+    if response.is_streamed or response.direct_passthrough or "Content-Encoding" in response.headers:
+        return
+    codificacion = codificacion_pedida(request.accept_encodings)
+    cuerpo = response.get_data()
+    comprimido = comprimir(cuerpo, codificacion)
+    if comprimido is not cuerpo:
+        response.set_data(comprimido)
+        response.headers["Content-Encoding"] = codificacion
+    response.vary.add("Accept-Encoding")
+
+
+@api.after_app_request
+def registrar_medicion(response):
+    perfil = g.pop("perfil", None)
+    if perfil is not None:
+        datos = perfil.detener()
+        if response.is_json and not response.is_streamed:
+            response.set_data(current_app.json.dumps({"respuesta": response.get_json(), "perfil": datos}))
+    _comprimir(response)
+
+    # En las respuestas en streaming (NDJSON, SSE) se mide hasta el envío de cabeceras
+    ruta = request.url_rule.rule if request.url_rule is not None else "sin_ruta"
+    peticiones.observar(time.perf_counter() - g.inicio, ruta=ruta, metodo=request.method, estado=response.status_code)
+    return response
+
 
-# CORS completamente abierto
-CORS(app, resources={r"/*": {"origins": "*"}})
+@api.route("/api/metrics", methods=["GET"])
+def api_metrics():
+    response = Response(exportar(), mimetype="text/plain; version=0.0.4")
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    return response
 
 
 # ==========================
 # HOME
 # ==========================
-@app.route("/")
+@api.route("/")
 def home():
     return jsonify({"mensaje": "Servidor Flask funcionando correctamente."})
 
@@ -37,37 +118,201 @@ def home():
 # ==========================
 # DATASET
 # ==========================
-@app.route("/api/generar", methods=["POST"])
+@api.route("/api/generar", methods=["POST"])
 def generar():
     data = request.get_json() or {}
     num_manos = data.get("num_manos", 5000)
 
-    generar_dataset(num_manos=num_manos)
+    # Se encola: la respuesta llega al instante y el progreso se consulta aparte
+    try:
+        trabajo = encolar_generacion(num_manos=num_manos, seed=data.get("seed"))
+    except (TypeError, ValueError) as e:
+        response = jsonify({"error": f"Petición inválida: {e}"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response, 400
 
-    response = jsonify({"mensaje": "Dataset generado", "num_manos": num_manos})
+    response = jsonify({"mensaje": "Generación en cola", "num_manos": trabajo["num_manos"], "trabajo": trabajo})
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    return response, 202
+
+
+# ==========================
+# TRABAJOS EN SEGUNDO PLANO
+# ==========================
+@api.route("/api/trabajos", methods=["GET"])
+def api_trabajos():
+    response = jsonify(listar_trabajos())
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    return response
+
+
+@api.route("/api/trabajos/<trabajo_id>", methods=["GET"])
+def api_trabajo(trabajo_id):
+    trabajo = estado_trabajo(trabajo_id)
+    if trabajo is None:
+        response = jsonify({"error": "Trabajo no encontrado"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response, 404
+
+    response = jsonify(trabajo)
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    return response
+
+
+@api.route("/api/trabajos/<trabajo_id>/cancelar", methods=["POST", "OPTIONS"])
+def api_cancelar_trabajo(trabajo_id):
+    # --- Responder preflight CORS ---
+    if request.method == "OPTIONS":
+        response = jsonify({"status": "ok"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "POST, OPTIONS")
+        return response, 200
+
+    trabajo = cancelar_trabajo(trabajo_id)
+    if trabajo is None:
+        response = jsonify({"error": "Trabajo no encontrado"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response, 404
+
+    response = jsonify(trabajo)
     response.headers.add("Access-Control-Allow-Origin", "*")
     return response
 
 
 # ==========================
-# ESTADÍSTICAS
+# ANEXAR MANOS (RESULTADOS EN VIVO)
 # ==========================
-@app.route("/api/estadisticas", methods=["GET"])
-def stats():
-    data = estadisticas_generales()
+@api.route("/api/manos", methods=["POST", "OPTIONS"])
+def anexar():
+    # --- Responder preflight CORS ---
+    if request.method == "OPTIONS":
+        response = jsonify({"status": "ok"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "POST, OPTIONS")
+        return response, 200
+
+    body = request.get_json() or {}
+    manos = body.get("manos", [body]) if isinstance(body, dict) else body
+    try:
+        if not isinstance(manos, list) or not all(isinstance(m, dict) for m in manos):
+            raise ValueError("Se espera una mano o {'manos': [...]}")
+        result = registrar_manos(manos)
+    except (KeyError, ValueError) as e:
+        response = jsonify({"error": f"Petición inválida: {e}"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response, 400
+
+    response = jsonify(result)
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    return response
 
-    response = jsonify(data)
+
+@api.route("/api/acumulados", methods=["GET"])
+def api_acumulados():
+    response = jsonify(acumulados())
     response.headers.add("Access-Control-Allow-Origin", "*")
     return response
 
 
+# ==========================
+# FILTROS (?posicion=BTN&categoria_min=Full&bote_min=500...)
+# ==========================
+def _filtros():
+    """Filtros de la query; un campo acepta varios valores repetidos o separados por coma."""
+    return {
+        campo: [v for arg in request.args.getlist(campo) for v in arg.split(",") if v]
+        for campo in FILTROS
+        if campo in request.args
+    }
+
+
+# Firma del dataset de las respuestas guardadas en cache_respuestas
+_firma_respuestas = None
+
+
+def _clave_respuesta():
+    """
+    (clave, etag) de la respuesta pedida: la misma versión del dataset con la
+    misma ruta y query da siempre el mismo cuerpo. Cada representación
+    (JSON o MessagePack, comprimida o no) tiene su propia clave y su ETag.
+    None si no hay dataset o si se está perfilando (hay que calcular de verdad).
+    """
+    global _firma_respuestas
+    firma = firma_dataset() if "perfil" not in g else None
+    if firma is None:
+        return None, None
+    if firma != _firma_respuestas:
+        # Cambió el dataset: lo guardado ya no sirve
+        cache_respuestas.limpiar()
+        _firma_respuestas = firma
+
+    consulta = tuple(sorted((k, v) for k, v in request.args.items(multi=True) if k != "perfil"))
+    variante = (formato_pedido(request.accept_mimetypes), codificacion_pedida(request.accept_encodings))
+    clave = (firma, request.path, consulta, variante)
+    return clave, hashlib.blake2b(repr(clave).encode(), digest_size=16).hexdigest()
+
+
+def _con_etag(response, etag):
+    response.set_etag(etag)
+    # El navegador guarda la respuesta pero la revalida siempre (If-None-Match)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.update(("Accept", "Accept-Encoding"))
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    return response
+
+
+def _responder_filtrado(calculo):
+    clave, etag = _clave_respuesta()
+    if etag is not None:
+        if request.if_none_match.contains_weak(etag):
+            return _con_etag(Response(status=304), etag)
+        guardada = cache_respuestas.obtener(clave)
+        if guardada is not None:
+            cuerpo, mimetype, codificacion = guardada
+            response = Response(cuerpo, mimetype=mimetype)
+            if codificacion is not None:
+                response.headers["Content-Encoding"] = codificacion
+            return _con_etag(response, etag)
+
+    try:
+        datos = calculo(_filtros())
+    except ValueError as e:
+        response = jsonify({"error": f"Petición inválida: {e}"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response, 400
+
+    response = jsonify(datos)
+    if etag is None:
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response
+    # Se guarda ya comprimida: los aciertos no vuelven a serializar ni a comprimir
+    _comprimir(response)
+    cache_respuestas.guardar(clave, (response.get_data(), response.mimetype, response.headers.get("Content-Encoding")))
+    return _con_etag(response, etag)
+
+
+# ==========================
+# ESTADÍSTICAS
+# ==========================
+@api.route("/api/estadisticas", methods=["GET"])
+def stats():
+    return _responder_filtrado(estadisticas_generales)
+
+
 # ==========================
 # ANALIZADOR — *PREVIO* (tu versión antigua)
 # ==========================
-@app.route("/api/analizar", methods=["POST"])
+@api.route("/api/analizar", methods=["POST"])
 def analizar():
     req = request.get_json()
-    result = analizar_mano_fases(req)
+    try:
+        result = analizar_mano_fases(req)
+    except (KeyError, ValueError) as e:
+        response = jsonify({"error": f"Petición inválida: {e}"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response, 400
 
     response = jsonify(result)
     response.headers.add("Access-Control-Allow-Origin", "*")
@@ -77,7 +322,7 @@ def analizar():
 # ==========================
 # ANALIZAR FASE POR FASE — NUEVO
 # ==========================
-@app.route("/api/analizar-fases", methods=["POST", "OPTIONS"])
+@api.route("/api/analizar-fases", methods=["POST", "OPTIONS"])
 def analizar_fases():
     # --- Responder preflight CORS ---
     if request.method == "OPTIONS":
@@ -89,7 +334,12 @@ def analizar_fases():
 
     # --- Procesar POST normal ---
     req = request.get_json()
-    result = analizar_mano_fases(req)
+    try:
+        result = analizar_mano_fases(req)
+    except (KeyError, ValueError) as e:
+        response = jsonify({"error": f"Petición inválida: {e}"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response, 400
 
     response = jsonify(result)
     response.headers.add("Access-Control-Allow-Origin", "*")
@@ -97,59 +347,214 @@ def analizar_fases():
 
 
 # ==========================
-# GRÁFICOS
+# ANALIZAR FASE POR FASE — STREAMING (SSE)
 # ==========================
-@app.route("/api/charts/winrate-posicion", methods=["GET"])
-def api_winrate_posicion():
-    response = jsonify(winrate_por_posicion())
+def _evento_sse(tipo, datos):
+    return f"event: {tipo}\ndata: {current_app.json.dumps(datos)}\n\n"
+
+
+def _peticion_stream():
+    # POST: el mismo cuerpo JSON que /api/analizar-fases. GET (para
+    # EventSource): los mismos campos en la query, las cartas separadas por coma.
+    if request.method == "POST":
+        return request.get_json() or {}
+    req = request.args.to_dict()
+    for campo in ("cartas_usuario", "cartas_comunitarias"):
+        if campo in req:
+            req[campo] = [c for c in req[campo].split(",") if c]
+    return req
+
+
+@api.route("/api/analizar-fases/stream", methods=["GET", "POST", "OPTIONS"])
+def analizar_fases_stream():
+    # --- Responder preflight CORS ---
+    if request.method == "OPTIONS":
+        response = jsonify({"status": "ok"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        return response, 200
+
+    try:
+        eventos = analizar_mano_fases_progresivo(_peticion_stream())
+    except (KeyError, ValueError, TypeError) as e:
+        response = jsonify({"error": f"Petición inválida: {e}"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response, 400
+
+    def generar():
+        try:
+            for evento in eventos:
+                # Entre bloques de simulación va un comentario SSE: si el
+                # cliente se desconectó la escritura falla, el servidor cierra
+                # este generador y la simulación se corta ahí.
+                yield ":\n\n" if evento is None else _evento_sse(*evento)
+        except ValueError as e:
+            yield _evento_sse("error", {"error": f"Petición inválida: {e}"})
+        finally:
+            eventos.close()
+
+    response = Response(stream_with_context(generar()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Sin buffer en proxies como nginx: cada evento sale al momento
+    response.headers["X-Accel-Buffering"] = "no"
     response.headers.add("Access-Control-Allow-Origin", "*")
     return response
 
 
-@app.route("/api/charts/histograma-botes", methods=["GET"])
-def api_histograma_botes():
-    response = jsonify(histograma_botes())
+# ==========================
+# ANALIZAR LOTE DE MANOS (NDJSON)
+# ==========================
+@api.route("/api/analizar-lote", methods=["POST", "OPTIONS"])
+def analizar_lote_api():
+    # --- Responder preflight CORS ---
+    if request.method == "OPTIONS":
+        response = jsonify({"status": "ok"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "POST, OPTIONS")
+        return response, 200
+
+    body = request.get_json() or {}
+    try:
+        peticiones = iterar_peticiones(body)
+    except ValueError as e:
+        response = jsonify({"error": f"Petición inválida: {e}"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response, 400
+
+    lote_id, cancelado = registrar_lote()
+
+    def generar():
+        try:
+            yield from analizar_lote(peticiones, cancelado)
+        finally:
+            cerrar_lote(lote_id)
+
+    response = Response(generar(), mimetype="application/x-ndjson")
     response.headers.add("Access-Control-Allow-Origin", "*")
+    response.headers.add("Access-Control-Expose-Headers", "X-Lote-Id")
+    response.headers["X-Lote-Id"] = lote_id
     return response
 
 
-@app.route("/api/charts/agresividad-profit", methods=["GET"])
-def api_agresividad_profit():
-    response = jsonify(agresividad_profit())
+@api.route("/api/analizar-lote/<lote_id>/cancelar", methods=["POST"])
+def cancelar_lote_api(lote_id):
+    if not cancelar_lote(lote_id):
+        response = jsonify({"error": "Lote no encontrado o ya terminado"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response, 404
+
+    response = jsonify({"mensaje": "Lote cancelado", "lote_id": lote_id})
     response.headers.add("Access-Control-Allow-Origin", "*")
     return response
 
 
-@app.route("/api/charts/frecuencia-categorias", methods=["GET"])
-def api_frecuencia_categorias():
-    response = jsonify(frecuencia_categorias())
+# ==========================
+# CACHÉ DE EQUITY / OUTS
+# ==========================
+@api.route("/api/cache", methods=["GET"])
+def cache_stats():
+    response = jsonify(estadisticas_cache())
     response.headers.add("Access-Control-Allow-Origin", "*")
     return response
 
 
-@app.route("/api/charts/riesgo-winrate", methods=["GET"])
+# ==========================
+# DASHBOARD COMPLETO (UNA SOLA PASADA)
+# ==========================
+@api.route("/api/dashboard", methods=["GET"])
+def api_dashboard():
+    return _responder_filtrado(dashboard)
+
+
+# ==========================
+# GRÁFICOS
+# ==========================
+@api.route("/api/charts/winrate-posicion", methods=["GET"])
+def api_winrate_posicion():
+    return _responder_filtrado(winrate_por_posicion)
+
+
+@api.route("/api/charts/histograma-botes", methods=["GET"])
+def api_histograma_botes():
+    return _responder_filtrado(histograma_botes)
+
+
+@api.route("/api/charts/agresividad-profit", methods=["GET"])
+def api_agresividad_profit():
+    return _responder_filtrado(agresividad_profit)
+
+
+@api.route("/api/charts/frecuencia-categorias", methods=["GET"])
+def api_frecuencia_categorias():
+    return _responder_filtrado(frecuencia_categorias)
+
+
+@api.route("/api/charts/riesgo-winrate", methods=["GET"])
 def api_riesgo_winrate():
-    response = jsonify(riesgo_winrate())
-    response.headers.add("Access-Control-Allow-Origin", "*")
-    return response
+    return _responder_filtrado(riesgo_winrate)
 
 
-@app.route("/api/charts/bote-agresividad", methods=["GET"])
+@api.route("/api/charts/bote-agresividad", methods=["GET"])
 def api_bote_agresividad():
-    response = jsonify(bote_agresividad())
-    response.headers.add("Access-Control-Allow-Origin", "*")
-    return response
+    return _responder_filtrado(bote_agresividad)
 
 
-@app.route("/api/charts/timeline-profit", methods=["GET"])
+@api.route("/api/charts/timeline-profit", methods=["GET"])
 def api_timeline_profit():
-    response = jsonify(timeline_profit())
-    response.headers.add("Access-Control-Allow-Origin", "*")
-    return response
+    # ?puntos=N (0 = todos), ?desde=&hasta= para acotar a un rango de mano_id
+    puntos = request.args.get("puntos", PUNTOS_TIMELINE, type=int)
+    return _responder_filtrado(lambda filtros: timeline_profit(
+        puntos=puntos or None,
+        desde=request.args.get("desde", type=int),
+        hasta=request.args.get("hasta", type=int),
+        filtros=filtros,
+    ))
+
+
+@api.route("/api/charts/equity-realizacion", methods=["GET"])
+def api_equity_realizacion():
+    # Lee la equity precalculada (python -m utils.equity_dataset)
+    return _responder_filtrado(equity_realizacion)
+
+
+# ==========================
+# APLICACIÓN
+# ==========================
+def crear_app(precargar_datos=False):
+    """
+    Aplicación Flask con todas las rutas. Con `precargar_datos` carga antes
+    la tabla preflop, el dataset vigente y lo derivado de él (ver
+    utils/precarga.py): en producción (gunicorn.conf.py, con preload_app)
+    eso pasa una vez en el proceso maestro y los workers lo heredan al fork.
+    La duración de cada etapa queda en app.config["ARRANQUE"] y en /api/metrics.
+    """
+    etapas = {"importaciones": time.perf_counter() - INICIO_ARRANQUE}
+
+    app = Flask(__name__)
+    # CORS completamente abierto
+    CORS(app, resources={r"/*": {"origins": "*"}})
+    app.json = ProveedorJSON(app)
+    app.register_blueprint(api)
+
+    if precargar_datos:
+        etapas.update(precargar())
+    etapas["total"] = time.perf_counter() - INICIO_ARRANQUE
+    for etapa, segundos in etapas.items():
+        arranque.fijar(round(segundos, 6), etapa=etapa)
+    app.config["ARRANQUE"] = etapas
+    return app
+
+
+# Aplicación sin precarga para `flask run` y `from app import app`; gunicorn
+# arma la suya con crear_app(precargar_datos=True)
+app = crear_app()
 
 
 # ==========================
 # MAIN
 # ==========================
 if __name__ == "__main__":
+    # Servidor de desarrollo; para producción ver gunicorn.conf.py
     app.run(debug=True, host="127.0.0.1", port=5000)
@@ -0,0 +1,46 @@
+"""
+Configuración de gunicorn para producción. Desde backend/ (Linux/macOS;
+gunicorn viene en requirements.txt):
+    gunicorn
+
+La aplicación se carga con la precarga una sola vez en el proceso maestro
+(preload_app) y los workers la heredan al hacer fork: comparten la tabla
+preflop, el dataset y sus índices en vez de tener una copia cada uno. Al
+arrancar se informa la duración de cada etapa y la memoria del maestro y de
+cada worker; en marcha, /api/metrics da la del worker que responde.
+
+Por defecto hay un worker por CPU. Lo que varias peticiones comparten se
+coordina entre procesos: las escrituras del dataset con un flock (ver
+dataset._bloqueo_escritura) y el estado de los trabajos de /api/generar y
+la cancelación de lotes en data/estado/ (ver utils/compartido.py), así que
+consultar o cancelar funciona llegue al worker que llegue.
+"""
+import os
+
+from utils.metricas import memoria_proceso
+
+wsgi_app = "app:crear_app(precargar_datos=True)"
+preload_app = True
+
+bind = os.environ.get("BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("WORKERS", os.cpu_count() or 1))
+# Hilos por worker: las respuestas en streaming (SSE, NDJSON) ocupan uno
+# mientras dura la conexión
+worker_class = "gthread"
+threads = int(os.environ.get("HILOS", 4))
+timeout = int(os.environ.get("TIMEOUT", 120))
+
+
+def _memoria(pid="self"):
+    return ", ".join(f"{tipo} {valor / 2**20:.1f} MB" for tipo, valor in memoria_proceso(pid).items())
+
+
+def when_ready(server):
+    etapas = server.app.wsgi().config["ARRANQUE"]
+    detalle = ", ".join(f"{etapa} {segundos:.2f} s" for etapa, segundos in etapas.items() if etapa != "total")
+    server.log.info("Arranque en %.2f s (%s)", etapas["total"], detalle)
+    server.log.info("Maestro %s: %s", os.getpid(), _memoria())
+
+
+def post_worker_init(worker):
+    worker.log.info("Worker %s: %s", worker.pid, _memoria())
@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# El dataset de las pruebas va a un directorio temporal (se lee al importar utils.dataset)
+os.environ["DATOS_DIR"] = tempfile.mkdtemp(prefix="poker_tests_")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def cliente():
+    from app import crear_app
+
+    return crear_app().test_client()
@@ -0,0 +1,34 @@
+import pytest
+
+from utils import compartido, lotes
+
+
+@pytest.mark.parametrize("cuerpo", [
+    [1],
+    {"dataset": {"desde": "x"}},
+    {"dataset": {"limite": -1}},
+    {"dataset": 5},
+    {"manos": [{}], "opciones": 5},
+    {"manos": [1]},
+    {},
+])
+def test_lote_invalido_400(cliente, cuerpo):
+    assert cliente.post("/api/analizar-lote", json=cuerpo).status_code == 400
+
+
+def test_cancelar_lote_desde_otro_worker(cliente):
+    lote_id, cancelado = lotes.registrar_lote()
+    # Otra instancia de la marca (como la vería otro proceso)
+    marca = compartido.Marca(cancelado.ruta)
+
+    assert cliente.post(f"/api/analizar-lote/{lote_id}/cancelar").status_code == 200
+    assert marca.is_set() and cancelado.is_set()
+
+    lotes.cerrar_lote(lote_id)
+    assert cliente.post(f"/api/analizar-lote/{lote_id}/cancelar").status_code == 404
+    assert not cancelado.ruta.exists()
+
+
+def test_error_de_una_mano_no_corta_el_lote(monkeypatch):
+    monkeypatch.setattr(lotes, "analizar_mano_fases", lambda req: 1 / 0)
+    assert "ZeroDivisionError" in lotes._analizar({})["error"]
@@ -0,0 +1,71 @@
+import pytest
+
+from utils.dataset import anexar_manos, completar_mano, leer_meta
+
+MANO = {
+    "cartas_usuario": ["A♠", "K♦"],
+    "cartas_comunitarias": ["2♣", "7♥", "J♠"],
+    "resultado_usuario": "gano",
+    "bote_final": 120,
+    "posicion_usuario": "BTN",
+}
+
+INVALIDAS = [
+    {"posicion_usuario": ["BTN"]},
+    {"posicion_usuario": "XX"},
+    {"categoria_mano_usuario": {"a": 1}},
+    {"categoria_mano_usuario": "Casi Color"},
+    {"usuario_id": ["x"]},
+    {"jugadores_mesa": [["x"]]},
+    {"jugadores_mesa": "Jugador_1"},
+    {"bote_final": 1e12},
+    {"bote_final": -5},
+    {"ganancia_usuario": 2**31},
+    {"mano_id": 2**63},
+    {"resultado_usuario": ["gano"]},
+    {"cartas_usuario": [["A♠"], "K♦"]},
+    {"cartas_comunitarias": 5},
+    {"puntos_estrategia": {"riesgo": "alto"}},
+    {"puntos_estrategia": {"agresividad": float("nan")}},
+    {"rondas": [{"acciones": ["call", "all-in"]}]},
+    {"rondas": [{"acciones": [["call"], "call"]}]},
+    {"rondas": "Preflop"},
+]
+
+
+def _num_manos():
+    meta = leer_meta()
+    return meta["num_manos"] if meta else 0
+
+
+@pytest.mark.parametrize("cambios", INVALIDAS)
+def test_completar_mano_rechaza(cambios):
+    with pytest.raises(ValueError):
+        completar_mano({**MANO, **cambios}, 1)
+
+
+def test_completar_mano_valida():
+    mano = completar_mano(MANO, 7)
+    assert mano["mano_id"] == 7
+    assert mano["categoria_mano_usuario"] == "Carta Alta"
+    assert mano["ganancia_usuario"] == 120
+
+
+def test_anexar_sin_dataset_no_crea_nada(tmp_path):
+    with pytest.raises(ValueError):
+        anexar_manos([{**MANO, "posicion_usuario": ["BTN"]}], tmp_path)
+    assert not any(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize("cambios", INVALIDAS)
+def test_api_manos_rechaza_sin_escribir(cliente, cambios):
+    assert cliente.post("/api/manos", json=MANO).status_code == 200
+    antes = _num_manos()
+
+    respuesta = cliente.post("/api/manos", json={"manos": [MANO, {**MANO, **cambios}]})
+
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["error"].startswith("Petición inválida")
+    assert _num_manos() == antes
+    for ruta in ("/api/acumulados", "/api/dashboard", "/api/charts/winrate-posicion?posicion=BTN"):
+        assert cliente.get(ruta).status_code == 200
@@ -0,0 +1,31 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import serializacion
+
+DATOS = {
+    "a": float("nan"),
+    "b": [1.5, float("inf"), np.float32("nan"), np.float64("nan")],
+    "c": np.array([1.0, np.nan]),
+    "d": pd.Series([np.nan, 2.0]),
+    "e": (1, {"x": -float("inf")}),
+    "f": np.int64(3),
+    "g": "ñ",
+    "h": {1: 2},
+}
+
+
+def test_sin_orjson_nan_es_null(monkeypatch):
+    monkeypatch.setattr(serializacion, "orjson", None)
+    cuerpo = serializacion.a_json(DATOS)
+    assert json.loads(cuerpo, parse_constant=pytest.fail)["b"] == [1.5, None, None, None]
+
+
+@pytest.mark.skipif(serializacion.orjson is None, reason="orjson no instalado")
+def test_mismo_cuerpo_con_y_sin_orjson(monkeypatch):
+    con = serializacion.a_json(DATOS, ordenar=True)
+    monkeypatch.setattr(serializacion, "orjson", None)
+    assert serializacion.a_json(DATOS, ordenar=True) == con
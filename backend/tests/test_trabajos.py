@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from utils import compartido, trabajos
+
+
+@pytest.mark.parametrize("num_manos", [0, -1, 1e9, "x", None])
+def test_generar_rechaza_num_manos(cliente, num_manos):
+    respuesta = cliente.post("/api/generar", json={"num_manos": num_manos})
+    assert respuesta.status_code == 400
+
+
+def _registrar(trabajo_id, estado, pid):
+    # Trabajo que ejecuta otro worker: solo existe su archivo de estado
+    trabajo = {"id": trabajo_id, "estado": estado, "creado": 0.0, "terminado": None, "error": None, "_pid": pid}
+    compartido.guardar(trabajos._ruta(trabajo_id), trabajo)
+
+
+def test_cancelar_trabajo_de_otro_worker(cliente):
+    trabajo_id = "a" * 32
+    _registrar(trabajo_id, "en_curso", os.getpid())
+
+    assert cliente.get(f"/api/trabajos/{trabajo_id}").get_json()["estado"] == "en_curso"
+    assert cliente.post(f"/api/trabajos/{trabajo_id}/cancelar").status_code == 200
+    assert trabajos._marca(trabajo_id).is_set()
+
+
+def test_trabajo_de_proceso_muerto(cliente):
+    trabajo_id = "b" * 32
+    _registrar(trabajo_id, "en_cola", 2**22 + 12345)
+    assert cliente.get(f"/api/trabajos/{trabajo_id}").get_json()["estado"] == "error"
+
+
+def test_id_invalido(cliente):
+    assert cliente.get("/api/trabajos/..%2Fx").status_code == 404
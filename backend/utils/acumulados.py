@@ -0,0 +1,202 @@
+"""
+Estadísticas acumuladas en línea.
+
+Se calculan una vez a partir del dataset (vectorizado) y después se
+actualizan con cada mano anexada, así que leerlas no depende del tamaño del
+dataset: solo de cuántas posiciones, categorías y tramos de bote hay.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from . import process
+from .dataset import anexar_manos
+from .stats import POSICIONES_ORDEN
+
+# Ancho fijo de los tramos del histograma de botes
+ANCHO_BIN_BOTE = 50
+
+COLUMNAS = [
+    "resultado_usuario", "posicion_usuario", "categoria_mano_usuario", "bote_final",
+    "ganancia_usuario", "puntos_estrategia.agresividad", "puntos_estrategia.riesgo",
+]
+
+_estado = None
+_lock = threading.Lock()
+
+
+# ======================================================
+# ESTADO
+# ======================================================
+def estado_vacio(firma=None):
+    return {
+        "firma": firma,
+        "manos": 0,
+        "ganadas": 0,
+        "perdidas": 0,
+        "suma_bote": 0,
+        "suma_agresividad": 0.0,
+        "suma_riesgo": 0.0,
+        "total_ganado": 0,
+        "total_perdido": 0,
+        "manos_con_ganancia": 0,
+        "manos_con_perdida": 0,
+        "por_posicion": {},   # posición -> [manos, ganadas, profit, suma_bote]
+        "por_categoria": {},  # categoría -> [manos, ganadas, profit]
+        "histograma": {},     # tramo (bote // ANCHO_BIN_BOTE) -> manos
+    }
+
+
+def _sumar_por_grupo(tabla, claves, columnas):
+    """Suma cada columna por clave dentro del bloque y lo agrega a `tabla`."""
+    codigos, nombres = pd.factorize(claves)
+    sumas = [np.bincount(codigos, weights=c, minlength=len(nombres)).tolist() for c in columnas]
+    for i, nombre in enumerate(nombres):
+        fila = tabla.setdefault(nombre, [0] * len(columnas))
+        for j, suma in enumerate(sumas):
+            fila[j] += int(suma[i])
+
+
+def _acumular(estado, resultado, posicion, categoria, bote, ganancia, agresividad, riesgo):
+    """Suma un bloque de manos (arrays del mismo largo) al estado."""
+    gano = resultado == "gano"
+    uno = np.ones(len(gano))
+
+    estado["manos"] += len(gano)
+    estado["ganadas"] += int(gano.sum())
+    estado["perdidas"] += int((resultado == "perdio").sum())
+    estado["suma_bote"] += int(bote.sum())
+    estado["suma_agresividad"] += float(agresividad.sum())
+    estado["suma_riesgo"] += float(riesgo.sum())
+    estado["total_ganado"] += int(ganancia[ganancia > 0].sum())
+    estado["total_perdido"] += int(-ganancia[ganancia < 0].sum())
+    estado["manos_con_ganancia"] += int((ganancia > 0).sum())
+    estado["manos_con_perdida"] += int((ganancia < 0).sum())
+
+    _sumar_por_grupo(estado["por_posicion"], posicion, [uno, gano, ganancia, bote])
+    _sumar_por_grupo(estado["por_categoria"], categoria, [uno, gano, ganancia])
+
+    tramos, cuentas = np.unique(bote // ANCHO_BIN_BOTE, return_counts=True)
+    for tramo, cuenta in zip(tramos.tolist(), cuentas.tolist()):
+        estado["histograma"][tramo] = estado["histograma"].get(tramo, 0) + cuenta
+
+
+def _construir(firma):
+    """Estado desde cero a partir del dataset completo (una vez por versión)."""
+    estado = estado_vacio(firma)
+    if firma is None:
+        return estado
+    df = process.cargar_dataset(COLUMNAS)
+    if not df.empty:
+        _acumular(
+            estado,
+            df["resultado_usuario"].to_numpy(),
+            df["posicion_usuario"].to_numpy(),
+            df["categoria_mano_usuario"].to_numpy(),
+            df["bote_final"].to_numpy(dtype=np.int64),
+            df["ganancia_usuario"].to_numpy(dtype=np.int64),
+            df["puntos_estrategia.agresividad"].to_numpy(dtype=float),
+            df["puntos_estrategia.riesgo"].to_numpy(dtype=float),
+        )
+    return estado
+
+
+def _estado_vigente():
+    # Si otro proceso (o una regeneración) cambió el dataset, se reconstruye
+    global _estado
+    firma = process.firma_dataset()
+    if _estado is None or _estado["firma"] != firma:
+        _estado = _construir(firma)
+    return _estado
+
+
+# ======================================================
+# API
+# ======================================================
+def registrar_manos(manos):
+    """
+    Anexa manos al dataset y las suma a los acumulados (costo proporcional
+    a las manos nuevas, no al dataset). Devuelve un resumen de la escritura.
+    """
+    global _estado
+    with _lock:
+        estado = _estado_vigente()
+        completas, meta = anexar_manos(manos)
+        if completas:
+            _acumular(
+                estado,
+                np.array([m["resultado_usuario"] for m in completas], dtype=object),
+                np.array([m["posicion_usuario"] for m in completas], dtype=object),
+                np.array([m["categoria_mano_usuario"] for m in completas], dtype=object),
+                np.array([m["bote_final"] for m in completas], dtype=np.int64),
+                np.array([m["ganancia_usuario"] for m in completas], dtype=np.int64),
+                np.array([m["puntos_estrategia"]["agresividad"] for m in completas], dtype=float),
+                np.array([m["puntos_estrategia"]["riesgo"] for m in completas], dtype=float),
+            )
+        # Firma esperada tras esta escritura: si alguien más escribió en el
+        # medio no coincidirá con la real y la próxima lectura reconstruye.
+        estado["firma"] = process.firma_columnar(meta, estado["manos"])
+
+    return {
+        "agregadas": len(completas),
+        "mano_ids": [m["mano_id"] for m in completas],
+        "num_manos": meta["num_manos"],
+        "version": meta["version"],
+    }
+
+
+def acumulados():
+    """Resumen de las estadísticas acumuladas; O(posiciones + categorías + tramos)."""
+    with _lock:
+        e = _estado_vigente()
+        total = e["manos"]
+        generales = {
+            "total_manos": total,
+            "ganadas": e["ganadas"],
+            "perdidas": e["perdidas"],
+            "tasa_victoria": round(e["ganadas"] / total * 100, 2) if total else 0.0,
+            "bote_promedio": round(e["suma_bote"] / total, 2) if total else 0.0,
+            "agresividad_media": round(e["suma_agresividad"] / total, 3) if total else 0.0,
+            "riesgo_medio": round(e["suma_riesgo"] / total, 3) if total else 0.0,
+            "total_ganado": e["total_ganado"],
+            "total_perdido": e["total_perdido"],
+            "profit_neto": e["total_ganado"] - e["total_perdido"],
+            "promedio_ganado": round(e["total_ganado"] / e["manos_con_ganancia"], 2) if e["manos_con_ganancia"] else 0,
+            "promedio_perdido": round(e["total_perdido"] / e["manos_con_perdida"], 2) if e["manos_con_perdida"] else 0,
+        }
+        por_posicion = sorted(
+            e["por_posicion"].items(),
+            key=lambda kv: (POSICIONES_ORDEN.index(kv[0]) if kv[0] in POSICIONES_ORDEN else 99, kv[0]),
+        )
+        por_categoria = sorted(e["por_categoria"].items(), key=lambda kv: -kv[1][0])
+        tramos = sorted(e["histograma"])
+
+        return {
+            "generales": generales,
+            "por_posicion": [
+                {
+                    "posicion": pos,
+                    "hands": manos,
+                    "winrate": round(ganadas / manos * 100, 2),
+                    "profit": profit,
+                    "bote_promedio": round(suma_bote / manos, 2),
+                }
+                for pos, (manos, ganadas, profit, suma_bote) in por_posicion
+            ],
+            "por_categoria": [
+                {
+                    "categoria": cat,
+                    "cantidad": manos,
+                    "winrate": round(ganadas / manos * 100, 2),
+                    "profit": profit,
+                }
+                for cat, (manos, ganadas, profit) in por_categoria
+            ],
+            "histograma_botes": {
+                "ancho": ANCHO_BIN_BOTE,
+                "bins": [t * ANCHO_BIN_BOTE for t in tramos],
+                "counts": [e["histograma"][t] for t in tramos],
+            },
+            "profit_acumulado": generales["profit_neto"],
+        }
@@ -0,0 +1,167 @@
+"""
+Manos en memoria sobre un array estructurado de NumPy.
+
+Cada mano es una fila de tamaño fijo (unos 50 bytes): cartas en uint8,
+jugadores de la mesa como máscara de bits (un bit por jugador del
+diccionario, 2 bytes hasta 16 jugadores), posición, categoría y resultado
+como códigos de diccionario y las rondas como la matriz fija de acciones
+empaquetadas del formato columnar. Si la versión tiene la equity por calle
+ya calculada (utils.equity_dataset), se suma como 4 float32 más por mano.
+Las columnas se entregan como vistas sin copia del array; las codificadas,
+como pd.Categorical sobre esos códigos.
+"""
+import numpy as np
+import pandas as pd
+
+from .dataset import (
+    COLUMNAS,
+    COLUMNAS_EQUITY,
+    RONDAS,
+    TAM_BLOQUE,
+    VACIO,
+    cargar_columnas,
+    codificar_manos,
+    decodificar_columna,
+    diccionarios_vacios,
+)
+
+# Columnas de un valor por mano codificadas con diccionario
+CODIFICADAS = [c for c, (_, forma, dic) in COLUMNAS.items() if dic and not forma]
+
+
+def _dtype(num_jugadores, derivadas=()):
+    campos = []
+    for columna, (tipo, forma, _) in {**COLUMNAS, **{c: COLUMNAS_EQUITY[c] for c in derivadas}}.items():
+        if columna == "jugadores_mesa":
+            campos.append((columna, np.uint8, (max(-(-num_jugadores // 8), 2),)))
+        elif columna.startswith("puntos_estrategia."):
+            # Se guardan ya redondeadas (los decimales originales del float32)
+            campos.append((columna, np.float64))
+        else:
+            campos.append((columna, tipo, forma) if forma else (columna, tipo))
+    return np.dtype(campos)
+
+
+def _mascara(codigos, ancho):
+    """Matriz (n, 9) de códigos de jugador (VACIO = asiento libre) -> máscara de bits."""
+    bits = np.zeros((len(codigos), ancho * 8), dtype=bool)
+    filas, asientos = np.nonzero(codigos != VACIO)
+    bits[filas, codigos[filas, asientos]] = True
+    return np.packbits(bits, axis=1, bitorder="little")
+
+
+class AlmacenManos:
+    __slots__ = ("datos", "diccionarios", "rondas")
+
+    def __init__(self, datos, diccionarios, rondas=RONDAS):
+        self.datos = datos
+        self.diccionarios = diccionarios
+        self.rondas = rondas
+
+    # --------------------------------------------------
+    # Construcción
+    # --------------------------------------------------
+    @classmethod
+    def desde_columnas(cls, columnas, diccionarios, rondas=RONDAS, tam_bloque=TAM_BLOQUE * 10):
+        """
+        Desde columnas al estilo del formato columnar (arrays o memmaps), por
+        tramos. Las columnas de equity se incluyen si vienen en `columnas`.
+        """
+        n = len(columnas["mano_id"])
+        derivadas = [c for c in COLUMNAS_EQUITY if c in columnas]
+        datos = np.empty(n, dtype=_dtype(len(diccionarios["jugadores_mesa"]), derivadas))
+        ancho = datos.dtype["jugadores_mesa"].shape[0]
+        for inicio in range(0, n, tam_bloque):
+            tramo = datos[inicio:inicio + tam_bloque]
+            for columna in datos.dtype.names:
+                valores = np.asarray(columnas[columna][inicio:inicio + tam_bloque])
+                if columna == "jugadores_mesa":
+                    tramo[columna] = _mascara(valores, ancho)
+                elif columna.startswith("puntos_estrategia."):
+                    tramo[columna] = np.round(valores.astype(np.float64), 4)
+                else:
+                    tramo[columna] = valores
+        return cls(datos, diccionarios, rondas)
+
+    @classmethod
+    def desde_meta(cls, meta):
+        """Desde una versión del formato columnar."""
+        return cls.desde_columnas(cargar_columnas(meta=meta), meta["diccionarios"], meta["rondas"])
+
+    @classmethod
+    def desde_manos(cls, bloques):
+        """Desde bloques de manos como dicts (formatos JSON / NDJSON antiguos)."""
+        diccionarios = diccionarios_vacios()
+        partes = {c: [] for c in COLUMNAS}
+        for bloque in bloques:
+            for columna, valores in codificar_manos(bloque, diccionarios).items():
+                partes[columna].append(valores)
+        columnas = {
+            c: np.concatenate(p) if p else np.empty((0, *COLUMNAS[c][1]), dtype=COLUMNAS[c][0])
+            for c, p in partes.items()
+        }
+        return cls.desde_columnas(columnas, diccionarios)
+
+    # --------------------------------------------------
+    # Acceso
+    # --------------------------------------------------
+    def __len__(self):
+        return len(self.datos)
+
+    def columna(self, nombre):
+        """Vista sin copia de un campo."""
+        return self.datos[nombre]
+
+    def codigo(self, columna, valor):
+        """Código de `valor` en el diccionario de la columna (None si no aparece)."""
+        dic = self.diccionarios[columna]
+        return dic.index(valor) if valor in dic else None
+
+    def tiene_jugador(self, nombre):
+        """Máscara de las manos en las que `nombre` estaba en la mesa."""
+        j = self.codigo("jugadores_mesa", nombre)
+        if j is None:
+            return np.zeros(len(self), dtype=bool)
+        return (self.datos["jugadores_mesa"][:, j >> 3] >> (j & 7)) & 1 == 1
+
+    def jugadores(self):
+        """(filas, códigos) de cada jugador sentado, ordenados por fila y código."""
+        num = len(self.diccionarios["jugadores_mesa"])
+        bits = np.unpackbits(self.datos["jugadores_mesa"], axis=1, count=num, bitorder="little")
+        return np.nonzero(bits)
+
+    def serie(self, columna):
+        """
+        Columna lista para un DataFrame: vista numérica, pd.Categorical sobre
+        los códigos, o listas Python para cartas, jugadores y rondas.
+        """
+        datos = self.datos[columna]
+        if columna in CODIFICADAS:
+            dic = self.diccionarios[columna]
+            # Con hasta 127 valores los códigos caben en int8: la vista no copia nada
+            codigos = datos.view(np.int8) if len(dic) <= 127 else datos.astype(np.int16)
+            return pd.Categorical.from_codes(codigos, categories=dic)
+        if columna == "jugadores_mesa":
+            if not len(self):
+                return []
+            # En orden de diccionario: la máscara no guarda el asiento
+            filas, codigos = self.jugadores()
+            nombres = np.array(self.diccionarios[columna], dtype=object)[codigos]
+            cortes = np.cumsum(np.bincount(filas, minlength=len(self)))[:-1]
+            return [list(grupo) for grupo in np.split(nombres, cortes)]
+        if datos.ndim > 1:
+            meta = {"diccionarios": self.diccionarios, "rondas": self.rondas}
+            return decodificar_columna(columna, datos, meta)
+        return datos
+
+    def dataframe(self, columnas=None):
+        """DataFrame con las columnas pedidas (todas si None), compartiendo memoria con el almacén."""
+        columnas = list(self.datos.dtype.names) if columnas is None else columnas
+        return pd.DataFrame({c: self.serie(c) for c in columnas}, copy=False)
+
+    def memoria(self):
+        return {
+            "manos": len(self),
+            "bytes": int(self.datos.nbytes),
+            "bytes_por_mano": self.datos.itemsize,
+        }
@@ -1,10 +1,47 @@
 import random
 import math
-from collections import Counter
-from pathlib import Path
-import json
 
-DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "poker_dataset.json"
+import numpy as np
+
+from .dataset import iterar_manos
+from .cache import cache_equity, cache_outs, canonizar, descanonizar
+from .evaluator import (
+    BIT_CARTA,
+    BIT_CARTA_NP,
+    BITS_CATEGORIA,
+    CARTA_A_ID,
+    ID_A_CARTA,
+    PESO,
+    PESO_NP,
+    categoria,
+    evaluar,
+    evaluar_sumas,
+    nombre_categoria,
+)
+from .metricas import combinaciones_exactas, cronometrado, muestras_montecarlo
+from .preflop import equity_preflop
+from .rangos import rangos_rivales
+from .simulator import (
+    MAX_MUESTRAS,
+    TAM_BLOQUE,
+    UMBRAL_EXACTO,
+    acumular,
+    combinaciones_restantes,
+    conteo_vacio,
+    enumerar,
+    intervalo,
+    mazo_restante,
+    simular,
+    simular_adaptativo,
+    simular_bloque,
+    simular_paralelo,
+    usar_pool,
+)
+
+MAX_RIVALES = 8
+
+# Muestras acumuladas tras las que se envía cada estimación en el análisis progresivo
+ETAPAS_PROGRESIVAS = (1_000, 10_000, 100_000)
 
 VALORES = ["A","K","Q","J","10","9","8","7","6","5","4","3","2"]
 PALOS = ["♠","♥","♦","♣"]
@@ -23,96 +60,198 @@ POSICIONES = ["SB","BB","UTG","UTG+1","MP","LJ","HJ","CO","BTN"]
 # CARGAR DATASET
 # ======================================================
 def cargar_dataset():
-    if not DATA_PATH.exists():
-        return []
+    """Recorre en streaming las manos guardadas (vacío si no hay dataset)."""
     try:
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return []
+        yield from iterar_manos()
+    except (OSError, ValueError):
+        return
 
 
 # ======================================================
 # EVALUADOR DE MANO
 # ======================================================
 def evaluar_mano_total(cartas):
-    valores = [c[:-1] for c in cartas]
-    palos = [c[-1] for c in cartas]
+    """Devuelve (nombre_categoria, categoria) para cartas en texto."""
+    valor = evaluar([CARTA_A_ID[c] for c in cartas])
+    return nombre_categoria(valor), categoria(valor)
 
-    nums = sorted([VALOR_MAP[v] for v in valores], reverse=True)
-    counts = Counter(nums)
 
-    # COLOR
-    es_color = any(palos.count(p) >= 5 for p in PALOS)
-
-    # ESCALERA
-    unicos = sorted(list(set(nums)))
-    if 14 in unicos:
-        unicos.insert(0, 1)
-
-    es_escalera = False
-    for i in range(len(unicos)-4):
-        if all(unicos[i+k] == unicos[i] + k for k in range(5)):
-            es_escalera = True
-
-    if es_color and es_escalera: return ("Escalera de Color", 9)
-    if 4 in counts.values(): return ("Póker", 8)
-    if 3 in counts.values() and 2 in counts.values(): return ("Full", 7)
-    if es_color: return ("Color", 6)
-    if es_escalera: return ("Escalera", 5)
-    if 3 in counts.values(): return ("Trío", 4)
-    if list(counts.values()).count(2) >= 2: return ("Doble Par", 3)
-    if 2 in counts.values(): return ("Par", 2)
-
-    return ("Carta Alta", 1)
+def valor_mano(cartas):
+    """Valor comparable (categoría + kickers) para cartas en texto."""
+    return evaluar([CARTA_A_ID[c] for c in cartas])
 
 
 # ======================================================
 # EQUITY (SIMULACIÓN MONTECARLO)
 # ======================================================
-def equity(cartas_user, cartas_mesa, n=500):
-    usadas = set(cartas_user + cartas_mesa)
-    mazo_rest = [c for c in MAZO if c not in usadas]
-
-    wins = ties = 0
-    faltan = 5 - len(cartas_mesa)
-
-    for _ in range(n):
-        tmp = mazo_rest.copy()
-        random.shuffle(tmp)
-
-        rival = tmp[:2]
-        mesa = cartas_mesa + tmp[2:2+faltan]
+@cronometrado("equity")
+def desglose_equity(cartas_user, cartas_mesa, n=500, seed=None, umbral_exacto=UMBRAL_EXACTO,
+                    precision=None, tiempo_max=None, rivales=1, rangos=None, usar_tabla=True):
+    """
+    Equity contra `rivales` rivales con su desglose gana/empata/pierde.
+    `rangos` es None (rivales aleatorios) o la lista de rangos ya parseados
+    de `rangos.rangos_rivales`.
+    Si quedan como máximo `umbral_exacto` combinaciones (rival x runout) se
+    enumeran todas y el resultado es exacto. Si no, se simulan n manos, o
+    bien (si se da `precision` o `tiempo_max` en segundos) se simula por
+    lotes hasta alcanzar ese semiancho del IC 95% o ese tiempo. Con n grande
+    la simulación se reparte en el pool de procesos.
+    Sin mesa se usa la tabla preflop precalculada si está disponible.
+    `seed` puede ser un entero o un np.random.Generator ya creado.
+
+    Los resultados exactos y los simulados sin semilla ni rangos se guardan
+    en una caché LRU con clave canónica por palos.
+    """
+    user = [CARTA_A_ID[c] for c in cartas_user]
+    mesa = [CARTA_A_ID[c] for c in cartas_mesa]
+    aleatorios = rangos is None
+
+    if not mesa and usar_tabla and aleatorios:
+        tabulado = equity_preflop(user, rivales)
+        if tabulado is not None:
+            return tabulado
+
+    exacto = aleatorios and rivales == 1 and combinaciones_restantes(user, mesa) <= umbral_exacto
+
+    # Con semilla, un acierto de caché alteraría la secuencia aleatoria de
+    # las llamadas siguientes, así que solo se cachea lo que no la usa.
+    # Los rangos con combos concretos no son simétricos por palos.
+    clave = None
+    if exacto or (seed is None and aleatorios):
+        canonica, _ = canonizar(user, mesa)
+        clave = (canonica, "exacto") if exacto else (canonica, rivales, n, precision, tiempo_max)
+        en_cache = cache_equity.obtener(clave)
+        if en_cache is not None:
+            return dict(en_cache)
+
+    if exacto:
+        conteo = enumerar(user, mesa)
+    elif precision is not None or tiempo_max is not None:
+        conteo = simular_adaptativo(
+            user, mesa, np.random.default_rng(seed), precision, tiempo_max, rivales, rangos
+        )
+    elif usar_pool(n):
+        conteo = simular_paralelo(user, mesa, n, seed, rivales, rangos)
+    else:
+        conteo = simular(user, mesa, n, np.random.default_rng(seed), rivales, rangos)
 
-        _, ru = evaluar_mano_total(cartas_user + mesa)
-        _, rr = evaluar_mano_total(rival + mesa)
+    resultado = resumen_conteo(conteo, exacto)
+    (combinaciones_exactas if exacto else muestras_montecarlo).sumar(resultado["muestras"])
+    if clave is not None:
+        cache_equity.guardar(clave, resultado)
+    return dict(resultado)
 
-        if ru > rr: wins += 1
-        elif ru == rr: ties += 1
 
-    return (wins + ties*0.5) / n
+def resumen_conteo(conteo, exacto=False):
+    """Equity, IC 95% y desglose (en fracciones) a partir de un conteo."""
+    total = conteo["ganadas"] + conteo["empatadas"] + conteo["perdidas"]
+    media, error = intervalo(conteo)
+    if exacto:
+        error = 0.0
+    return {
+        "equity": media,
+        "ic": (max(media - error, 0.0), min(media + error, 1.0)),
+        "gana": conteo["ganadas"] / total,
+        "empata": conteo["empatadas"] / total,
+        "pierde": conteo["perdidas"] / total,
+        "muestras": total,
+        "exacto": exacto,
+    }
+
+
+def equity(cartas_user, cartas_mesa, n=500, seed=None, umbral_exacto=UMBRAL_EXACTO,
+           precision=None, tiempo_max=None, rivales=1, rangos=None):
+    return desglose_equity(
+        cartas_user, cartas_mesa, n, seed, umbral_exacto, precision, tiempo_max, rivales, rangos
+    )["equity"]
+
+
+def refinar_equity(cartas_user, cartas_mesa, etapas=ETAPAS_PROGRESIVAS, seed=None,
+                   umbral_exacto=UMBRAL_EXACTO, rivales=1, rangos=None):
+    """
+    Equity por estimaciones sucesivas: genera un resumen (como el de
+    `desglose_equity`) cada vez que las muestras acumuladas llegan a una de
+    las `etapas`, y None entre bloques de simulación, para que quien consume
+    pueda cortar (cerrando el generador) sin esperar a la etapa siguiente.
+    Si el resultado es exacto o sale de la tabla preflop se genera una sola vez.
+    """
+    user = [CARTA_A_ID[c] for c in cartas_user]
+    mesa = [CARTA_A_ID[c] for c in cartas_mesa]
+    if rangos is None and (
+        (not mesa and equity_preflop(user, rivales) is not None)
+        or (rivales == 1 and combinaciones_restantes(user, mesa) <= umbral_exacto)
+    ):
+        yield desglose_equity(cartas_user, cartas_mesa, seed=seed, umbral_exacto=umbral_exacto, rivales=rivales)
+        return
+
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    conteo = conteo_vacio()
+    hechas = 0
+    for objetivo in etapas:
+        while hechas < objetivo:
+            if hechas:
+                yield None
+            m = min(TAM_BLOQUE // rivales, objetivo - hechas)
+            acumular(conteo, simular_bloque(user, mesa, m, rng, rivales, rangos))
+            muestras_montecarlo.sumar(m)
+            hechas += m
+        yield resumen_conteo(conteo)
+
+
+def validar_etapas(etapas):
+    """Etapas del análisis progresivo (None = las por defecto), crecientes y acotadas."""
+    if etapas is None:
+        return ETAPAS_PROGRESIVAS
+    if isinstance(etapas, str):
+        etapas = etapas.split(",")
+    etapas = tuple(int(e) for e in etapas)
+    if not etapas or etapas[0] < 1 or any(a >= b for a, b in zip(etapas, etapas[1:])):
+        raise ValueError("etapas debe ser una lista creciente de muestras positivas")
+    if etapas[-1] > MAX_MUESTRAS:
+        raise ValueError(f"etapas admite como máximo {MAX_MUESTRAS} muestras")
+    return etapas
 
 
 # ======================================================
 # OUTS
 # ======================================================
+@cronometrado("outs")
 def outs(cartas_user, mesa):
     if len(mesa) < 3 or len(mesa) >= 5:
         return 0, []
 
-    usadas = set(cartas_user + mesa)
-    mazo_rest = [c for c in MAZO if c not in usadas]
-    base_rank = evaluar_mano_total(cartas_user + mesa)[1]
+    user = [CARTA_A_ID[c] for c in cartas_user]
+    mesa_ids = [CARTA_A_ID[c] for c in mesa]
 
-    outs_list = []
-    for c in mazo_rest:
-        r = evaluar_mano_total(cartas_user + mesa + [c])[1]
-        if r > base_rank:
-            outs_list.append(c)
+    # Los outs se calculan (y cachean) con los palos canónicos
+    canonica, perm = canonizar(user, mesa_ids)
+    outs_canon = cache_outs.obtener(canonica)
+    if outs_canon is None:
+        outs_canon = _outs_ids(list(canonica[0]), list(canonica[1]))
+        cache_outs.guardar(canonica, outs_canon)
+
+    # Mismo orden que MAZO: de A a 2 y ♠ ♥ ♦ ♣ dentro de cada valor
+    ids = sorted(descanonizar(outs_canon, perm), key=lambda c: (-(c >> 2), c & 3))
+    outs_list = [ID_A_CARTA[c] for c in ids]
 
     return len(outs_list), outs_list
 
 
+def _outs_ids(user, mesa):
+    """Cartas (codificadas) que suben la categoría de la mano."""
+    mano = user + mesa
+    base_rank = categoria(evaluar(mano))
+
+    # Las cartas restantes se evalúan juntas: a la suma de la mano se le
+    # suma la de cada candidata, sin reevaluar la mano
+    candidatas = mazo_restante(mano)
+    valores = evaluar_sumas(
+        sum(PESO[c] for c in mano) + PESO_NP[candidatas],
+        sum(BIT_CARTA[c] for c in mano) + BIT_CARTA_NP[candidatas],
+    )
+    return tuple(candidatas[(valores >> BITS_CATEGORIA) > base_rank].tolist())
+
+
 # ======================================================
 # RECOMENDACIÓN SEGÚN EQUITY
 # ======================================================
@@ -128,53 +267,124 @@ def recomendacion_equity(e):
     return "Muy mala equity. Solo continúa si tienes odds claras."
 
 
+def _detalle_equity(d):
+    """Campos extra de cada fase: desglose, IC 95% y muestras usadas."""
+    return {
+        "desglose": {
+            "gana": round(d["gana"], 4),
+            "empata": round(d["empata"], 4),
+            "pierde": round(d["pierde"], 4),
+            "exacto": d["exacto"],
+        },
+        "intervalo_confianza": [round(d["ic"][0], 4), round(d["ic"][1], 4)],
+        "muestras": d["muestras"],
+    }
+
+
 # ======================================================
 # ANALIZADOR PRINCIPAL FASE POR FASE
 # ======================================================
-def analizar_mano_fases(req):
-    cartas_user = req["cartas_usuario"]
-    posicion = req.get("posicion", "MP")
+# Cartas comunitarias vistas en cada fase
+FASES = {"preflop": 0, "flop": 3, "turn": 4, "river": 5}
+
 
-    # GENERAR FLOP, TURN, RIVER
-    usadas = set(cartas_user)
+def validar_semilla(seed):
+    """Semilla de una petición: None, un entero no negativo (o su texto) o la SeedSequence de un lote."""
+    if seed is None or isinstance(seed, np.random.SeedSequence):
+        return seed
+    try:
+        seed = int(seed)
+    except (TypeError, ValueError):
+        raise ValueError(f"seed debe ser un entero: {seed!r}") from None
+    if seed < 0:
+        raise ValueError("seed debe ser un entero no negativo")
+    return seed
+
+
+def _entero(req, clave, defecto, minimo, maximo):
+    """Entero `clave` de la petición dentro de [minimo, maximo]."""
+    valor = req.get(clave, defecto)
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{clave} debe ser un entero: {valor!r}") from None
+    if not minimo <= valor <= maximo:
+        raise ValueError(f"{clave} debe estar entre {minimo} y {maximo}")
+    return valor
+
+
+def _preparar(req):
+    """Valida la petición; devuelve (cartas, posición, mesa de 5 cartas, opciones de equity)."""
+    cartas_user = list(req["cartas_usuario"])
+    posicion = req.get("posicion", "MP")
+    n = _entero(req, "n", 500, 1, MAX_MUESTRAS)
+    seed = validar_semilla(req.get("seed"))
+    rng = np.random.default_rng(seed)
+    # Sin semilla las equities no dependen del generador (y pueden cachearse)
+    rng_eq = rng if seed is not None else None
+    # 0 = nunca enumerar
+    umbral = _entero(req, "umbral_exacto", UMBRAL_EXACTO, 0, MAX_MUESTRAS)
+
+    # Modo adaptativo opcional: precisión (semiancho IC 95%) y/o tiempo por fase
+    precision = req.get("precision")
+    precision = float(precision) if precision is not None else None
+    tiempo_max = req.get("tiempo_max_ms")
+    tiempo_max = float(tiempo_max) / 1000 if tiempo_max is not None else None
+
+    # Rivales (1..8) y, opcionalmente, sus rangos: "top 15%", "AKs,QQ,A♠K♠"...
+    rivales = _entero(req, "rivales", 1, 1, MAX_RIVALES)
+    rangos = rangos_rivales(req.get("rangos"), rivales)
+
+    opciones = {
+        "n": n,
+        "seed": rng_eq,
+        "umbral_exacto": umbral,
+        "precision": precision,
+        "tiempo_max": tiempo_max,
+        "rivales": rivales,
+        "rangos": rangos,
+    }
+
+    # GENERAR FLOP, TURN, RIVER (respetando las comunitarias conocidas)
+    conocidas = list(req.get("cartas_comunitarias") or [])
+    if len(cartas_user) != 2:
+        raise ValueError("cartas_usuario debe tener exactamente 2 cartas")
+    if len(conocidas) > 5:
+        raise ValueError("cartas_comunitarias admite como máximo 5 cartas")
+    for c in cartas_user + conocidas:
+        if c not in CARTA_A_ID:
+            raise ValueError(f"Carta no válida: {c}")
+    usadas = set(cartas_user + conocidas)
+    if len(usadas) != len(cartas_user) + len(conocidas):
+        raise ValueError("Hay cartas repetidas")
     mazo_rest = [c for c in MAZO if c not in usadas]
-    random.shuffle(mazo_rest)
-
-    flop = mazo_rest[:3]
-    turn = mazo_rest[3]
-    river = mazo_rest[4]
-
-    # ==========================
-    # PRE-FLOP
-    # ==========================
-    cat_pre, _ = evaluar_mano_total(cartas_user)
-    eq_pre = round(equity(cartas_user, []), 2)
-    rec_pre = recomendacion_equity(eq_pre)
-
-    # ==========================
-    # FLOP
-    # ==========================
-    cat_flop, _ = evaluar_mano_total(cartas_user + flop)
-    eq_flop = round(equity(cartas_user, flop), 2)
-    o_flop, olist_flop = outs(cartas_user, flop)
-    rec_flop = recomendacion_equity(eq_flop)
-
-    # ==========================
-    # TURN
-    # ==========================
-    mesa_turn = flop + [turn]
-    cat_turn, _ = evaluar_mano_total(cartas_user + mesa_turn)
-    eq_turn = round(equity(cartas_user, mesa_turn), 2)
-    o_turn, olist_turn = outs(cartas_user, mesa_turn)
-    rec_turn = recomendacion_equity(eq_turn)
-
-    # ==========================
-    # RIVER
-    # ==========================
-    mesa_river = mesa_turn + [river]
-    cat_river, _ = evaluar_mano_total(cartas_user + mesa_river)
-    eq_river = round(equity(cartas_user, mesa_river), 2)
-    rec_river = recomendacion_equity(eq_river)
+    mazo_rest = [mazo_rest[i] for i in rng.permutation(len(mazo_rest))]
+    mesa_completa = conocidas + mazo_rest[:5 - len(conocidas)]
+
+    return cartas_user, posicion, mesa_completa, opciones
+
+
+def _fase(nombre, cartas_user, mesa_completa, d):
+    """Resultado de una fase a partir de su desglose de equity `d`."""
+    mesa = mesa_completa[:FASES[nombre]]
+    categoria_fase, _ = evaluar_mano_total(cartas_user + mesa)
+    eq = round(d["equity"], 2)
+
+    fase = {}
+    if nombre == "flop":
+        fase["cartas"] = mesa
+    elif mesa:
+        fase["carta"] = mesa[-1]
+    fase.update(categoria=categoria_fase, equity=eq, **_detalle_equity(d))
+    if nombre in ("flop", "turn"):
+        fase["outs"], fase["outs_list"] = outs(cartas_user, mesa)
+    fase["recomendacion"] = recomendacion_equity(eq)
+    return fase
+
+
+def _cierre(fases, cartas_user, mesa_completa, posicion, rivales):
+    """Resultado completo: las cuatro fases más el análisis general y la recomendación final."""
+    eq_pre, eq_flop, eq_turn, eq_river = (fases[f]["equity"] for f in FASES)
 
     # =======================================================
     # ANÁLISIS GENERAL (NUEVO)
@@ -214,38 +424,57 @@ def analizar_mano_fases(req):
         recomendacion_final = "Fold en la mayoría de escenarios."
 
     return {
-        "preflop": {
-            "categoria": cat_pre,
-            "equity": eq_pre,
-            "recomendacion": rec_pre
-        },
-        "flop": {
-            "cartas": flop,
-            "categoria": cat_flop,
-            "equity": eq_flop,
-            "outs": o_flop,
-            "outs_list": olist_flop,
-            "recomendacion": rec_flop
-        },
-        "turn": {
-            "carta": turn,
-            "categoria": cat_turn,
-            "equity": eq_turn,
-            "outs": o_turn,
-            "outs_list": olist_turn,
-            "recomendacion": rec_turn
-        },
-        "river": {
-            "carta": river,
-            "categoria": cat_river,
-            "equity": eq_river,
-            "recomendacion": rec_river
-        },
+        **fases,
         "equity_evolucion": [eq_pre, eq_flop, eq_turn, eq_river],
-        "cartas_finales": cartas_user + flop + [turn, river],
+        "cartas_finales": cartas_user + mesa_completa,
         "posicion": posicion,
+        "rivales": rivales,
 
         # LOS CAMPOS QUE TU FRONTEND NECESITA
         "analisis_general": analisis_general,
         "recomendacion_final": recomendacion_final
-    }
\ No newline at end of file
+    }
+
+
+def analizar_mano_fases(req):
+    cartas_user, posicion, mesa_completa, opciones = _preparar(req)
+    fases = {}
+    for nombre, vistas in FASES.items():
+        d = desglose_equity(cartas_user, mesa_completa[:vistas], **opciones)
+        fases[nombre] = _fase(nombre, cartas_user, mesa_completa, d)
+    return _cierre(fases, cartas_user, mesa_completa, posicion, opciones["rivales"])
+
+
+# ======================================================
+# ANÁLISIS PROGRESIVO (STREAMING)
+# ======================================================
+def analizar_mano_fases_progresivo(req):
+    """
+    Igual que `analizar_mano_fases`, pero como generador de eventos
+    (tipo, datos): "equity" con cada estimación de una fase (ver
+    `refinar_equity`), "fase" cuando una fase está completa y "resultado"
+    con lo mismo que devuelve `analizar_mano_fases`. Entre bloques de
+    simulación genera None. La validación ocurre aquí, antes del primer evento.
+    `n`, `precision` y `tiempo_max_ms` no se usan: las muestras las fijan las `etapas`.
+    """
+    cartas_user, posicion, mesa_completa, opciones = _preparar(req)
+    etapas = validar_etapas(req.get("etapas"))
+    return _eventos_fases(cartas_user, posicion, mesa_completa, opciones, etapas)
+
+
+def _eventos_fases(cartas_user, posicion, mesa_completa, opciones, etapas):
+    fases = {}
+    for nombre, vistas in FASES.items():
+        d = None
+        for estimacion in refinar_equity(
+            cartas_user, mesa_completa[:vistas], etapas, opciones["seed"],
+            opciones["umbral_exacto"], opciones["rivales"], opciones["rangos"],
+        ):
+            if estimacion is None:
+                yield None
+                continue
+            d = estimacion
+            yield "equity", {"fase": nombre, "equity": round(d["equity"], 4), **_detalle_equity(d)}
+        fases[nombre] = _fase(nombre, cartas_user, mesa_completa, d)
+        yield "fase", {"fase": nombre, **fases[nombre]}
+    yield "resultado", _cierre(fases, cartas_user, mesa_completa, posicion, opciones["rivales"])
@@ -0,0 +1,316 @@
+"""
+Benchmark reproducible de los caminos críticos: evaluador, equity, outs,
+análisis por fases, generación del dataset y agregaciones de stats.
+
+Todo usa semillas fijas y datos generados en un directorio temporal (el
+dataset real no se toca ni se necesita red). Cada caso se repite varias
+veces y se guardan los tiempos, percentiles y throughput en JSON; dos
+corridas se comparan y se marcan las regresiones que pasen un umbral:
+
+    python -m utils.benchmark --salida base.json
+    python -m utils.benchmark --salida nuevo.json --comparar base.json --umbral 0.15
+    python -m utils.benchmark --rapido --solo equity,stats
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SEED = 2024
+FORMATO = 1
+
+TAMANOS_MANOS = [1_000, 10_000, 100_000, 1_000_000]
+TAMANOS_MUESTRAS = [100, 1_000, 10_000, 100_000]
+# Con --rapido se omiten los tamaños más grandes
+MAX_RAPIDO = {"manos": 100_000, "muestras": 10_000}
+
+GRUPOS = ["evaluador", "equity", "outs", "fases", "generador", "stats"]
+
+# Situación fija para equity y fases (flop con proyecto de color y escalera)
+USUARIO = ["A♠", "K♠"]
+MESA = ["Q♠", "J♦", "2♠"]
+
+
+# ======================================================
+# MEDICIÓN
+# ======================================================
+def medir(funcion, repeticiones, calentamiento=1, preparar=None):
+    """Tiempos (s) de `repeticiones` llamadas, tras `calentamiento` descartadas."""
+    tiempos = []
+    for i in range(calentamiento + repeticiones):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        transcurrido = time.perf_counter() - inicio
+        if i >= calentamiento:
+            tiempos.append(transcurrido)
+    return tiempos
+
+
+def resumen(tiempos, unidades, unidad):
+    """Percentiles y throughput (unidades por segundo sobre la mediana)."""
+    p50, p90, p99 = np.percentile(tiempos, [50, 90, 99]).tolist()
+    return {
+        "repeticiones": len(tiempos),
+        "tiempos": [round(t, 6) for t in tiempos],
+        "min": round(min(tiempos), 6),
+        "media": round(float(np.mean(tiempos)), 6),
+        "p50": round(p50, 6),
+        "p90": round(p90, 6),
+        "p99": round(p99, 6),
+        "unidades": unidades,
+        "unidad": unidad,
+        "throughput": round(unidades / p50, 2) if p50 > 0 else None,
+    }
+
+
+# ======================================================
+# CASOS
+# ======================================================
+def caso(nombre, parametros, funcion, unidades, unidad, preparar=None, antes=None):
+    """
+    Un caso medible: `preparar` corre antes de cada repetición (fuera del
+    tiempo) y `antes` una sola vez antes de empezar.
+    """
+    return {"nombre": nombre, "parametros": parametros, "funcion": funcion, "unidades": unidades,
+            "unidad": unidad, "preparar": preparar, "antes": antes}
+
+
+def _cartas_aleatorias(rng, n, k):
+    """n manos de k cartas distintas (texto), siempre las mismas para la semilla."""
+    from .evaluator import ID_A_CARTA
+
+    ids = np.argsort(rng.random((n, 52)), axis=1)[:, :k]
+    return [[ID_A_CARTA[c] for c in fila] for fila in ids.tolist()]
+
+
+def casos_evaluador(tamanos):
+    from .analyzer import evaluar_mano_total
+    from .evaluator import codificar, evaluar_lote
+
+    for n in tamanos:
+        manos = _cartas_aleatorias(np.random.default_rng(SEED), n, 7)
+        ids = np.array([codificar(cartas) for cartas in manos])
+
+        def correr(manos=manos):
+            for cartas in manos:
+                evaluar_mano_total(cartas)
+
+        # Mano a mano (escalar) y en lote por separado: son rutas distintas
+        yield caso(f"evaluar_mano_total[manos={n}]", {"manos": n}, correr, n, "manos")
+        yield caso(f"evaluar_lote[manos={n}]", {"manos": n}, lambda ids=ids: evaluar_lote(ids), n, "manos")
+
+
+def casos_equity(tamanos):
+    from .analyzer import equity
+
+    for n in tamanos:
+        # Con semilla y sin umbral exacto siempre se simulan las n muestras (sin caché)
+        def correr(n=n):
+            equity(USUARIO, MESA, n=n, seed=SEED, umbral_exacto=0)
+
+        yield caso(f"equity[muestras={n}]", {"muestras": n}, correr, n, "muestras")
+
+
+def casos_outs(tamanos):
+    from .analyzer import outs
+    from .cache import cache_outs
+
+    for n in tamanos:
+        # Situaciones de flop distintas y caché vacía: se mide el cálculo, no la caché
+        situaciones = [(c[:2], c[2:]) for c in _cartas_aleatorias(np.random.default_rng(SEED), n, 5)]
+
+        def correr(situaciones=situaciones):
+            for user, mesa in situaciones:
+                outs(user, mesa)
+
+        yield caso(f"outs[situaciones={n}]", {"situaciones": n}, correr, n, "situaciones", cache_outs.limpiar)
+
+
+def casos_fases(tamanos):
+    from .analyzer import analizar_mano_fases
+    from .cache import cache_equity, cache_outs
+
+    def limpiar():
+        cache_equity.limpiar()
+        cache_outs.limpiar()
+
+    for n in tamanos:
+        peticion = {"cartas_usuario": USUARIO, "posicion": "BTN", "n": n, "seed": SEED}
+
+        def correr(peticion=peticion):
+            analizar_mano_fases(dict(peticion))
+
+        yield caso(f"analizar_mano_fases[muestras={n}]", {"muestras": n}, correr, 1, "análisis", limpiar)
+
+
+def casos_generador(tamanos, procesos):
+    from .generator import generar_dataset
+
+    for n in tamanos:
+        def correr(n=n):
+            generar_dataset(num_manos=n, seed=SEED, procesos=procesos)
+
+        yield caso(f"generar_dataset[manos={n}]", {"manos": n, "procesos": procesos}, correr, n, "manos")
+
+
+def casos_stats(tamanos, procesos):
+    from . import stats
+    from .generator import generar_dataset
+    from .process import limpiar_cache
+
+    filtros = {"posicion": ["BTN"], "categoria_min": "Full", "bote_min": 500}
+    for n in tamanos:
+        # El dataset de cada tamaño se genera una vez, fuera de la medición
+        def preparar_dataset(n=n):
+            generar_dataset(num_manos=n, seed=SEED, procesos=procesos)
+            limpiar_cache()
+            stats.dashboard()
+
+        p = {"manos": n}
+        # "frío": vuelve a leer las columnas del disco en cada repetición
+        yield caso(f"dashboard_frio[manos={n}]", p, stats.dashboard, n, "manos", limpiar_cache, preparar_dataset)
+        yield caso(f"dashboard[manos={n}]", p, stats.dashboard, n, "manos")
+        yield caso(f"estadisticas_filtradas[manos={n}]", p, lambda: stats.estadisticas_generales(filtros), n, "manos")
+        yield caso(f"timeline_profit_zoom[manos={n}]", p, lambda n=n: stats.timeline_profit(1000, n // 4, n // 2), n, "manos")
+
+
+def _casos(grupo, rapido, procesos):
+    manos = [n for n in TAMANOS_MANOS if not rapido or n <= MAX_RAPIDO["manos"]]
+    muestras = [n for n in TAMANOS_MUESTRAS if not rapido or n <= MAX_RAPIDO["muestras"]]
+    return {
+        "evaluador": lambda: casos_evaluador(manos),
+        "equity": lambda: casos_equity(muestras),
+        "outs": lambda: casos_outs([n // 10 for n in manos if n <= 100_000]),
+        "fases": lambda: casos_fases(muestras),
+        "generador": lambda: casos_generador(manos, procesos),
+        "stats": lambda: casos_stats(manos, procesos),
+    }[grupo]()
+
+
+def _entorno(procesos):
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "procesos_generador": procesos,
+    }
+
+
+def correr(grupos=GRUPOS, repeticiones=5, rapido=False, procesos=1, mostrar=print):
+    """Corre los grupos pedidos y devuelve el informe (dict serializable a JSON)."""
+    resultados = {}
+    for grupo in grupos:
+        for c in _casos(grupo, rapido, procesos):
+            if c["antes"] is not None:
+                c["antes"]()
+            tiempos = medir(c["funcion"], repeticiones, preparar=c["preparar"])
+            r = {"grupo": grupo, "parametros": c["parametros"], **resumen(tiempos, c["unidades"], c["unidad"])}
+            resultados[c["nombre"]] = r
+            mostrar(f"{c['nombre']:45s} p50 {r['p50'] * 1000:10.2f} ms  p90 {r['p90'] * 1000:10.2f} ms  "
+                    f"{r['throughput']:>14,.0f} {c['unidad']}/s")
+    return {
+        "formato": FORMATO,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": SEED,
+        "repeticiones": repeticiones,
+        "rapido": rapido,
+        "entorno": _entorno(procesos),
+        "resultados": resultados,
+    }
+
+
+# ======================================================
+# COMPARACIÓN
+# ======================================================
+def comparar(base, nuevo, umbral=0.10):
+    """
+    Compara la mediana de cada caso presente en ambos informes. Es regresión
+    si el nuevo tarda más de (1 + umbral) veces lo que tardaba la base.
+    """
+    grupos = {r["grupo"] for r in nuevo["resultados"].values()}
+    filas = []
+    for nombre, r in nuevo["resultados"].items():
+        anterior = base["resultados"].get(nombre)
+        if anterior is None or not anterior["p50"]:
+            continue
+        razon = r["p50"] / anterior["p50"]
+        filas.append({
+            "caso": nombre,
+            "p50_base": anterior["p50"],
+            "p50_nuevo": r["p50"],
+            "razon": round(razon, 3),
+            "regresion": razon > 1 + umbral,
+        })
+    return {
+        "umbral": umbral,
+        "casos": filas,
+        "regresiones": [f["caso"] for f in filas if f["regresion"]],
+        # Casos de la base que faltan en los grupos que sí se corrieron
+        "solo_base": sorted(
+            nombre for nombre, r in base["resultados"].items()
+            if nombre not in nuevo["resultados"] and r["grupo"] in grupos
+        ),
+        "solo_nuevo": sorted(set(nuevo["resultados"]) - set(base["resultados"])),
+    }
+
+
+def _mostrar_comparacion(comparacion, mostrar=print):
+    mostrar(f"\nComparación (umbral {comparacion['umbral']:.0%}):")
+    for f in comparacion["casos"]:
+        marca = "  REGRESIÓN" if f["regresion"] else ""
+        mostrar(f"{f['caso']:45s} {f['p50_base'] * 1000:10.2f} ms -> {f['p50_nuevo'] * 1000:10.2f} ms"
+                f"  x{f['razon']:.3f}{marca}")
+    for nombre in comparacion["solo_base"]:
+        mostrar(f"{nombre:45s} (solo en la base)")
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del analizador, el generador y las estadísticas.")
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="informe JSON base contra el que comparar")
+    parser.add_argument("--umbral", type=float, default=0.10, help="regresión tolerada (0.10 = 10%%)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--rapido", action="store_true", help=f"omite tamaños mayores que {MAX_RAPIDO}")
+    parser.add_argument("--solo", default=",".join(GRUPOS), help=f"grupos separados por coma ({','.join(GRUPOS)})")
+    parser.add_argument("--procesos", type=int, default=1, help="procesos del generador")
+    args = parser.parse_args()
+
+    grupos = [g for g in args.solo.split(",") if g]
+    desconocidos = [g for g in grupos if g not in GRUPOS]
+    if desconocidos:
+        parser.error(f"grupos desconocidos: {desconocidos}")
+
+    # El dataset se genera en un directorio temporal (se lee al importar dataset)
+    temporal = tempfile.mkdtemp(prefix="benchmark_poker_")
+    os.environ["DATOS_DIR"] = temporal
+    try:
+        informe = correr(grupos, args.repeticiones, args.rapido, args.procesos)
+    finally:
+        shutil.rmtree(temporal, ignore_errors=True)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        comparacion = comparar(base, informe, args.umbral)
+        _mostrar_comparacion(comparacion)
+        if comparacion["regresiones"]:
+            print(f"\n{len(comparacion['regresiones'])} regresión(es) por encima del {args.umbral:.0%}")
+            sys.exit(1)
@@ -0,0 +1,142 @@
+"""
+Canonización por palos y caché LRU acotada en memoria.
+
+Dos situaciones que solo difieren en el nombre de los palos (A♠K♠ con
+Q♠J♠2♥ y A♥K♥ con Q♥J♥2♦) tienen la misma equity y los mismos outs, así
+que comparten entrada en la caché.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from itertools import permutations
+
+PERMUTACIONES_PALOS = list(permutations(range(4)))
+
+# Tope de memoria de las cachés de equity/outs (configurable por entorno)
+CACHE_MB = float(os.environ.get("EQUITY_CACHE_MB", 32))
+CACHE_TTL = float(os.environ["EQUITY_CACHE_TTL"]) if "EQUITY_CACHE_TTL" in os.environ else None
+RESPUESTAS_CACHE_MB = float(os.environ.get("RESPUESTAS_CACHE_MB", 16))
+
+
+# ======================================================
+# CANONIZACIÓN
+# ======================================================
+def canonizar(user, mesa):
+    """
+    Devuelve (clave, permutacion) para cartas codificadas 0..51. La clave es
+    la menor de las 24 formas de renombrar los palos; `permutacion[p]` es el
+    palo canónico del palo original p.
+    """
+    mejor = None
+    mejor_perm = None
+    for perm in PERMUTACIONES_PALOS:
+        clave = (
+            tuple(sorted((c & ~3) | perm[c & 3] for c in user)),
+            tuple(sorted((c & ~3) | perm[c & 3] for c in mesa)),
+        )
+        if mejor is None or clave < mejor:
+            mejor, mejor_perm = clave, perm
+    return mejor, mejor_perm
+
+
+def descanonizar(cartas, perm):
+    """Lleva cartas del espacio canónico a los palos originales."""
+    inversa = [0] * 4
+    for original, canonico in enumerate(perm):
+        inversa[canonico] = original
+    return [(c & ~3) | inversa[c & 3] for c in cartas]
+
+
+# ======================================================
+# CACHÉ LRU
+# ======================================================
+def _tamano(obj):
+    """Estimación (bytes) de lo que ocupa una clave o un valor."""
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_tamano(k) + _tamano(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_tamano(x) for x in obj)
+    return sys.getsizeof(obj)
+
+
+class CacheLRU:
+    """
+    Caché LRU acotada por bytes (estimados) y, opcionalmente, por antigüedad.
+    Es segura entre hilos y lleva contadores de aciertos y fallos.
+    """
+
+    def __init__(self, max_bytes, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None and self.ttl is not None and time.monotonic() - entrada[2] > self.ttl:
+                self._quitar(clave)
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, clave, valor):
+        tam = _tamano(clave) + _tamano(valor)
+        if tam > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._datos:
+                self._quitar(clave)
+            self._datos[clave] = (valor, tam, time.monotonic())
+            self.bytes += tam
+            while self.bytes > self.max_bytes:
+                antigua = next(iter(self._datos))
+                self._quitar(antigua)
+                self.expulsiones += 1
+
+    def _quitar(self, clave):
+        _, tam, _ = self._datos.pop(clave)
+        self.bytes -= tam
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self.bytes = 0
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsiones": self.expulsiones,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+            }
+
+
+cache_equity = CacheLRU(int(CACHE_MB * 1024 * 1024 * 0.75), CACHE_TTL)
+cache_outs = CacheLRU(int(CACHE_MB * 1024 * 1024 * 0.25), CACHE_TTL)
+
+# Cuerpos JSON ya serializados de estadísticas y gráficos (clave: versión del dataset + ruta + query)
+cache_respuestas = CacheLRU(int(RESPUESTAS_CACHE_MB * 1024 * 1024))
+
+
+def estadisticas_cache():
+    return {
+        "equity": cache_equity.estadisticas(),
+        "outs": cache_outs.estadisticas(),
+        "respuestas": cache_respuestas.estadisticas(),
+    }
@@ -0,0 +1,98 @@
+"""
+Estado compartido entre procesos.
+
+Con varios workers de gunicorn cada petición puede llegar a cualquiera, así
+que lo que otra petición tiene que ver (estado de un trabajo, pedido de
+cancelación de un lote) se guarda en archivos bajo data/estado/: un JSON por
+registro escrito de forma atómica, leer-modificar-escribir bajo un flock, y
+las cancelaciones como un archivo marca que el proceso que ejecuta consulta.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from .dataset import DATA_DIR
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sin bloqueo entre procesos, solo entre hilos
+    fcntl = None
+
+ESTADO_DIR = DATA_DIR / "estado"
+
+_lock = threading.Lock()
+
+
+def directorio(nombre):
+    """Directorio de estado `nombre` (se crea si hace falta)."""
+    ruta = ESTADO_DIR / nombre
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+@contextmanager
+def bloqueo(carpeta):
+    """Exclusión entre hilos y procesos sobre los registros de `carpeta`."""
+    with _lock:
+        with open(carpeta / ".lock", "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+
+def leer(ruta):
+    """Registro JSON o None si no existe."""
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def guardar(ruta, datos):
+    """Escribe el registro de forma atómica: nadie lo lee a medias."""
+    tmp = ruta.with_name(f"{ruta.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(tmp, ruta)
+
+
+def borrar(*rutas):
+    for ruta in rutas:
+        try:
+            ruta.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def proceso_vivo(pid):
+    """¿Sigue corriendo el proceso `pid` (de esta máquina)?"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Marca:
+    """
+    Bandera como threading.Event visible desde todos los procesos: `set`
+    crea el archivo, `is_set` lo consulta (y recuerda el resultado).
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._evento = threading.Event()
+
+    def set(self):
+        self.ruta.touch()
+        self._evento.set()
+
+    def is_set(self):
+        if not self._evento.is_set() and self.ruta.exists():
+            self._evento.set()
+        return self._evento.is_set()
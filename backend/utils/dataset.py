@@ -0,0 +1,647 @@
+"""
+Lectura y escritura del dataset de manos.
+
+El formato es columnar: un directorio por versión con un archivo binario por
+columna (leído con np.memmap) y un meta.json con tipos, formas y los
+diccionarios de las columnas codificadas. Así una consulta lee solo las
+columnas que necesita, sin parsear nada:
+
+    data/poker_dataset/
+        actual.json          -> {"version": 3}
+        v3/meta.json
+        v3/bote_final.bin
+        ...
+
+Las cartas se guardan como uint8 (0..51, ver evaluator), posición, categoría,
+resultado y jugadores como códigos de diccionario, y las rondas como una
+matriz (n, 4) de acciones empaquetadas (2 acciones de 2 bits por ronda).
+Las manos nuevas se pueden anexar al final de la versión vigente sin
+reescribirla (`anexar_manos`). Una versión puede tener además columnas
+derivadas calculadas después (la equity por calle, ver utils.equity_dataset);
+cada cambio de ese tipo sube la "revision" del meta.json.
+Los formatos anteriores (poker_dataset.json y poker_dataset.ndjson) se siguen
+leyendo y se pueden convertir con `python -m utils.dataset`.
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sin bloqueo entre procesos, solo entre hilos
+    fcntl = None
+
+from .evaluator import CARTA_A_ID, CATEGORIAS, ID_A_CARTA, codificar, evaluar, nombre_categoria
+
+# Directorio del dataset de manos (configurable, p. ej. para el benchmark)
+DATA_DIR = Path(os.environ.get("DATOS_DIR", Path(__file__).resolve().parent.parent / "data"))
+DATASET_DIR = DATA_DIR / "poker_dataset"
+NDJSON_PATH = DATA_DIR / "poker_dataset.ndjson"
+LEGACY_PATH = DATA_DIR / "poker_dataset.json"
+
+FORMATO = 1
+
+# Manos por bloque de lectura / conversión
+TAM_BLOQUE = 10_000
+
+# Código de "sin valor" en las columnas uint8 con relleno (cartas, jugadores)
+VACIO = 255
+
+# Escrituras (regenerar / anexar / derivadas) de a una: entre hilos con
+# este lock y entre procesos (workers de gunicorn, scripts) con flock sobre
+# el archivo .lock del directorio del dataset
+_lock_escritura = threading.Lock()
+
+# Versiones publicadas que se conservan (la vigente y la anterior): otro
+# proceso puede haber leído actual.json justo antes de publicarse la nueva
+VERSIONES_CONSERVADAS = 2
+
+RONDAS = ["Preflop","Flop","Turn","River"]
+ACCIONES = ["check","call","raise","fold"]
+POSICIONES = ["SB","BB","UTG","UTG+1","MP","LJ","HJ","CO","BTN"]
+
+# Columnas: (dtype, forma por mano, ¿codificada con diccionario?)
+COLUMNAS = {
+    "mano_id": ("int64", (), False),
+    "usuario_id": ("uint8", (), True),
+    "jugadores_mesa": ("uint8", (9,), True),
+    "posicion_usuario": ("uint8", (), True),
+    "cartas_usuario": ("uint8", (2,), False),
+    "cartas_comunitarias": ("uint8", (5,), False),
+    "categoria_mano_usuario": ("uint8", (), True),
+    "resultado_usuario": ("uint8", (), True),
+    "bote_final": ("int32", (), False),
+    "ganancia_usuario": ("int32", (), False),
+    "puntos_estrategia.agresividad": ("float32", (), False),
+    "puntos_estrategia.riesgo": ("float32", (), False),
+    "rondas": ("uint8", (len(RONDAS),), True),
+}
+
+# Columnas derivadas: solo existen si se calcularon (NaN = mano sin calcular)
+COLUMNAS_EQUITY = {f"equity.{r.lower()}": ("float32", (), False) for r in RONDAS}
+
+
+# ======================================================
+# UBICACIÓN Y VERSIÓN
+# ======================================================
+def _leer_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def version_actual(path=DATASET_DIR):
+    """Versión vigente del dataset columnar (0 si no hay)."""
+    actual = Path(path) / "actual.json"
+    if not actual.exists():
+        return 0
+    return int(_leer_json(actual)["version"])
+
+
+def leer_meta(path=DATASET_DIR):
+    """meta.json de la versión vigente (con su directorio en "dir") o None."""
+    version = version_actual(path)
+    if not version:
+        return None
+    directorio = Path(path) / f"v{version}"
+    meta = _leer_json(directorio / "meta.json")
+    meta["dir"] = directorio
+    return meta
+
+
+def _guardar_meta(meta, directorio):
+    """Escribe meta.json de forma atómica (sin la clave "dir")."""
+    datos = {k: v for k, v in meta.items() if k != "dir"}
+    tmp = directorio / "meta.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+    os.replace(tmp, directorio / "meta.json")
+
+
+def _versiones(path):
+    """Directorios de versiones publicadas {número: directorio}."""
+    return {
+        int(d.name[1:]): d for d in Path(path).glob("v*")
+        if d.name[1:].isdigit() and d.is_dir()
+    }
+
+
+@contextmanager
+def _bloqueo_escritura(base):
+    """Exclusión de escritores sobre `base`, dentro del proceso y entre procesos."""
+    with _lock_escritura:
+        base.mkdir(parents=True, exist_ok=True)
+        with open(base / ".lock", "ab") as f:
+            if fcntl is not None:
+                # Se libera al cerrarse el archivo (también si el proceso muere)
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+
+def ruta_dataset():
+    """Dataset vigente: el columnar, o si no el NDJSON / JSON antiguo, o None."""
+    if version_actual():
+        return DATASET_DIR
+    if NDJSON_PATH.exists():
+        return NDJSON_PATH
+    if LEGACY_PATH.exists():
+        return LEGACY_PATH
+    return None
+
+
+# ======================================================
+# ESCRITURA
+# ======================================================
+def escribir_dataset(bloques, diccionarios, path=DATASET_DIR, extra=None):
+    """
+    Escribe un dataset columnar a partir de bloques {columna: array} con
+    todas las columnas de COLUMNAS. `diccionarios` se guarda al final (puede
+    ir creciendo mientras se consumen los bloques). Se escribe en un
+    directorio de versión nuevo y se publica reemplazando actual.json, así
+    nadie lee un dataset a medio escribir. Devuelve la nueva versión.
+    """
+    base = Path(path)
+    with _bloqueo_escritura(base):
+        return _escribir_dataset(bloques, diccionarios, base, extra)
+
+
+def _escribir_dataset(bloques, diccionarios, base, extra):
+    # Con el bloqueo tomado. Un vN publicado sin llegar a actual.json (proceso
+    # cortado) no se reutiliza: se salta a la versión siguiente
+    version = max(version_actual(base), *_versiones(base), 0) + 1
+    tmp = base / f"v{version}.{uuid.uuid4().hex}.tmp"
+    tmp.mkdir()
+
+    archivos = {c: open(tmp / f"{c}.bin", "wb") for c in COLUMNAS}
+    total = 0
+    ultimo_id = 0
+    try:
+        for bloque in bloques:
+            for columna, (dtype, _, _) in COLUMNAS.items():
+                datos = np.ascontiguousarray(bloque[columna], dtype=dtype)
+                archivos[columna].write(datos.tobytes())
+            total += len(bloque["mano_id"])
+            if len(bloque["mano_id"]):
+                ultimo_id = max(ultimo_id, int(np.max(bloque["mano_id"])))
+    except BaseException:
+        # Error o cancelación: la versión a medio escribir nunca se publica
+        for f in archivos.values():
+            f.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    finally:
+        for f in archivos.values():
+            f.close()
+
+    meta = {
+        "formato": FORMATO,
+        "version": version,
+        "num_manos": total,
+        "ultimo_mano_id": ultimo_id,
+        "creado": time.time(),
+        "columnas": {c: {"dtype": d, "forma": list(f)} for c, (d, f, _) in COLUMNAS.items()},
+        "diccionarios": diccionarios,
+        "rondas": RONDAS,
+        **(extra or {}),
+    }
+    _guardar_meta(meta, tmp)
+
+    os.replace(tmp, base / f"v{version}")
+    with open(base / "actual.json.tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": version}, f)
+    os.replace(base / "actual.json.tmp", base / "actual.json")
+
+    _limpiar_versiones(base, version)
+    return version
+
+
+def _limpiar_versiones(base, version):
+    """
+    Borra las versiones anteriores a las VERSIONES_CONSERVADAS últimas y los
+    directorios temporales que dejaron escrituras cortadas (con el bloqueo
+    tomado no hay otra en curso). Quien ya tenga mapeada una versión borrada
+    sigue leyéndola: el archivo existe hasta que se cierra el último mapeo.
+    """
+    for numero, directorio in _versiones(base).items():
+        if numero <= version - VERSIONES_CONSERVADAS:
+            shutil.rmtree(directorio, ignore_errors=True)
+    for tmp in base.glob("v*.tmp"):
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+# ======================================================
+# LECTURA COLUMNAR
+# ======================================================
+def cargar_columnas(columnas=None, meta=None):
+    """
+    Columnas pedidas (todas si None) como arrays de solo lectura mapeados en
+    memoria: solo se lee del disco lo que se usa.
+    """
+    meta = meta or leer_meta()
+    if meta is None:
+        raise FileNotFoundError(f"No se encontró el dataset: {DATASET_DIR}")
+
+    n = meta["num_manos"]
+    salida = {}
+    for columna in meta["columnas"] if columnas is None else columnas:
+        spec = meta["columnas"].get(columna)
+        if spec is None:
+            raise KeyError(f"Columna desconocida: {columna}")
+        forma = (n, *spec["forma"])
+        if n == 0:
+            salida[columna] = np.empty(forma, dtype=spec["dtype"])
+        else:
+            salida[columna] = np.memmap(meta["dir"] / f"{columna}.bin", dtype=spec["dtype"], mode="r", shape=forma)
+    return salida
+
+
+def decodificar_columna(columna, datos, meta):
+    """Valores Python (como en el JSON original) de un tramo de columna."""
+    dic = meta["diccionarios"].get(columna)
+
+    if columna in ("cartas_usuario", "cartas_comunitarias"):
+        return [[ID_A_CARTA[c] for c in fila if c != VACIO] for fila in datos.tolist()]
+    if columna == "jugadores_mesa":
+        return [[dic[j] for j in fila if j != VACIO] for fila in datos.tolist()]
+    if columna == "rondas":
+        return [
+            [
+                {"nombre": nombre, "acciones": [dic[r >> 2], dic[r & 3]]}
+                for nombre, r in zip(meta["rondas"], fila) if r != VACIO
+            ]
+            for fila in datos.tolist()
+        ]
+    if dic is not None:
+        return np.array(dic, dtype=object)[np.asarray(datos, dtype=np.intp)].tolist()
+    if columna.startswith("puntos_estrategia."):
+        # float32 -> los mismos decimales que se guardaron
+        return np.round(np.asarray(datos, dtype=np.float64), 4).tolist()
+    return datos.tolist()
+
+
+def _manos_columnar(meta, tam_bloque):
+    cols = cargar_columnas(list(COLUMNAS), meta)
+    for inicio in range(0, meta["num_manos"], tam_bloque):
+        tramo = {c: decodificar_columna(c, a[inicio:inicio + tam_bloque], meta) for c, a in cols.items()}
+        for i in range(len(tramo["mano_id"])):
+            yield {
+                "mano_id": tramo["mano_id"][i],
+                "usuario_id": tramo["usuario_id"][i],
+                "jugadores_mesa": tramo["jugadores_mesa"][i],
+                "posicion_usuario": tramo["posicion_usuario"][i],
+                "cartas_usuario": tramo["cartas_usuario"][i],
+                "cartas_comunitarias": tramo["cartas_comunitarias"][i],
+                "categoria_mano_usuario": tramo["categoria_mano_usuario"][i],
+                "resultado_usuario": tramo["resultado_usuario"][i],
+                "bote_final": tramo["bote_final"][i],
+                "ganancia_usuario": tramo["ganancia_usuario"][i],
+                "puntos_estrategia": {
+                    "agresividad": tramo["puntos_estrategia.agresividad"][i],
+                    "riesgo": tramo["puntos_estrategia.riesgo"][i],
+                },
+                "rondas": tramo["rondas"][i],
+            }
+
+
+# ======================================================
+# LECTURA POR MANOS (CUALQUIER FORMATO)
+# ======================================================
+def iterar_manos(path=None, tam_bloque=TAM_BLOQUE):
+    """Recorre las manos del dataset una a una, como dicts (vacío si no hay dataset)."""
+    path = Path(path) if path is not None else ruta_dataset()
+    if path is None or not path.exists():
+        return
+
+    if path.is_dir():
+        meta = leer_meta(path)
+        if meta is not None:
+            yield from _manos_columnar(meta, tam_bloque)
+        return
+
+    if path.suffix == ".json":
+        # Formato antiguo: una sola lista JSON, no se puede leer por partes
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for linea in f:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def iterar_bloques(tam_bloque=TAM_BLOQUE, path=None):
+    """Como `iterar_manos`, pero en listas de hasta `tam_bloque` manos."""
+    manos = iterar_manos(path, tam_bloque)
+    while True:
+        bloque = list(islice(manos, tam_bloque))
+        if not bloque:
+            return
+        yield bloque
+
+
+# ======================================================
+# CONVERSIÓN DESDE JSON / NDJSON
+# ======================================================
+def diccionarios_vacios():
+    """Diccionarios para codificar manos; las acciones tienen orden fijo (2 bits)."""
+    diccionarios = {c: [] for c, (_, _, dic) in COLUMNAS.items() if dic}
+    diccionarios["rondas"] = list(ACCIONES)
+    return diccionarios
+
+
+def _codigo(diccionario, valor):
+    try:
+        return diccionario.index(valor)
+    except ValueError:
+        diccionario.append(valor)
+        return len(diccionario) - 1
+
+
+def _fila(valores, largo):
+    return list(valores) + [VACIO] * (largo - len(valores))
+
+
+def codificar_manos(manos, diccionarios):
+    """Lista de manos (dicts) -> bloque columnar; agrega a `diccionarios` los valores nuevos."""
+    acciones = diccionarios["rondas"]
+    bloque = {c: [] for c in COLUMNAS}
+
+    for m in manos:
+        estrategia = m.get("puntos_estrategia") or {}
+        rondas = m.get("rondas") or []
+        if len(rondas) > len(RONDAS) or any(len(r["acciones"]) != 2 for r in rondas):
+            raise ValueError(f"Mano {m.get('mano_id')}: se esperaban hasta 4 rondas de 2 acciones")
+
+        bloque["mano_id"].append(m["mano_id"])
+        bloque["usuario_id"].append(_codigo(diccionarios["usuario_id"], m["usuario_id"]))
+        bloque["jugadores_mesa"].append(_fila([_codigo(diccionarios["jugadores_mesa"], j) for j in m["jugadores_mesa"]], 9))
+        bloque["posicion_usuario"].append(_codigo(diccionarios["posicion_usuario"], m["posicion_usuario"]))
+        bloque["cartas_usuario"].append(_fila([CARTA_A_ID[c] for c in m["cartas_usuario"]], 2))
+        bloque["cartas_comunitarias"].append(_fila([CARTA_A_ID[c] for c in m["cartas_comunitarias"]], 5))
+        bloque["categoria_mano_usuario"].append(_codigo(diccionarios["categoria_mano_usuario"], m["categoria_mano_usuario"]))
+        bloque["resultado_usuario"].append(_codigo(diccionarios["resultado_usuario"], m["resultado_usuario"]))
+        bloque["bote_final"].append(m["bote_final"])
+        bloque["ganancia_usuario"].append(m["ganancia_usuario"])
+        bloque["puntos_estrategia.agresividad"].append(estrategia.get("agresividad", 0.0))
+        bloque["puntos_estrategia.riesgo"].append(estrategia.get("riesgo", 0.0))
+        bloque["rondas"].append(_fila([
+            _codigo(acciones, r["acciones"][0]) << 2 | _codigo(acciones, r["acciones"][1]) for r in rondas
+        ], len(RONDAS)))
+
+    if len(acciones) > len(ACCIONES):
+        raise ValueError("Las rondas admiten a lo sumo 4 acciones distintas")
+    if any(len(v) >= VACIO for v in diccionarios.values()):
+        raise ValueError("Demasiados valores distintos en una columna codificada")
+    return {c: np.array(v, dtype=COLUMNAS[c][0]).reshape(-1, *COLUMNAS[c][1]) for c, v in bloque.items()}
+
+
+def convertir_legacy(origen=None, destino=DATASET_DIR, tam_bloque=TAM_BLOQUE):
+    """Convierte poker_dataset.json / .ndjson al formato columnar. Devuelve la versión."""
+    if origen is None:
+        origen = NDJSON_PATH if NDJSON_PATH.exists() else LEGACY_PATH
+    if not Path(origen).exists():
+        raise FileNotFoundError(f"No se encontró el archivo: {origen}")
+
+    with _bloqueo_escritura(Path(destino)):
+        return _convertir(Path(origen), Path(destino), tam_bloque)
+
+
+def _convertir(origen, destino, tam_bloque):
+    diccionarios = diccionarios_vacios()
+    bloques = (codificar_manos(b, diccionarios) for b in iterar_bloques(tam_bloque, origen))
+    return _escribir_dataset(bloques, diccionarios, destino, {"origen": origen.name})
+
+
+# ======================================================
+# ANEXAR MANOS
+# ======================================================
+def _texto(valor, campo, validos=None):
+    if not isinstance(valor, str) or not valor:
+        raise ValueError(f"{campo} debe ser un texto no vacío")
+    if validos is not None and valor not in validos:
+        raise ValueError(f"{campo} no válido: {valor!r} (se espera uno de: {', '.join(validos)})")
+    return valor
+
+
+def _entero(valor, campo, dtype):
+    """Entero que entra en la columna `dtype` (si no, no se podría guardar)."""
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{campo} debe ser un entero") from None
+    limites = np.iinfo(dtype)
+    if not limites.min <= valor <= limites.max:
+        raise ValueError(f"{campo} fuera de rango ({dtype}): {valor}")
+    return valor
+
+
+def _real(valor, campo):
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{campo} debe ser un número") from None
+    if not np.isfinite(valor):
+        raise ValueError(f"{campo} debe ser un número finito")
+    return valor
+
+
+def _lista(valor, campo):
+    if not isinstance(valor, list):
+        raise ValueError(f"{campo} debe ser una lista")
+    return valor
+
+
+def _rondas(rondas):
+    for r in _lista(rondas, "rondas"):
+        acciones = r.get("acciones") if isinstance(r, dict) else None
+        if not isinstance(acciones, list) or len(acciones) != 2 \
+                or not all(isinstance(a, str) and a in ACCIONES for a in acciones):
+            raise ValueError(f"Cada ronda debe tener 2 acciones de: {', '.join(ACCIONES)}")
+    return rondas
+
+
+def completar_mano(mano, mano_id):
+    """
+    Valida una mano que llega por la API y completa lo opcional: mano_id,
+    usuario, mesa, comunitarias, categoría (se evalúa con las cartas),
+    ganancia (± bote según el resultado), puntos de estrategia y rondas.
+    Cada valor se comprueba contra el tipo de su columna (textos de los
+    diccionarios conocidos, enteros que entran en int32), así una mano
+    inválida se rechaza entera antes de escribir nada.
+    """
+    try:
+        cartas_usuario = _lista(mano["cartas_usuario"], "cartas_usuario")
+        cartas_comunitarias = _lista(mano.get("cartas_comunitarias") or [], "cartas_comunitarias")
+        resultado = _texto(mano["resultado_usuario"], "resultado_usuario", ("gano", "perdio"))
+        bote = _entero(mano["bote_final"], "bote_final", COLUMNAS["bote_final"][0])
+        posicion = _texto(mano["posicion_usuario"], "posicion_usuario", POSICIONES)
+    except KeyError as e:
+        raise ValueError(f"Falta el campo {e} en la mano") from None
+
+    if len(cartas_usuario) != 2 or len(cartas_comunitarias) > 5:
+        raise ValueError("Se esperan 2 cartas del usuario y hasta 5 comunitarias")
+    cartas = cartas_usuario + cartas_comunitarias
+    if any(not isinstance(c, str) or c not in CARTA_A_ID for c in cartas) or len(set(cartas)) != len(cartas):
+        raise ValueError(f"Cartas inválidas o repetidas: {cartas}")
+    if bote < 0:
+        raise ValueError("bote_final no puede ser negativo")
+
+    usuario = _texto(mano.get("usuario_id", "Jugador_1"), "usuario_id")
+    jugadores = _lista(mano.get("jugadores_mesa") or [usuario], "jugadores_mesa")[:9]
+    for jugador in jugadores:
+        _texto(jugador, "jugadores_mesa")
+    categoria = mano.get("categoria_mano_usuario")
+    if categoria is None:
+        categoria = nombre_categoria(evaluar(codificar(cartas)))
+    estrategia = mano.get("puntos_estrategia") or {}
+    if not isinstance(estrategia, dict):
+        raise ValueError("puntos_estrategia debe ser un objeto")
+
+    return {
+        "mano_id": _entero(mano.get("mano_id", mano_id), "mano_id", COLUMNAS["mano_id"][0]),
+        "usuario_id": usuario,
+        "jugadores_mesa": list(jugadores),
+        "posicion_usuario": posicion,
+        "cartas_usuario": cartas_usuario,
+        "cartas_comunitarias": cartas_comunitarias,
+        "categoria_mano_usuario": _texto(categoria, "categoria_mano_usuario", list(CATEGORIAS.values())),
+        "resultado_usuario": resultado,
+        "bote_final": bote,
+        "ganancia_usuario": _entero(
+            mano.get("ganancia_usuario", bote if resultado == "gano" else -bote),
+            "ganancia_usuario", COLUMNAS["ganancia_usuario"][0],
+        ),
+        "puntos_estrategia": {
+            "agresividad": _real(estrategia.get("agresividad", 0.0), "puntos_estrategia.agresividad"),
+            "riesgo": _real(estrategia.get("riesgo", 0.0), "puntos_estrategia.riesgo"),
+        },
+        "rondas": _rondas(mano.get("rondas") or []),
+    }
+
+
+def anexar_manos(manos, path=DATASET_DIR):
+    """
+    Agrega manos al final de la versión vigente, escribiendo solo las filas
+    nuevas en cada columna (O(manos nuevas)). Si no hay dataset columnar se
+    crea (convirtiendo el JSON antiguo, si lo hay). Todo el lote se valida
+    antes de tocar los archivos: si una mano es inválida no se escribe
+    ninguna. Devuelve (manos completadas, meta actualizado).
+    """
+    base = Path(path)
+    # mano_id provisorio: el definitivo depende del dataset (dentro del bloqueo)
+    completas = [completar_mano(m, 0) for m in manos]
+    with _bloqueo_escritura(base):
+        meta = leer_meta(base)
+        if meta is None:
+            if base == DATASET_DIR and (NDJSON_PATH.exists() or LEGACY_PATH.exists()):
+                _convertir(NDJSON_PATH if NDJSON_PATH.exists() else LEGACY_PATH, base, TAM_BLOQUE)
+            else:
+                _escribir_dataset([], diccionarios_vacios(), base, None)
+            meta = leer_meta(base)
+
+        siguiente = meta.get("ultimo_mano_id", meta["num_manos"]) + 1
+        for i, (mano, completa) in enumerate(zip(manos, completas)):
+            if "mano_id" not in mano:
+                completa["mano_id"] = siguiente + i
+        if not completas:
+            return completas, meta
+
+        diccionarios = {k: list(v) for k, v in meta["diccionarios"].items()}
+        bloque = codificar_manos(completas, diccionarios)
+
+        # Se escribe desde la última fila válida: si una escritura anterior
+        # quedó a medias, sus bytes sobrantes se pisan. Las columnas derivadas
+        # quedan en NaN para las manos nuevas (sin calcular).
+        n = meta["num_manos"]
+        for columna, spec in meta["columnas"].items():
+            dtype, forma = spec["dtype"], tuple(spec["forma"])
+            datos = bloque.get(columna)
+            if datos is None:
+                datos = np.full((len(completas), *forma), np.nan, dtype=dtype)
+            ancho = np.dtype(dtype).itemsize * int(np.prod(forma, dtype=np.int64))
+            ruta = meta["dir"] / f"{columna}.bin"
+            with open(ruta, "r+b" if ruta.exists() else "wb") as f:
+                f.seek(n * ancho)
+                f.write(np.ascontiguousarray(datos, dtype=dtype).tobytes())
+                f.truncate()
+
+        meta["num_manos"] = n + len(completas)
+        meta["ultimo_mano_id"] = max(siguiente - 1, max(m["mano_id"] for m in completas))
+        meta["diccionarios"] = diccionarios
+        _guardar_meta(meta, meta["dir"])
+    return completas, meta
+
+
+# ======================================================
+# COLUMNAS DERIVADAS
+# ======================================================
+def abrir_derivadas(columnas, reiniciar=False, path=DATASET_DIR):
+    """
+    Abre para escritura (np.memmap r+) columnas derivadas {nombre: (dtype,
+    forma, _)} de la versión vigente, con una fila por mano. Las que no
+    existan (o todas, con `reiniciar`) se llenan de NaN y se registran en el
+    meta.json. Devuelve (meta, {columna: memmap}).
+    """
+    base = Path(path)
+    with _bloqueo_escritura(base):
+        meta = leer_meta(base)
+        if meta is None:
+            raise FileNotFoundError(f"No se encontró el dataset: {base}")
+        n = meta["num_manos"]
+        nuevas = [c for c in columnas if reiniciar or c not in meta["columnas"]]
+        for columna in nuevas:
+            dtype, forma, _ = columnas[columna]
+            with open(meta["dir"] / f"{columna}.bin", "wb") as f:
+                f.write(np.full((n, *forma), np.nan, dtype=dtype).tobytes())
+            meta["columnas"][columna] = {"dtype": dtype, "forma": list(forma)}
+        if nuevas:
+            meta["revision"] = meta.get("revision", 0) + 1
+            _guardar_meta(meta, meta["dir"])
+
+    abiertas = {
+        c: np.memmap(meta["dir"] / f"{c}.bin", dtype=d, mode="r+", shape=(n, *f)) if n else None
+        for c, (d, f, _) in columnas.items()
+    }
+    return meta, abiertas
+
+
+def actualizar_meta(version, cambios, path=DATASET_DIR, subir_revision=True):
+    """
+    Agrega `cambios` al meta.json de `version` y sube su revisión (así cambia
+    la firma del dataset y se invalidan las cachés). Con `subir_revision`
+    False solo guarda los cambios (p. ej. progreso), sin invalidar nada.
+    Devuelve False si esa versión ya no es la vigente.
+    """
+    base = Path(path)
+    with _bloqueo_escritura(base):
+        meta = leer_meta(base)
+        if meta is None or meta["version"] != version:
+            return False
+        meta.update(cambios)
+        if subir_revision:
+            meta["revision"] = meta.get("revision", 0) + 1
+        _guardar_meta(meta, meta["dir"])
+    return True
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte el dataset JSON/NDJSON al formato columnar.")
+    parser.add_argument("origen", nargs="?", default=None)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    version = convertir_legacy(args.origen)
+    print(f"Dataset convertido en {DATASET_DIR} (versión {version}, {time.perf_counter() - inicio:.1f} s)")
@@ -0,0 +1,207 @@
+"""
+Equity calle por calle de las manos guardadas (cálculo offline).
+
+Para cada mano del dataset columnar se calcula la equity del usuario en
+preflop, flop, turn y river contra tantos rivales aleatorios como jugadores
+había en la mesa, con el mismo motor que /api/analizar-fases
+(`analyzer.desglose_equity`: tabla preflop, enumeración exacta o Monte
+Carlo). Los resultados se guardan como columnas nuevas de la versión vigente
+(equity.preflop, equity.flop, ...; NaN = sin calcular) y las estadísticas las
+leen de ahí, sin simular en cada petición.
+
+Las manos se reparten por tramos en un pool de procesos y se escriben en
+orden; tras cada tramo el meta.json guarda hasta qué fila está hecho, así una
+corrida interrumpida (o las manos anexadas después) sigue desde ahí. Cada
+tramo tiene su propia semilla, derivada de `seed` y su número: el resultado
+no depende de los procesos ni de las interrupciones.
+
+Guardar el progreso no sube la revisión del dataset (no invalida las cachés
+de los workers en cada tramo): se sube una vez al terminar la corrida, o al
+cortarse con tramos nuevos ya escritos.
+
+Desde backend/:
+    python -m utils.equity_dataset --procesos 4 --muestras 1000
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .analyzer import MAX_RIVALES, desglose_equity
+from .dataset import (
+    COLUMNAS_EQUITY,
+    LEGACY_PATH,
+    NDJSON_PATH,
+    VACIO,
+    abrir_derivadas,
+    actualizar_meta,
+    cargar_columnas,
+    convertir_legacy,
+    leer_meta,
+)
+from .evaluator import ID_A_CARTA
+
+# Cartas comunitarias vistas en cada calle (mismo orden que COLUMNAS_EQUITY)
+CARTAS_CALLE = (0, 3, 4, 5)
+
+# Manos por tramo: define las semillas y cada cuánto se guarda el progreso
+TAM_TRAMO = 2000
+MUESTRAS = 1000
+SEED = 2024
+PROCESOS = int(os.environ.get("EQUITY_PROCESOS", os.cpu_count() or 1))
+
+
+class VersionCambiada(Exception):
+    pass
+
+
+# ======================================================
+# CÁLCULO DE UN TRAMO
+# ======================================================
+def rivales_mesa(jugadores):
+    """Rivales de cada mano (jugadores sentados menos el usuario), entre 1 y MAX_RIVALES."""
+    sentados = np.count_nonzero(np.asarray(jugadores) != VACIO, axis=1)
+    return np.clip(sentados - 1, 1, MAX_RIVALES)
+
+
+def equity_manos(cartas_usuario, comunitarias, rivales, muestras, rng):
+    """
+    Equity (n, 4) de cada mano en cada calle; NaN en las calles que la mano
+    no llegó a ver (menos de 5 comunitarias).
+    """
+    equities = np.full((len(cartas_usuario), len(CARTAS_CALLE)), np.nan, dtype=np.float32)
+    for i, (user, mesa, r) in enumerate(zip(cartas_usuario.tolist(), comunitarias.tolist(), rivales.tolist())):
+        user = [ID_A_CARTA[c] for c in user]
+        mesa = [ID_A_CARTA[c] for c in mesa if c != VACIO]
+        for j, vistas in enumerate(CARTAS_CALLE):
+            if vistas <= len(mesa):
+                equities[i, j] = desglose_equity(user, mesa[:vistas], n=muestras, seed=rng, rivales=r)["equity"]
+    return equities
+
+
+def _tramo(args):
+    inicio, cartas_usuario, comunitarias, rivales, muestras, semilla = args
+    rng = np.random.default_rng(semilla)
+    return inicio, equity_manos(cartas_usuario, comunitarias, rivales, muestras, rng)
+
+
+def _tareas(columnas, desde, hasta, tam_tramo, muestras, seed):
+    rivales = rivales_mesa(columnas["jugadores_mesa"][desde:hasta])
+    for inicio in range(desde, hasta, tam_tramo):
+        fin = min(inicio + tam_tramo, hasta)
+        yield (
+            inicio,
+            np.array(columnas["cartas_usuario"][inicio:fin]),
+            np.array(columnas["cartas_comunitarias"][inicio:fin]),
+            rivales[inicio - desde:fin - desde],
+            muestras,
+            np.random.SeedSequence(seed, spawn_key=(inicio // tam_tramo,)),
+        )
+
+
+def _tramos_en_orden(tareas, procesos):
+    """Resultados de los tramos en orden; a lo sumo 2 por proceso en vuelo."""
+    if procesos <= 1:
+        yield from map(_tramo, tareas)
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        en_vuelo = deque()
+        try:
+            for tarea in tareas:
+                en_vuelo.append(pool.submit(_tramo, tarea))
+                if len(en_vuelo) >= 2 * procesos:
+                    yield en_vuelo.popleft().result()
+            while en_vuelo:
+                yield en_vuelo.popleft().result()
+        finally:
+            # Si se corta antes, no se espera lo que falta
+            for futuro in en_vuelo:
+                futuro.cancel()
+
+
+# ======================================================
+# RELLENO DEL DATASET
+# ======================================================
+def calcular_equity(muestras=MUESTRAS, seed=SEED, procesos=PROCESOS, tam_tramo=TAM_TRAMO,
+                    reiniciar=False, progreso=None):
+    """
+    Calcula la equity de las manos de la versión vigente que aún no la
+    tienen y la guarda en las columnas COLUMNAS_EQUITY. Con otros
+    `muestras`/`seed`/`tam_tramo` que los de la corrida anterior, o con
+    `reiniciar`, se recalcula todo. `progreso(hechas, total)` se llama tras
+    cada tramo guardado. Devuelve un resumen.
+    """
+    if leer_meta() is None:
+        if not (NDJSON_PATH.exists() or LEGACY_PATH.exists()):
+            raise FileNotFoundError("No hay dataset")
+        convertir_legacy()
+
+    config = {"muestras": int(muestras), "seed": seed, "tam_tramo": int(tam_tramo)}
+    previo = leer_meta().get("equity")
+    reiniciar = reiniciar or previo is None or previo["config"] != config
+    meta, salida = abrir_derivadas(COLUMNAS_EQUITY, reiniciar)
+
+    n = meta["num_manos"]
+    hechas = 0 if reiniciar else min(previo["filas_hechas"], n)
+    if hechas == n:
+        return {"version": meta["version"], "num_manos": n, "calculadas": 0, "retomado_desde": n, "segundos": 0.0}
+    # Se retoma desde el inicio del tramo: con su semilla da lo mismo que sin cortes
+    desde = hechas // tam_tramo * tam_tramo
+    def guardar_progreso(filas_hechas):
+        cambios = {"equity": {"config": config, "filas_hechas": filas_hechas}}
+        if not actualizar_meta(meta["version"], cambios, subir_revision=False):
+            raise VersionCambiada("El dataset se regeneró durante el cálculo")
+
+    guardar_progreso(desde)
+
+    inicio_reloj = time.perf_counter()
+    columnas = cargar_columnas(["jugadores_mesa", "cartas_usuario", "cartas_comunitarias"], meta)
+    tareas = _tareas(columnas, desde, n, tam_tramo, config["muestras"], seed)
+    fin = desde
+    try:
+        for inicio, equities in _tramos_en_orden(tareas, procesos):
+            fin = inicio + len(equities)
+            for j, columna in enumerate(COLUMNAS_EQUITY):
+                salida[columna][inicio:fin] = equities[:, j]
+                salida[columna].flush()
+            guardar_progreso(fin)
+            if progreso is not None:
+                progreso(fin, n)
+    finally:
+        # Una sola invalidación por corrida: las cachés ven las columnas nuevas
+        if fin > desde:
+            actualizar_meta(meta["version"], {})
+
+    return {
+        "version": meta["version"],
+        "num_manos": n,
+        "calculadas": fin - desde,
+        "retomado_desde": desde,
+        "segundos": round(time.perf_counter() - inicio_reloj, 2),
+    }
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calcula la equity por calle de las manos guardadas.")
+    parser.add_argument("--muestras", type=int, default=MUESTRAS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--procesos", type=int, default=PROCESOS)
+    parser.add_argument("--tam-tramo", type=int, default=TAM_TRAMO)
+    parser.add_argument("--reiniciar", action="store_true", help="recalcular aunque haya progreso guardado")
+    args = parser.parse_args()
+
+    def mostrar(hechas, total):
+        print(f"\r{hechas}/{total} manos", end="", flush=True)
+
+    resumen = calcular_equity(args.muestras, args.seed, args.procesos, args.tam_tramo, args.reiniciar, mostrar)
+    print(
+        f"\nEquity de {resumen['calculadas']} manos (desde la fila {resumen['retomado_desde']}) "
+        f"en {resumen['segundos']} s; versión {resumen['version']}"
+    )
@@ -0,0 +1,241 @@
+"""
+Evaluador de manos con cartas codificadas como enteros y tablas precalculadas.
+
+Cada carta es un entero 0..51 (rango * 4 + palo). El valor de una mano es un
+único entero comparable: categoría en los bits altos y los cinco rangos que
+deciden la mano (incluidos kickers) debajo, así que comparar dos manos es una
+sola comparación de enteros.
+"""
+from itertools import combinations_with_replacement
+
+import numpy as np
+
+VALORES = ["A","K","Q","J","10","9","8","7","6","5","4","3","2"]
+PALOS = ["♠","♥","♦","♣"]
+
+# Rango 0..12 -> "2".."A"
+RANGOS = ["2","3","4","5","6","7","8","9","10","J","Q","K","A"]
+
+CATEGORIAS = {
+    1: "Carta Alta",
+    2: "Par",
+    3: "Doble Par",
+    4: "Trío",
+    5: "Escalera",
+    6: "Color",
+    7: "Full",
+    8: "Póker",
+    9: "Escalera de Color",
+}
+
+BITS_CATEGORIA = 20
+
+# Peso de cada carta: dígito en base 5 para el rango (máx. 4 cartas por rango)
+# y dígito en base 8 para el palo, desplazado sobre los 31 bits del rango.
+BITS_RANGO = 31
+MASCARA_RANGO = (1 << BITS_RANGO) - 1
+
+PESO = [5 ** (c >> 2) + (8 ** (c & 3) << BITS_RANGO) for c in range(52)]
+BIT_RANGO = [1 << (c >> 2) for c in range(52)]
+
+# Bit propio de cada carta (13 bits por palo): la suma de varias cartas
+# distintas es el conjunto de cartas, de donde sale la máscara de un palo.
+BIT_CARTA = [1 << (13 * (c & 3) + (c >> 2)) for c in range(52)]
+
+
+# ======================================================
+# CODIFICACIÓN DE CARTAS
+# ======================================================
+CARTA_A_ID = {RANGOS[r] + PALOS[p]: r * 4 + p for r in range(13) for p in range(4)}
+ID_A_CARTA = [None] * 52
+for _carta, _id in CARTA_A_ID.items():
+    ID_A_CARTA[_id] = _carta
+
+
+def codificar(cartas):
+    """Convierte cartas "10♠" a enteros 0..51."""
+    return [CARTA_A_ID[c] for c in cartas]
+
+
+def decodificar(ids):
+    """Convierte enteros 0..51 a cartas "10♠"."""
+    return [ID_A_CARTA[i] for i in ids]
+
+
+def categoria(valor):
+    return valor >> BITS_CATEGORIA
+
+
+def nombre_categoria(valor):
+    return CATEGORIAS[valor >> BITS_CATEGORIA]
+
+
+# ======================================================
+# CONSTRUCCIÓN DE TABLAS
+# ======================================================
+def _codificar_valor(cat, rangos):
+    """Empaqueta categoría + hasta 5 rangos (2..14) en un entero."""
+    v = cat
+    for i in range(5):
+        v = (v << 4) | (rangos[i] if i < len(rangos) else 0)
+    return v
+
+
+def _escalera_alta(mascara):
+    """Rango (2..14) de la carta alta de la mejor escalera, o 0."""
+    for alta in range(12, 3, -1):
+        ventana = 0b11111 << (alta - 4)
+        if mascara & ventana == ventana:
+            return alta + 2
+    # Escalera baja A-2-3-4-5
+    if mascara & 0b1000000001111 == 0b1000000001111:
+        return 5
+    return 0
+
+
+def _valor_sin_color(conteos):
+    """Mejor mano posible (sin color) para un multiconjunto de rangos."""
+    mascara = 0
+    for r in range(13):
+        if conteos[r]:
+            mascara |= 1 << r
+
+    # Rangos (2..14) ordenados de mayor a menor, agrupados por repeticiones
+    grupos = {4: [], 3: [], 2: [], 1: []}
+    for r in range(12, -1, -1):
+        if conteos[r]:
+            grupos[conteos[r]].append(r + 2)
+    cuatro, tres, dos, uno = grupos[4], grupos[3], grupos[2], grupos[1]
+
+    def kickers(excluir, k):
+        resto = []
+        for r in range(12, -1, -1):
+            if conteos[r] and (r + 2) not in excluir:
+                resto.append(r + 2)
+        return resto[:k]
+
+    if cuatro:
+        q = cuatro[0]
+        return _codificar_valor(8, [q] + kickers({q}, 1))
+
+    if tres and (len(tres) >= 2 or dos):
+        t = tres[0]
+        pares = sorted(tres[1:] + dos, reverse=True)
+        return _codificar_valor(7, [t, pares[0]])
+
+    alta = _escalera_alta(mascara)
+    if alta:
+        return _codificar_valor(5, [alta])
+
+    if tres:
+        t = tres[0]
+        return _codificar_valor(4, [t] + kickers({t}, 2))
+
+    if len(dos) >= 2:
+        p1, p2 = dos[0], dos[1]
+        return _codificar_valor(3, [p1, p2] + kickers({p1, p2}, 1))
+
+    if dos:
+        p = dos[0]
+        return _codificar_valor(2, [p] + kickers({p}, 3))
+
+    return _codificar_valor(1, uno[:5])
+
+
+def _valor_color(mascara):
+    """Mejor mano para los rangos (máscara de 13 bits) de un mismo palo."""
+    alta = _escalera_alta(mascara)
+    if alta:
+        return _codificar_valor(9, [alta])
+    rangos = [r + 2 for r in range(12, -1, -1) if mascara >> r & 1]
+    return _codificar_valor(6, rangos[:5])
+
+
+def _construir_tablas():
+    # Todos los multiconjuntos de 1..7 rangos con como máximo 4 cartas por rango
+    valores_rango = {}
+    for k in range(1, 8):
+        for combo in combinations_with_replacement(range(13), k):
+            conteos = [0] * 13
+            for r in combo:
+                conteos[r] += 1
+            if max(conteos) > 4:
+                continue
+            clave = sum(5 ** r for r in combo)
+            valores_rango[clave] = _valor_sin_color(conteos)
+
+    valores_color = [0] * 8192
+    for mascara in range(8192):
+        if bin(mascara).count("1") >= 5:
+            valores_color[mascara] = _valor_color(mascara)
+
+    # Clave de palos (dígitos en base 8) -> palo con 5+ cartas, o -1
+    palo_color = [-1] * 4096
+    for clave in range(4096):
+        for p in range(4):
+            if (clave >> (3 * p)) & 7 >= 5:
+                palo_color[clave] = p
+
+    return valores_rango, valores_color, palo_color
+
+
+VALOR_RANGOS, VALOR_COLOR, PALO_COLOR = _construir_tablas()
+
+# Versiones NumPy de las mismas tablas para evaluar lotes de manos
+PESO_NP = np.array(PESO, dtype=np.int64)
+BIT_CARTA_NP = np.array(BIT_CARTA, dtype=np.int64)
+CLAVES_RANGO_NP = np.array(sorted(VALOR_RANGOS), dtype=np.int64)
+VALOR_RANGOS_NP = np.array([VALOR_RANGOS[k] for k in CLAVES_RANGO_NP.tolist()], dtype=np.int32)
+VALOR_COLOR_NP = np.array(VALOR_COLOR, dtype=np.int32)
+PALO_COLOR_NP = np.array(PALO_COLOR, dtype=np.int8)
+
+
+# ======================================================
+# EVALUACIÓN
+# ======================================================
+def evaluar(cartas):
+    """Valor comparable de una mano de 1 a 7 cartas codificadas como enteros."""
+    s = 0
+    for c in cartas:
+        s += PESO[c]
+    palo = PALO_COLOR[s >> BITS_RANGO]
+    if palo < 0:
+        return VALOR_RANGOS[s & MASCARA_RANGO]
+
+    mascara = 0
+    for c in cartas:
+        if c & 3 == palo:
+            mascara |= BIT_RANGO[c]
+    return max(VALOR_COLOR[mascara], VALOR_RANGOS[s & MASCARA_RANGO])
+
+
+def evaluar_cartas(cartas):
+    """Adaptador para cartas en texto ("10♠", "A♥", ...)."""
+    return evaluar([CARTA_A_ID[c] for c in cartas])
+
+
+def evaluar_sumas(sumas, conjuntos):
+    """
+    Valores a partir de la suma de PESO y la suma de BIT_CARTA de cada mano.
+    Permite evaluar de forma incremental: la parte común (la mesa) se suma
+    una sola vez y se combina con la de cada mano.
+    """
+    idx = np.searchsorted(CLAVES_RANGO_NP, sumas & MASCARA_RANGO)
+    valores = VALOR_RANGOS_NP[idx]
+
+    palo = PALO_COLOR_NP[sumas >> BITS_RANGO].astype(np.int64)
+    filas = np.flatnonzero(palo >= 0)
+    if filas.size:
+        mascara = (conjuntos[filas] >> (13 * palo[filas])) & 0x1FFF
+        valores[filas] = np.maximum(valores[filas], VALOR_COLOR_NP[mascara])
+
+    return valores
+
+
+def evaluar_lote(cartas):
+    """
+    Evalúa n manos a la vez. `cartas` es un array (n, k) de enteros 0..51
+    (1 <= k <= 7); devuelve un array (n,) de valores comparables.
+    """
+    cartas = np.asarray(cartas)
+    return evaluar_sumas(PESO_NP[cartas].sum(axis=1), BIT_CARTA_NP[cartas].sum(axis=1))
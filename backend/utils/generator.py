@@ -1,109 +1,177 @@
-import json
-import random
-import math
-from pathlib import Path
+"""
+Generador del dataset simulado de manos.
+
+Las manos se generan vectorizadas con NumPy en bloques de TAM_BLOQUE_GEN.
+Cada bloque tiene su propia semilla (SeedSequence.spawn), así que con una
+misma `seed` el dataset es idéntico sin importar cuántos procesos trabajen.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .dataset import ACCIONES, DATASET_DIR, POSICIONES, RONDAS, VACIO, escribir_dataset
+from .evaluator import BITS_CATEGORIA, CATEGORIAS, evaluar_lote
+from .simulator import sortear
+
+JUGADORES = [f"Jugador_{i}" for i in range(1,10)]
+
+# Manos por bloque: define cómo se reparten las semillas, no depende de los procesos
+TAM_BLOQUE_GEN = 50_000
+PROCESOS_GEN = int(os.environ.get("GENERADOR_PROCESOS", os.cpu_count() or 1))
+
+MAZO_NP = np.arange(52)
+
+
+# ======================================================
+# GENERACIÓN VECTORIZADA
+# ======================================================
+def generar_bloque(rng, n, usuario_id="Jugador_1"):
+    """
+    Genera n manos como arrays: jugadores (n, 9) con VACIO de relleno, índice del
+    usuario en la mesa, cartas (n, 7), categoría, acciones (n, 4, 2), bote,
+    agresividad, riesgo y resultado.
+    """
+    otros = [j for j in JUGADORES if j != usuario_id]
+    id_usuario = len(otros)
+
+    num_jug = rng.integers(2, 10, n)
+    # Rivales en orden aleatorio y el usuario en una posición uniforme de la mesa
+    orden_otros = np.argsort(rng.random((n, len(otros))), axis=1)[:, :8]
+    idx_usuario = (rng.random(n) * num_jug).astype(np.int64)
+
+    # Asiento j: rival j antes del usuario, rival j-1 después
+    cols = np.arange(9)
+    fuente = np.clip(cols - (cols > idx_usuario[:, None]), 0, 7)
+    jugadores = np.take_along_axis(orden_otros, fuente, axis=1)
+    jugadores[cols == idx_usuario[:, None]] = id_usuario
+    jugadores[cols >= num_jug[:, None]] = VACIO
+
+    cartas = sortear(rng, MAZO_NP, n, 7)
+    categoria = evaluar_lote(cartas) >> BITS_CATEGORIA
+
+    return {
+        "jugadores": jugadores.astype(np.uint8),
+        "posicion": idx_usuario.astype(np.int8),
+        "cartas": cartas.astype(np.uint8),
+        "categoria": categoria.astype(np.int8),
+        "acciones": rng.integers(0, len(ACCIONES), (n, len(RONDAS), 2), dtype=np.int8),
+        "bote": rng.integers(80, 901, n),
+        "agresividad": np.round(rng.random(n), 2),
+        "riesgo": np.round(rng.random(n), 2),
+        "gano": rng.random(n) < 0.45,
+    }
 
-DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "poker_dataset.json"
 
-VALORES = ["A","K","Q","J","10","9","8","7","6","5","4","3","2"]
-PALOS = ["♠","♥","♦","♣"]
-MAZO = [v+p for v in VALORES for p in PALOS]
+# ======================================================
+# FORMATO DE DATASET
+# ======================================================
+def columnas_de_bloque(bloque, inicio=1):
+    """Bloque de generar_bloque -> columnas del formato de dataset (ver utils.dataset)."""
+    n = len(bloque["bote"])
+    acciones = bloque["acciones"].astype(np.uint8)
+    return {
+        "mano_id": np.arange(inicio, inicio + n),
+        "usuario_id": np.zeros(n, dtype=np.uint8),
+        "jugadores_mesa": bloque["jugadores"],
+        "posicion_usuario": bloque["posicion"],
+        "cartas_usuario": bloque["cartas"][:, :2],
+        "cartas_comunitarias": bloque["cartas"][:, 2:],
+        "categoria_mano_usuario": bloque["categoria"] - 1,
+        "resultado_usuario": bloque["gano"],
+        "bote_final": bloque["bote"],
+        "ganancia_usuario": np.where(bloque["gano"], bloque["bote"], -bloque["bote"]),
+        "puntos_estrategia.agresividad": bloque["agresividad"],
+        "puntos_estrategia.riesgo": bloque["riesgo"],
+        "rondas": acciones[:, :, 0] << 2 | acciones[:, :, 1],
+    }
 
-def evaluar_mano(cartas_usuario, cartas_comunitarias):
-    valores = [c[:-1] for c in cartas_usuario + cartas_comunitarias]
-    palos = [c[-1] for c in cartas_usuario + cartas_comunitarias]
 
-    valor_map = {
-        "A": 14, "K": 13, "Q": 12, "J": 11,
-        "10": 10, "9": 9, "8": 8, "7": 7,
-        "6": 6, "5": 5, "4": 4, "3": 3, "2": 2
+def diccionarios_generados(usuario_id):
+    """Diccionarios de las columnas codificadas que produce columnas_de_bloque."""
+    return {
+        "usuario_id": [usuario_id],
+        "jugadores_mesa": [j for j in JUGADORES if j != usuario_id] + [usuario_id],
+        "posicion_usuario": POSICIONES,
+        "categoria_mano_usuario": [CATEGORIAS[c] for c in range(1, 10)],
+        "resultado_usuario": ["perdio","gano"],
+        "rondas": ACCIONES,
     }
 
-    nums = sorted([valor_map[v] for v in valores], reverse=True)
-    par = len(nums) != len(set(nums))
-    doble_par = len(nums) - len(set(nums)) >= 2
-    trio = any(nums.count(n) == 3 for n in nums)
-    color = any(palos.count(p) >= 5 for p in palos)
-
-    unique_nums = sorted(list(set(nums)))
-    if 14 in unique_nums:
-        unique_nums.insert(0,1)
-
-    escalera = False
-    for i in range(len(unique_nums)-4):
-        if all(unique_nums[i+k]==unique_nums[i]+k for k in range(5)):
-            escalera=True
-
-    if color and escalera: return "Escalera de Color"
-    if any(nums.count(n)==4 for n in nums): return "Póker"
-    if trio and par: return "Full"
-    if color: return "Color"
-    if escalera: return "Escalera"
-    if trio: return "Trío"
-    if doble_par: return "Doble Par"
-    if par: return "Par"
-    return "Carta Alta"
-
-
-def generar_dataset(num_manos=5000, usuario_id="Jugador_1"):
-    posiciones_reales = ["SB","BB","UTG","UTG+1","MP","LJ","HJ","CO","BTN"]
-    jugadores_posibles = [f"Jugador_{i}" for i in range(1,10)]
-    dataset = []
-
-    for mano_id in range(1, num_manos+1):
-        num_jug = random.randint(2,9)
-        jugadores = random.sample(jugadores_posibles, num_jug)
-
-        if usuario_id not in jugadores:
-            jugadores[random.randint(0,num_jug-1)] = usuario_id
-
-        posiciones = posiciones_reales[:num_jug]
-        random.shuffle(jugadores)
-        pos_map = {jug:pos for jug,pos in zip(jugadores,posiciones)}
-        pos_usuario = pos_map[usuario_id]
-
-        mazo = MAZO.copy()
-        random.shuffle(mazo)
-
-        cartas_usuario = mazo[:2]
-        cartas_com = mazo[2:7]
-
-        rondas = [
-            {"nombre": "Preflop", "acciones": random.choices(["check","call","raise","fold"], k=2)},
-            {"nombre": "Flop",    "acciones": random.choices(["check","call","raise","fold"], k=2)},
-            {"nombre": "Turn",    "acciones": random.choices(["check","call","raise","fold"], k=2)},
-            {"nombre": "River",   "acciones": random.choices(["check","call","raise","fold"], k=2)},
-        ]
-
-        bote = random.randint(80,900)
-
-        agres = round(random.uniform(0,1),2)
-        riesgo = round(random.uniform(0,1),2)
-
-        categoria = evaluar_mano(cartas_usuario, cartas_com)
-
-        gano = random.random() < 0.45
-
-        dataset.append({
-            "mano_id": mano_id,
-            "usuario_id": usuario_id,
-            "jugadores_mesa": jugadores,
-            "posicion_usuario": pos_usuario,
-            "cartas_usuario": cartas_usuario,
-            "cartas_comunitarias": cartas_com,
-            "categoria_mano_usuario": categoria,
-            "resultado_usuario": "gano" if gano else "perdio",
-            "bote_final": bote,
-            "ganancia_usuario": bote if gano else -bote,
-            "puntos_estrategia": {
-                "agresividad": agres,
-                "riesgo": riesgo
-            },
-            "rondas": rondas
-        })
-
-    DATA_PATH.parent.mkdir(exist_ok=True)
-    with open(DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(dataset,f,indent=4,ensure_ascii=False)
-
-    return {"status":"ok","mensaje":"Dataset generado correctamente"}
+
+def _columnas_bloque(args):
+    inicio, n, semilla, usuario_id = args
+    bloque = generar_bloque(np.random.default_rng(semilla), n, usuario_id)
+    return columnas_de_bloque(bloque, inicio)
+
+
+# ======================================================
+# GENERACIÓN EN PARALELO
+# ======================================================
+def _tareas(num_manos, seed, usuario_id):
+    semillas = np.random.SeedSequence(seed).spawn(-(-num_manos // TAM_BLOQUE_GEN))
+    for b, semilla in enumerate(semillas):
+        inicio = b * TAM_BLOQUE_GEN
+        yield inicio + 1, min(TAM_BLOQUE_GEN, num_manos - inicio), semilla, usuario_id
+
+
+def _bloques_en_orden(tareas, procesos):
+    """Bloques de columnas en orden; a lo sumo 2 por proceso en vuelo."""
+    if procesos <= 1:
+        yield from map(_columnas_bloque, tareas)
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        en_vuelo = deque()
+        try:
+            for tarea in tareas:
+                en_vuelo.append(pool.submit(_columnas_bloque, tarea))
+                if len(en_vuelo) >= 2 * procesos:
+                    yield en_vuelo.popleft().result()
+            while en_vuelo:
+                yield en_vuelo.popleft().result()
+        finally:
+            # Si se corta antes (cancelación), no se espera lo que falta
+            for futuro in en_vuelo:
+                futuro.cancel()
+
+
+class GeneracionCancelada(Exception):
+    pass
+
+
+def _con_progreso(bloques, num_manos, progreso, cancelado):
+    hechas = 0
+    try:
+        for bloque in bloques:
+            if cancelado is not None and cancelado.is_set():
+                raise GeneracionCancelada()
+            yield bloque
+            hechas += len(bloque["mano_id"])
+            if progreso is not None:
+                progreso(hechas, num_manos)
+    finally:
+        bloques.close()
+
+
+def generar_dataset(num_manos=5000, usuario_id="Jugador_1", seed=None, procesos=PROCESOS_GEN,
+                    progreso=None, cancelado=None):
+    """
+    Genera el dataset y lo escribe en formato columnar. Los bloques se generan
+    en paralelo y se escriben en orden (memoria acotada). `progreso(hechas,
+    total)` se llama tras cada bloque; si se marca el evento `cancelado` se
+    lanza GeneracionCancelada y el dataset anterior queda intacto.
+    """
+    num_manos = int(num_manos)
+    if num_manos < 1:
+        raise ValueError("num_manos debe ser al menos 1")
+
+    tareas = _tareas(num_manos, seed, usuario_id)
+    version = escribir_dataset(
+        _con_progreso(_bloques_en_orden(tareas, procesos), num_manos, progreso, cancelado),
+        diccionarios_generados(usuario_id),
+        DATASET_DIR,
+        {"seed": seed},
+    )
+    return {"status":"ok","mensaje":"Dataset generado correctamente","version":version}
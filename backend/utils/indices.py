@@ -0,0 +1,152 @@
+"""
+Índices por versión del dataset para filtrar sin recorrerlo entero.
+
+Para posición, categoría, jugadores de la mesa y resultado se guarda, por
+cada valor, la lista ordenada de filas donde aparece; para el bote, las
+filas ordenadas por bote. Se construyen una vez por versión sobre el almacén
+de process (misma firma) y un filtro solo toca las filas que cumplen cada
+condición: se intersecan empezando por la lista más corta.
+"""
+import threading
+
+import numpy as np
+
+from . import process
+from .evaluator import CATEGORIAS
+
+# Filtro -> columna del dataset
+CAMPOS = {
+    "posicion": "posicion_usuario",
+    "categoria": "categoria_mano_usuario",
+    "jugador": "jugadores_mesa",
+    "resultado": "resultado_usuario",
+}
+FILTROS = list(CAMPOS) + ["categoria_min", "bote_min", "bote_max"]
+
+# Categorías de menor a mayor (para "Full o mejor")
+ORDEN_CATEGORIAS = [CATEGORIAS[i] for i in sorted(CATEGORIAS)]
+
+_indices = {"firma": None, "indices": None}
+_lock = threading.Lock()
+
+
+# ======================================================
+# CONSTRUCCIÓN
+# ======================================================
+def _indice_valores(codigos, filas, nombres):
+    """Filas de cada código, agrupadas por código y en orden dentro del grupo."""
+    orden = np.argsort(codigos, kind="stable")
+    limites = np.concatenate([[0], np.cumsum(np.bincount(codigos, minlength=len(nombres)))])
+    return {
+        "posicion": {nombre: i for i, nombre in enumerate(nombres)},
+        "filas": filas[orden].astype(np.int32),
+        "limites": limites,
+    }
+
+
+def _construir(almacen):
+    n = len(almacen)
+    indices = {}
+    for campo, columna in CAMPOS.items():
+        if campo == "jugador":
+            # Una entrada por jugador sentado (de la máscara de bits)
+            filas, codigos = almacen.jugadores()
+        else:
+            filas, codigos = np.arange(n), almacen.columna(columna)
+        indices[campo] = _indice_valores(codigos.astype(np.intp), filas, almacen.diccionarios[columna])
+    bote = almacen.columna("bote_final")
+    orden_bote = np.argsort(bote, kind="stable").astype(np.int32)
+    indices["bote"] = {"filas": orden_bote, "valores": bote[orden_bote]}
+    return indices
+
+
+def indices_vigentes():
+    """Índices de la versión vigente del dataset (se construyen una vez por versión)."""
+    firma = process.firma_dataset()
+    if firma is None:
+        raise FileNotFoundError("No hay dataset")
+    with _lock:
+        if _indices["indices"] is None or _indices["firma"] != firma:
+            _indices.update(firma=firma, indices=_construir(process.cargar_almacen()))
+        return _indices["indices"]
+
+
+# ======================================================
+# CONSULTA
+# ======================================================
+def normalizar_filtros(filtros):
+    """
+    Valida los filtros y los deja como {campo: [valores]} más bote_min/max.
+    Devuelve None si no hay ninguno.
+    """
+    normalizados = {}
+    for campo, valores in (filtros or {}).items():
+        if valores in (None, "", []):
+            continue
+        if campo not in FILTROS:
+            raise ValueError(f"filtro desconocido: {campo}")
+        if campo in ("bote_min", "bote_max"):
+            normalizados[campo] = int(valores[-1] if isinstance(valores, list) else valores)
+            continue
+        valores = [valores] if isinstance(valores, str) else list(valores)
+        if campo == "categoria_min":
+            if len(valores) != 1 or valores[0] not in ORDEN_CATEGORIAS:
+                raise ValueError(f"categoria_min debe ser una de {ORDEN_CATEGORIAS}")
+            mejores = ORDEN_CATEGORIAS[ORDEN_CATEGORIAS.index(valores[0]):]
+            previas = normalizados.get("categoria")
+            valores = [c for c in previas if c in mejores] if previas is not None else mejores
+            campo = "categoria"
+        elif campo == "categoria" and "categoria" in normalizados:
+            valores = [c for c in normalizados["categoria"] if c in valores]
+        normalizados[campo] = valores
+    return normalizados or None
+
+
+def _filas_valores(indice, valores):
+    partes = []
+    for valor in valores:
+        i = indice["posicion"].get(valor)
+        if i is not None:
+            partes.append(indice["filas"][indice["limites"][i]:indice["limites"][i + 1]])
+    if len(partes) == 1:
+        return partes[0]
+    # Varios valores del mismo campo: unión (un jugador puede compartir mesa con otro)
+    return np.unique(np.concatenate(partes)) if partes else np.array([], dtype=np.int32)
+
+
+def _filas_bote(indice, minimo, maximo):
+    valores = indice["valores"]
+    inicio = np.searchsorted(valores, minimo, "left") if minimo is not None else 0
+    fin = np.searchsorted(valores, maximo, "right") if maximo is not None else len(valores)
+    return np.sort(indice["filas"][inicio:max(fin, inicio)])
+
+
+def _intersecar(a, b):
+    """Elementos de `a` que están en `b` (ambas ordenadas); O(|a| log |b|)."""
+    if not len(b):
+        return b
+    pos = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[pos] == a]
+
+
+def filas_filtradas(filtros):
+    """
+    Filas (ordenadas) del dataset que cumplen todos los filtros; None si no
+    hay filtros (todas).
+    """
+    filtros = normalizar_filtros(filtros)
+    if filtros is None:
+        return None
+    indices = indices_vigentes()
+
+    conjuntos = [_filas_valores(indices[c], v) for c, v in filtros.items() if c in CAMPOS]
+    if "bote_min" in filtros or "bote_max" in filtros:
+        conjuntos.append(_filas_bote(indices["bote"], filtros.get("bote_min"), filtros.get("bote_max")))
+
+    conjuntos.sort(key=len)
+    filas = conjuntos[0]
+    for otro in conjuntos[1:]:
+        if not len(filas):
+            break
+        filas = _intersecar(filas, otro)
+    return filas
@@ -0,0 +1,200 @@
+"""
+Análisis de lotes de manos en un pool de procesos.
+
+Los resultados se devuelven como NDJSON (una línea JSON por mano) en orden
+de finalización. Solo hay un número acotado de manos en vuelo a la vez, así
+que un lote de decenas de miles de manos no se acumula en memoria.
+
+Los lotes en curso se registran en data/estado/lotes (ver utils.compartido):
+el pedido de cancelación puede llegar a cualquier worker de gunicorn.
+"""
+import os
+import re
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from . import compartido, simulator
+from .analyzer import analizar_mano_fases, cargar_dataset, validar_semilla
+from .serializacion import a_json
+
+PROCESOS_LOTE = int(os.environ.get("LOTE_PROCESOS", os.cpu_count() or 1))
+
+# Manos en vuelo por proceso (acota memoria y trabajo a cancelar)
+EN_VUELO_POR_PROCESO = 4
+
+RE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+_pool = None
+
+
+# ======================================================
+# PETICIONES
+# ======================================================
+def _entero_no_negativo(ref, clave, defecto):
+    valor = ref.get(clave, defecto)
+    if valor is None:
+        return None
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"dataset.{clave} debe ser un entero: {valor!r}") from None
+    if valor < 0:
+        raise ValueError(f"dataset.{clave} no puede ser negativo")
+    return valor
+
+
+def _desde_dataset(desde, hasta):
+    """Peticiones a partir de las manos guardadas (cartas y posición reales)."""
+    for i, mano in enumerate(cargar_dataset()):
+        if i < desde:
+            continue
+        if hasta is not None and i >= hasta:
+            break
+        yield {
+            "mano_id": mano.get("mano_id"),
+            "cartas_usuario": mano["cartas_usuario"],
+            "cartas_comunitarias": mano["cartas_comunitarias"],
+            "posicion": mano["posicion_usuario"],
+        }
+
+
+def iterar_peticiones(body):
+    """
+    Recorre las manos de un lote: `manos` (lista de peticiones como las de
+    /api/analizar-fases) o `dataset` ({"desde", "limite"}). Las `opciones`
+    comunes se aplican a todas; con `seed` cada mano recibe su propia semilla.
+    La validación del cuerpo ocurre aquí, antes de empezar a responder; los
+    errores de cada mano se informan después en su línea.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("El cuerpo debe ser un objeto JSON")
+    opciones = body.get("opciones") or {}
+    if not isinstance(opciones, dict):
+        raise ValueError("'opciones' debe ser un objeto")
+    opciones = dict(opciones)
+    seed = validar_semilla(opciones.pop("seed", None))
+
+    if isinstance(body.get("manos"), list):
+        fuente = body["manos"]
+        if not all(isinstance(m, dict) for m in fuente):
+            raise ValueError("Cada elemento de 'manos' debe ser un objeto")
+    elif "dataset" in body:
+        ref = body["dataset"] or {}
+        if not isinstance(ref, dict):
+            raise ValueError("'dataset' debe ser un objeto {desde, limite}")
+        desde = _entero_no_negativo(ref, "desde", 0)
+        limite = _entero_no_negativo(ref, "limite", None)
+        fuente = _desde_dataset(desde, desde + limite if limite is not None else None)
+    else:
+        raise ValueError("El lote necesita 'manos' (lista) o 'dataset'")
+
+    return _con_opciones(fuente, opciones, seed)
+
+
+def _con_opciones(fuente, opciones, seed):
+    for indice, mano in enumerate(fuente):
+        req = {**opciones, **mano}
+        if seed is not None and "seed" not in mano:
+            req["seed"] = np.random.SeedSequence(seed, spawn_key=(indice,))
+        yield indice, req
+
+
+# ======================================================
+# POOL
+# ======================================================
+def _iniciar_trabajador():
+    # Cada trabajador simula en serie: el paralelismo ya lo da el lote
+    simulator.PROCESOS = 1
+
+
+def _pool_lotes():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PROCESOS_LOTE, initializer=_iniciar_trabajador)
+    return _pool
+
+
+def _analizar(req):
+    # Un error en una mano no corta el resto del lote: se informa en su línea
+    try:
+        return {"resultado": analizar_mano_fases(req)}
+    except (KeyError, ValueError, TypeError) as e:
+        return {"error": f"Petición inválida: {e}"}
+    except Exception as e:
+        return {"error": f"Error al analizar la mano: {type(e).__name__}: {e}"}
+
+
+def _linea(indice, req, salida):
+    linea = {"indice": indice}
+    if req.get("mano_id") is not None:
+        linea["mano_id"] = req["mano_id"]
+    linea.update(salida)
+    return a_json(linea) + b"\n"
+
+
+def analizar_lote(peticiones, cancelado):
+    """
+    Generador de líneas NDJSON. Se detiene (cancelando lo pendiente) si se
+    marca `cancelado` o si quien consume el generador lo cierra, por ejemplo
+    al desconectarse el cliente.
+    """
+    pool = _pool_lotes()
+    max_en_vuelo = PROCESOS_LOTE * EN_VUELO_POR_PROCESO
+    en_vuelo = {}
+    peticiones = iter(peticiones)
+
+    def llenar():
+        for indice, req in peticiones:
+            en_vuelo[pool.submit(_analizar, req)] = (indice, req)
+            if len(en_vuelo) >= max_en_vuelo:
+                return
+
+    try:
+        llenar()
+        while en_vuelo and not cancelado.is_set():
+            hechos, _ = wait(list(en_vuelo), timeout=0.5, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                indice, req = en_vuelo.pop(futuro)
+                yield _linea(indice, req, futuro.result())
+            llenar()
+        if cancelado.is_set():
+            yield a_json({"cancelado": True}) + b"\n"
+    finally:
+        for futuro in en_vuelo:
+            futuro.cancel()
+
+
+# ======================================================
+# REGISTRO DE LOTES (PARA CANCELAR)
+# ======================================================
+def _rutas(lote_id):
+    carpeta = compartido.directorio("lotes")
+    return carpeta / f"{lote_id}.json", carpeta / f"{lote_id}.cancelar"
+
+
+def registrar_lote():
+    """Registra un lote en curso; devuelve (id, marca de cancelación)."""
+    lote_id = uuid.uuid4().hex
+    registro, marca = _rutas(lote_id)
+    compartido.guardar(registro, {"id": lote_id, "pid": os.getpid()})
+    return lote_id, compartido.Marca(marca)
+
+
+def cerrar_lote(lote_id):
+    with compartido.bloqueo(compartido.directorio("lotes")):
+        compartido.borrar(*_rutas(lote_id))
+
+
+def cancelar_lote(lote_id):
+    """Marca el lote como cancelado; False si no existe (o ya terminó)."""
+    if not RE_ID.match(lote_id):
+        return False
+    registro, marca = _rutas(lote_id)
+    with compartido.bloqueo(registro.parent):
+        lote = compartido.leer(registro)
+        if lote is None or not compartido.proceso_vivo(lote["pid"]):
+            return False
+        compartido.Marca(marca).set()
+    return True
@@ -0,0 +1,272 @@
+"""
+Métricas del servidor en formato de texto de Prometheus y perfilado
+muestreado de una petición.
+
+Se miden la latencia de cada ruta, el tiempo de las funciones calientes
+(equity, outs, carga del dataset, estadísticas, serialización JSON), las
+muestras Monte Carlo evaluadas, las etapas del arranque y la memoria del
+proceso. Todo vive en memoria de cada proceso (con varios workers, cada uno
+responde con lo suyo): las simulaciones repartidas en el pool de equity se
+cuentan en el proceso que las pidió, pero los análisis de /api/analizar-lote
+corren en sus propios trabajadores y no aparecen aquí.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Límites (segundos) de las cubetas de los histogramas
+LIMITES = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# El perfilado por petición (?perfil=1) expone rutas de archivos: solo si se habilita
+PERFILES_HABILITADOS = os.environ.get("PERFILES_HABILITADOS", "0") == "1"
+INTERVALO_PERFIL = float(os.environ.get("INTERVALO_PERFIL_MS", 1)) / 1000
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+_lock = threading.Lock()
+_registro = []
+
+
+# ======================================================
+# MÉTRICAS
+# ======================================================
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    pares = ",".join(f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores))
+    return "{" + pares + "}"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Contador:
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self._series = {}
+        _registro.append(self)
+
+    def sumar(self, valor=1, **etiquetas):
+        clave = tuple(str(etiquetas[e]) for e in self.etiquetas)
+        with _lock:
+            self._series[clave] = self._series.get(clave, 0) + valor
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        for clave, valor in sorted(self._series.items()):
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {valor}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self.limites = tuple(limites)
+        self._series = {}  # valores de etiquetas -> [cuentas por cubeta..., +Inf], suma
+        _registro.append(self)
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(str(etiquetas[e]) for e in self.etiquetas)
+        cubeta = bisect_left(self.limites, valor)
+        with _lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * (len(self.limites) + 1), 0.0]
+            serie[0][cubeta] += 1
+            serie[1] += valor
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        for clave, (cuentas, suma) in sorted(self._series.items()):
+            acumulado = 0
+            for limite, cuenta in zip(self.limites + ("+Inf",), cuentas):
+                acumulado += cuenta
+                etiquetas = _etiquetas(self.etiquetas + ("le",), clave + (str(limite),))
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {suma:.6f}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acumulado}")
+        return lineas
+
+
+class Medidor:
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self._series = {}
+        _registro.append(self)
+
+    def fijar(self, valor, **etiquetas):
+        clave = tuple(str(etiquetas[e]) for e in self.etiquetas)
+        with _lock:
+            self._series[clave] = valor
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} gauge"]
+        for clave, valor in sorted(self._series.items()):
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {valor}")
+        return lineas
+
+
+peticiones = Histograma(
+    "poker_peticion_duracion_segundos", "Latencia de las peticiones por ruta",
+    ("ruta", "metodo", "estado"),
+)
+funciones = Histograma(
+    "poker_funcion_duracion_segundos", "Tiempo de las funciones calientes", ("funcion",),
+)
+muestras_montecarlo = Contador(
+    "poker_muestras_montecarlo_total", "Manos simuladas (Monte Carlo) para calcular equity",
+)
+combinaciones_exactas = Contador(
+    "poker_combinaciones_exactas_total", "Combinaciones enumeradas en el cálculo exacto de equity",
+)
+
+arranque = Medidor(
+    "poker_arranque_segundos", "Duración de cada etapa del arranque del servidor", ("etapa",),
+)
+memoria = Medidor(
+    "poker_memoria_bytes", "Memoria de este proceso (rss, pss, compartida, privada)", ("tipo",),
+)
+
+
+@contextmanager
+def cronometrar(nombre):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        funciones.observar(time.perf_counter() - inicio, funcion=nombre)
+
+
+def cronometrado(nombre=None):
+    """Decorador: registra el tiempo de cada llamada en poker_funcion_duracion_segundos."""
+    def decorar(funcion):
+        etiqueta = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with cronometrar(etiqueta):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorar
+
+
+def memoria_proceso(pid="self"):
+    """
+    Memoria de un proceso en bytes según /proc/<pid>/smaps_rollup (Linux):
+    rss, pss (cada página compartida dividida entre los procesos que la
+    comparten), compartida y privada. La suma de los pss de los workers es lo
+    que ocupan de verdad. Fuera de Linux, solo el rss máximo de este proceso.
+    """
+    campos = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "compartida", "Shared_Dirty": "compartida",
+              "Private_Clean": "privada", "Private_Dirty": "privada"}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r", encoding="ascii") as f:
+            lineas = f.read().splitlines()
+    except OSError:
+        if pid != "self" or resource is None:
+            return {}
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # En Linux viene en KB, en macOS en bytes
+        return {"rss_max": rss if sys.platform == "darwin" else rss * 1024}
+
+    valores = {}
+    for linea in lineas:
+        nombre, _, resto = linea.partition(":")
+        if nombre in campos:
+            tipo = campos[nombre]
+            valores[tipo] = valores.get(tipo, 0) + int(resto.split()[0]) * 1024
+    return valores
+
+
+def exportar():
+    """Todas las métricas en formato de texto de Prometheus (versión 0.0.4)."""
+    for tipo, valor in memoria_proceso().items():
+        memoria.fijar(valor, tipo=tipo)
+    with _lock:
+        lineas = [linea for metrica in _registro for linea in metrica.exportar()]
+    return "\n".join(lineas) + "\n"
+
+
+# ======================================================
+# PERFIL MUESTREADO
+# ======================================================
+class PerfilMuestreado:
+    """
+    Muestrea cada `intervalo` segundos la pila del hilo que lo crea (desde
+    el primer marco del proyecto) mientras está activo. Barato y sin
+    instrumentar nada: da una idea estadística de dónde se va el tiempo.
+    """
+
+    def __init__(self, intervalo=INTERVALO_PERFIL):
+        self.intervalo = intervalo
+        self.hilo = threading.get_ident()
+        self.pilas = Counter()
+        self._fin = threading.Event()
+        self._muestreador = threading.Thread(target=self._muestrear, daemon=True)
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self._muestreador.start()
+        return self
+
+    def _muestrear(self):
+        while not self._fin.wait(self.intervalo):
+            marco = sys._current_frames().get(self.hilo)
+            pila = []
+            while marco is not None:
+                codigo = marco.f_code
+                # Los envoltorios de `cronometrado` no aportan nada al perfil
+                if codigo.co_filename != __file__:
+                    pila.append((codigo.co_filename, f"{Path(codigo.co_filename).name}:{codigo.co_name}"))
+                marco = marco.f_back
+            pila.reverse()
+            # Se descartan los marcos del servidor (werkzeug, flask) anteriores al proyecto
+            propios = [i for i, (archivo, _) in enumerate(pila) if archivo.startswith(str(BASE_DIR))]
+            if propios:
+                self.pilas[tuple(nombre for _, nombre in pila[propios[0]:])] += 1
+
+    def detener(self, maximo=25):
+        """Detiene el muestreo y devuelve el resumen del perfil."""
+        self._fin.set()
+        self._muestreador.join()
+        duracion = time.perf_counter() - self._inicio
+
+        total = sum(self.pilas.values())
+        propio, inclusivo = Counter(), Counter()
+        for pila, cuenta in self.pilas.items():
+            propio[pila[-1]] += cuenta
+            for nombre in set(pila):
+                inclusivo[nombre] += cuenta
+
+        def porcentaje(cuenta):
+            return round(cuenta / total * 100, 1) if total else 0.0
+
+        return {
+            "intervalo_ms": self.intervalo * 1000,
+            "duracion_ms": round(duracion * 1000, 2),
+            "muestras": total,
+            "funciones": [
+                {
+                    "funcion": nombre,
+                    "total": cuenta,
+                    "propio": propio[nombre],
+                    "porcentaje_total": porcentaje(cuenta),
+                    "porcentaje_propio": porcentaje(propio[nombre]),
+                }
+                for nombre, cuenta in inclusivo.most_common(maximo)
+            ],
+            # Formato "plegado" (a;b;c cuenta), el que leen los flamegraphs
+            "pilas": [f"{';'.join(pila)} {cuenta}" for pila, cuenta in self.pilas.most_common(maximo)],
+        }
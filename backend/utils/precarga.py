@@ -0,0 +1,61 @@
+"""
+Precarga de lo que todas las peticiones comparten, para el modo producción.
+
+Carga la tabla preflop (mapeada en memoria), el dataset vigente con las
+columnas que usan las estadísticas, los índices de filtros, la serie del
+timeline y los acumulados. Las columnas que se decodifican a listas Python
+(cartas, jugadores, rondas) no: cada acceso a esos objetos toca su contador
+de referencias y la página se copiaría igual en cada worker. Las tablas
+del evaluador ya se construyen al importarlo. Con gunicorn y
+preload_app (ver gunicorn.conf.py) esto corre una vez en el proceso maestro
+antes del fork, y los workers comparten esas páginas en lugar de construir
+cada uno su copia.
+
+Después se congela el recolector de basura (gc.freeze): los objetos ya
+creados quedan fuera de sus recorridos, que si no escribirían en ellos y
+obligarían a copiar sus páginas en cada worker.
+
+Si un worker ve después una versión nueva del dataset, la carga en su propia
+memoria como siempre; lo compartido es la versión vigente al arrancar.
+"""
+import gc
+import time
+from contextlib import contextmanager
+
+from .acumulados import acumulados
+from .indices import indices_vigentes
+from .preflop import cargar_tabla
+from .process import cargar_dataset
+from .stats import COLUMNAS_METRICA, timeline_profit
+
+
+@contextmanager
+def _etapa(etapas, nombre):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapas[nombre] = time.perf_counter() - inicio
+
+
+def precargar():
+    """Carga todo lo compartido; devuelve los segundos de cada etapa."""
+    etapas = {}
+    with _etapa(etapas, "tabla_preflop"):
+        cargar_tabla()
+    try:
+        with _etapa(etapas, "dataset"):
+            cargar_dataset(list(dict.fromkeys(c for columnas in COLUMNAS_METRICA.values() for c in columnas)))
+        with _etapa(etapas, "indices"):
+            indices_vigentes()
+        with _etapa(etapas, "timeline"):
+            timeline_profit()
+        with _etapa(etapas, "acumulados"):
+            acumulados()
+    except FileNotFoundError:
+        # Sin dataset todavía: cada worker lo cargará al generarse
+        pass
+    with _etapa(etapas, "gc"):
+        gc.collect()
+        gc.freeze()
+    return etapas
@@ -0,0 +1,162 @@
+"""
+Tabla precalculada de equity preflop.
+
+Las 1326 manos iniciales se reducen a 169 clases equivalentes por palos
+(AA, AKs, AKo, ...). La tabla guarda, para cada clase y de 1 a 8 rivales
+aleatorios, la equity, el desglose gana/empata y el semiancho del IC 95%.
+
+Construcción (offline, desde backend/):
+    python -m utils.preflop --muestras 200000 --procesos 4
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .evaluator import RANGOS
+from .simulator import intervalo, simular
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+TABLA_PATH = DATA_DIR / "preflop_equity.npy"
+META_PATH = DATA_DIR / "preflop_equity.json"
+
+NUM_CLASES = 169
+MAX_RIVALES = 8
+
+# Columnas de la tabla (float32): equity, gana, empata, semiancho IC 95%
+EQUITY, GANA, EMPATA, ERROR = range(4)
+
+_tabla = None
+_meta = None
+
+
+# ======================================================
+# CLASES DE MANO
+# ======================================================
+def clase_mano(user):
+    """
+    Índice 0..168 de dos cartas codificadas, en la cuadrícula 13x13 clásica
+    (fila/columna de A a 2): pares en la diagonal, suited arriba, offsuit abajo.
+    """
+    r1, r2 = user[0] >> 2, user[1] >> 2
+    alta, baja = max(r1, r2), min(r1, r2)
+    a, b = 12 - alta, 12 - baja
+    if user[0] & 3 == user[1] & 3:
+        return a * 13 + b
+    return b * 13 + a
+
+
+def nombre_clase(idx):
+    a, b = divmod(idx, 13)
+    alta = RANGOS[12 - min(a, b)].replace("10", "T")
+    baja = RANGOS[12 - max(a, b)].replace("10", "T")
+    if a == b:
+        return alta + baja
+    return alta + baja + ("s" if a < b else "o")
+
+
+def representante(idx):
+    """Dos cartas codificadas de la clase (♠ y ♥ si no es suited)."""
+    a, b = divmod(idx, 13)
+    alta, baja = 12 - min(a, b), 12 - max(a, b)
+    if a < b:
+        return [alta * 4, baja * 4]
+    return [alta * 4, baja * 4 + 1]
+
+
+# ======================================================
+# CONSTRUCCIÓN
+# ======================================================
+def _calcular_celda(args):
+    idx, rivales, muestras, semilla = args
+    conteo = simular(representante(idx), [], muestras, np.random.default_rng(semilla), rivales)
+    total = conteo["ganadas"] + conteo["empatadas"] + conteo["perdidas"]
+    media, error = intervalo(conteo)
+    return idx, rivales, (media, conteo["ganadas"] / total, conteo["empatadas"] / total, error)
+
+
+def construir_tabla(muestras=200_000, seed=2024, procesos=1):
+    """
+    Simula cada (clase, rivales) con su propia semilla derivada de `seed`,
+    así el resultado no depende del número de procesos.
+    """
+    semillas = np.random.SeedSequence(seed).spawn(NUM_CLASES * MAX_RIVALES)
+    tareas = [
+        (idx, rivales, muestras, semillas[idx * MAX_RIVALES + rivales - 1])
+        for idx in range(NUM_CLASES)
+        for rivales in range(1, MAX_RIVALES + 1)
+    ]
+
+    tabla = np.zeros((NUM_CLASES, MAX_RIVALES, 4), dtype=np.float32)
+    if procesos > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = pool.map(_calcular_celda, tareas, chunksize=8)
+            for idx, rivales, fila in resultados:
+                tabla[idx, rivales - 1] = fila
+    else:
+        for tarea in tareas:
+            idx, rivales, fila = _calcular_celda(tarea)
+            tabla[idx, rivales - 1] = fila
+    return tabla
+
+
+def guardar_tabla(tabla, muestras, seed):
+    DATA_DIR.mkdir(exist_ok=True)
+    np.save(TABLA_PATH, tabla)
+    with open(META_PATH, "w", encoding="utf-8") as f:
+        json.dump({"muestras": muestras, "seed": seed}, f, indent=4)
+
+
+# ======================================================
+# CONSULTA
+# ======================================================
+def cargar_tabla():
+    """Carga (una vez, mapeada en memoria) la tabla; None si no existe."""
+    global _tabla, _meta
+    if _tabla is None and TABLA_PATH.exists():
+        _tabla = np.load(TABLA_PATH, mmap_mode="r")
+        _meta = {}
+        if META_PATH.exists():
+            with open(META_PATH, "r", encoding="utf-8") as f:
+                _meta = json.load(f)
+    return _tabla
+
+
+def equity_preflop(user, rivales=1):
+    """
+    Resultado preflop tabulado para dos cartas codificadas, con el mismo
+    formato que `analyzer.resumen_conteo`; None si no hay tabla.
+    """
+    tabla = cargar_tabla()
+    if tabla is None or not 1 <= rivales <= MAX_RIVALES:
+        return None
+
+    media, gana, empata, error = (float(x) for x in tabla[clase_mano(user), rivales - 1])
+    return {
+        "equity": media,
+        "ic": (max(media - error, 0.0), min(media + error, 1.0)),
+        "gana": gana,
+        "empata": empata,
+        "pierde": max(1.0 - gana - empata, 0.0),
+        "muestras": _meta.get("muestras", 0),
+        "exacto": False,
+    }
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye la tabla de equity preflop.")
+    parser.add_argument("--muestras", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--procesos", type=int, default=1)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    tabla = construir_tabla(args.muestras, args.seed, args.procesos)
+    guardar_tabla(tabla, args.muestras, args.seed)
+    print(f"Tabla guardada en {TABLA_PATH} ({time.perf_counter() - inicio:.1f} s)")
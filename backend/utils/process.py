@@ -1,22 +1,89 @@
-import json
+"""
+Carga del dataset en memoria, con caché compartida por todo el proceso.
+
+Las manos se cargan una vez por versión en un AlmacenManos (array
+estructurado, ver almacen.py) junto a la firma del dataset (versión, número
+de manos y revisión del formato columnar, o ruta y mtime de un JSON
+antiguo), y solo se vuelven a leer cuando esa firma cambia. Los DataFrames que se entregan son
+vistas sobre el almacén: son compartidos y quien los usa no debe modificarlos.
+"""
+import threading
+
 import pandas as pd
-from pathlib import Path
-
-DATA_PATH = Path(__file__).parent.parent / "data" / "poker_dataset.json"
-
-def cargar_dataset():
-    """Carga el dataset desde poker_dataset.json y devuelve un DataFrame."""
-    if not DATA_PATH.exists():
-        raise FileNotFoundError(f"No se encontró el archivo: {DATA_PATH}")
-    
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # Convertir a DataFrame plano (solo info principal de cada mano)
-    df = pd.json_normalize(data)
-
-    # Validación básica
-    print(f"✅ Dataset cargado correctamente: {len(df)} manos encontradas.")
-    print(f"📊 Columnas disponibles: {list(df.columns)}")
-    
-    return df
\ No newline at end of file
+
+from .almacen import AlmacenManos
+from .dataset import DATASET_DIR, iterar_bloques, leer_meta, ruta_dataset
+from .metricas import cronometrado
+
+_cache = {"firma": None, "almacen": None, "df": None}
+_lock = threading.Lock()
+
+
+def firma_columnar(meta, num_manos=None):
+    """Firma de una versión columnar (con `num_manos` si se conoce mejor que el meta)."""
+    num_manos = meta["num_manos"] if num_manos is None else num_manos
+    return ("columnar", meta["version"], num_manos, meta.get("revision", 0))
+
+
+def firma_dataset():
+    """
+    Identifica el contenido actual del dataset; cambia cada vez que se
+    regenera, se anexan manos o se calculan columnas derivadas.
+    """
+    ruta = ruta_dataset()
+    if ruta is None:
+        return None
+    if ruta == DATASET_DIR:
+        return firma_columnar(leer_meta())
+    return (str(ruta), ruta.stat().st_mtime_ns)
+
+
+def _almacen_vigente():
+    # Con _lock tomado
+    firma = firma_dataset()
+    if firma is None:
+        raise FileNotFoundError(f"No se encontró el archivo: {DATASET_DIR}")
+    if _cache["firma"] != firma:
+        if firma[0] == "columnar":
+            meta = leer_meta()
+            firma = firma_columnar(meta)
+            almacen = AlmacenManos.desde_meta(meta)
+        else:
+            # Formato antiguo: se codifica por bloques, sin pasar por dicts normalizados
+            almacen = AlmacenManos.desde_manos(iterar_bloques())
+        _cache.update(firma=firma, almacen=almacen, df=None)
+    return _cache["almacen"]
+
+
+def cargar_almacen():
+    """Almacén compartido (de solo lectura) con todas las manos de la versión vigente."""
+    with _lock:
+        return _almacen_vigente()
+
+
+@cronometrado("cargar_dataset")
+def cargar_dataset(columnas=None):
+    """
+    DataFrame compartido (de solo lectura) con al menos las columnas pedidas
+    (todas si None; las que no existan, como la equity sin calcular, se
+    omiten). Las columnas numéricas y codificadas son vistas sobre el
+    almacén, sin copia.
+    """
+    with _lock:
+        almacen = _almacen_vigente()
+        df = _cache["df"]
+        existentes = almacen.datos.dtype.names
+        pedidas = list(existentes) if columnas is None else [c for c in columnas if c in existentes]
+        faltan = [c for c in pedidas if df is None or c not in df]
+        if faltan or df is None:
+            # Se arma un DataFrame nuevo con las columnas que faltan: quien
+            # tenga el anterior lo sigue usando sin cambios.
+            nuevas = almacen.dataframe(faltan)
+            df = nuevas if df is None else pd.concat([df, nuevas], axis=1, copy=False)
+            _cache["df"] = df
+    return df
+
+
+def limpiar_cache():
+    with _lock:
+        _cache.update(firma=None, almacen=None, df=None)
@@ -0,0 +1,119 @@
+"""
+Rangos de manos para los rivales.
+
+Un rango se describe con texto o lista de textos:
+    "top 15%"               -> el 15% de combos más fuerte (según la tabla preflop)
+    "AKs", "AKo", "AK"      -> clases suited / offsuit / ambas
+    "QQ"                    -> pareja
+    "A♠K♠", "10♥10♦"        -> combo concreto ("T" vale como "10")
+Se convierte en un array (c, 2) de combos codificados.
+"""
+import re
+from itertools import combinations
+
+import numpy as np
+
+from .evaluator import CARTA_A_ID, RANGOS
+from .preflop import EQUITY, NUM_CLASES, cargar_tabla, clase_mano
+
+RE_TOP = re.compile(r"^(?:top\s*)?(\d+(?:\.\d+)?)\s*%$", re.IGNORECASE)
+RE_CARTAS = re.compile(r"(10|[2-9AKQJT])([♠♥♦♣])")
+RE_CLASE = re.compile(r"^(10|[2-9AKQJT])(10|[2-9AKQJT])([so]?)$", re.IGNORECASE)
+
+TODOS_LOS_COMBOS = [(a, b) for a, b in combinations(range(52), 2)]
+COMBOS_POR_CLASE = {}
+for _a, _b in TODOS_LOS_COMBOS:
+    COMBOS_POR_CLASE.setdefault(clase_mano([_a, _b]), []).append((_a, _b))
+
+
+def _rango_valor(texto):
+    texto = texto.upper().replace("T", "10")
+    return RANGOS.index(texto)
+
+
+def _clases_top(porcentaje):
+    """Clases más fuertes (equity contra un rival) hasta cubrir el porcentaje."""
+    tabla = cargar_tabla()
+    if tabla is None:
+        raise ValueError("Los rangos 'top X%' necesitan la tabla preflop (python -m utils.preflop)")
+
+    orden = np.argsort(-np.asarray(tabla[:, 0, EQUITY]), kind="stable")
+    objetivo = porcentaje / 100 * len(TODOS_LOS_COMBOS)
+    clases, acumulado = [], 0
+    for idx in orden.tolist():
+        if acumulado >= objetivo:
+            break
+        clases.append(idx)
+        acumulado += len(COMBOS_POR_CLASE[idx])
+    return clases
+
+
+def _combos_de(token):
+    token = token.strip()
+
+    top = RE_TOP.match(token)
+    if top:
+        porcentaje = float(top.group(1))
+        if not 0 < porcentaje <= 100:
+            raise ValueError(f"Porcentaje fuera de rango: {token}")
+        return [c for idx in _clases_top(porcentaje) for c in COMBOS_POR_CLASE[idx]]
+
+    cartas = RE_CARTAS.findall(token)
+    if cartas and "".join(v + p for v, p in cartas) == token:
+        if len(cartas) != 2:
+            raise ValueError(f"Un combo debe tener dos cartas: {token}")
+        a, b = (CARTA_A_ID[("10" if v == "T" else v) + p] for v, p in cartas)
+        if a == b:
+            raise ValueError(f"Combo con cartas repetidas: {token}")
+        return [(min(a, b), max(a, b))]
+
+    clase = RE_CLASE.match(token)
+    if clase:
+        r1, r2 = _rango_valor(clase.group(1)), _rango_valor(clase.group(2))
+        tipo = clase.group(3).lower()
+        if r1 == r2 and tipo:
+            raise ValueError(f"Una pareja no puede ser suited/offsuit: {token}")
+        combos = []
+        for a, b in TODOS_LOS_COMBOS:
+            if sorted((a >> 2, b >> 2)) != sorted((r1, r2)):
+                continue
+            suited = a & 3 == b & 3
+            if tipo == "s" and not suited or tipo == "o" and suited:
+                continue
+            combos.append((a, b))
+        return combos
+
+    raise ValueError(f"Rango no reconocido: {token}")
+
+
+def parsear_rango(spec):
+    """Texto (tokens separados por comas) o lista de textos -> array (c, 2)."""
+    tokens = spec.split(",") if isinstance(spec, str) else list(spec)
+    combos = set()
+    for token in tokens:
+        if not isinstance(token, str):
+            raise ValueError(f"Rango no reconocido: {token!r}")
+        combos.update(_combos_de(token))
+    if not combos:
+        raise ValueError("El rango está vacío")
+    return np.array(sorted(combos), dtype=np.int64)
+
+
+def rangos_rivales(spec, rivales):
+    """
+    Rangos de cada rival a partir de lo que llega en la petición: None (todos
+    aleatorios), un rango para todos, o una lista con un rango (o None) por rival.
+    Devuelve None o una lista de `rivales` elementos (array de combos o None).
+    """
+    if spec is None:
+        return None
+    if isinstance(spec, str):
+        rango = parsear_rango(spec)
+        return [rango] * rivales
+
+    if not isinstance(spec, list) or not all(r is None or isinstance(r, str) for r in spec):
+        raise ValueError("rangos debe ser un texto o una lista con un texto (o null) por rival")
+    if len(spec) != rivales:
+        raise ValueError(f"Se esperaban {rivales} rangos, uno por rival")
+    rangos = [parsear_rango(r) if r is not None else None for r in spec]
+    return rangos if any(r is not None for r in rangos) else None
@@ -0,0 +1,344 @@
+"""
+Motor Monte Carlo vectorizado para el cálculo de equity.
+
+Todas las simulaciones de un lote se sortean de una vez como un array
+(n, k) de cartas codificadas y se evalúan con `evaluator.evaluar_lote`.
+Los resultados se devuelven como conteos (ver `conteo_vacio`).
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from math import ceil, comb, sqrt
+
+import numpy as np
+
+from .evaluator import BIT_CARTA_NP, PESO_NP, evaluar_lote, evaluar_sumas
+
+# Filas simuladas por bloque (acota la memoria para n muy grandes)
+TAM_BLOQUE = 65536
+
+# Por debajo de este número de combinaciones (rival x runout) se enumera
+# en vez de simular: con los valores por defecto, turn y river son exactos.
+UMBRAL_EXACTO = 50_000
+
+# Modo adaptativo: tamaño del primer lote, tope de muestras y z del IC 95%
+LOTE_ADAPTATIVO = 2000
+MAX_MUESTRAS = 2_000_000
+Z_95 = 1.96
+
+# Hasta este número de cartas por fila se sortea con rechazo; por encima
+# (mesas con muchos rivales) las repeticiones serían casi seguras.
+MAX_K_RECHAZO = 9
+
+# A partir de estas muestras (y con más de un proceso) la simulación se
+# reparte en un pool de procesos; EQUITY_PROCESOS fija su tamaño.
+UMBRAL_PARALELO = 200_000
+PROCESOS = int(os.environ.get("EQUITY_PROCESOS", os.cpu_count() or 1))
+
+_pool = None
+
+
+def mazo_restante(usadas):
+    """Array con las cartas 0..51 que no están en `usadas`."""
+    usadas = set(usadas)
+    return np.array([c for c in range(52) if c not in usadas], dtype=np.int64)
+
+
+def sortear(rng, resto, n, k):
+    """Sortea n manos de k cartas distintas tomadas de `resto` -> array (n, k)."""
+    if k > MAX_K_RECHAZO:
+        return _sortear_fisher_yates(rng, resto, n, k)
+
+    # Índices con reemplazo; solo se repiten las filas con cartas repetidas
+    # (detectadas comparando suma y OR de 1 << índice).
+    idx = rng.integers(0, len(resto), (n, k))
+    pendientes = np.arange(n)
+    while pendientes.size:
+        bits = np.left_shift(1, idx[pendientes])
+        repetidas = bits.sum(axis=1) != np.bitwise_or.reduce(bits, axis=1)
+        pendientes = pendientes[repetidas]
+        idx[pendientes] = rng.integers(0, len(resto), (pendientes.size, k))
+    return resto[idx]
+
+
+def _sortear_fisher_yates(rng, resto, n, k):
+    """Fisher-Yates parcial (k pasos) vectorizado sobre las n filas."""
+    m = len(resto)
+    perm = np.tile(np.arange(m, dtype=np.int8), (n, 1))
+    filas = np.arange(n)
+    for j in range(k):
+        r = rng.integers(j, m, n)
+        tmp = perm[filas, j].copy()
+        perm[filas, j] = perm[filas, r]
+        perm[filas, r] = tmp
+    return resto[perm[:, :k]]
+
+
+# ======================================================
+# CONTEOS
+# ======================================================
+def conteo_vacio():
+    """
+    Resultado acumulado de una simulación. `reparto` suma la parte del bote
+    que se lleva el usuario en cada empate (½ contra un rival, ⅓ si empatan
+    tres...) y `reparto2` sus cuadrados, para la varianza.
+    """
+    return {"ganadas": 0, "empatadas": 0, "perdidas": 0, "reparto": 0.0, "reparto2": 0.0}
+
+
+def acumular(total, parcial):
+    for clave in total:
+        total[clave] += parcial[clave]
+    return total
+
+
+def contar(vu, vr):
+    """Conteo para valores del usuario (n,) contra los de los rivales (n, r)."""
+    mejor = vr.max(axis=1)
+    gana = vu > mejor
+    empata = vu == mejor
+
+    ganadas = int(np.count_nonzero(gana))
+    empatadas = int(np.count_nonzero(empata))
+    if vr.shape[1] == 1:
+        reparto, reparto2 = empatadas * 0.5, empatadas * 0.25
+    else:
+        cuota = 1.0 / (1 + np.count_nonzero(vr[empata] == vu[empata, None], axis=1))
+        reparto, reparto2 = float(cuota.sum()), float((cuota * cuota).sum())
+
+    return {
+        "ganadas": ganadas,
+        "empatadas": empatadas,
+        "perdidas": len(vu) - ganadas - empatadas,
+        "reparto": reparto,
+        "reparto2": reparto2,
+    }
+
+
+def intervalo(conteo, z=Z_95):
+    """
+    Media y semiancho del IC de la parte del bote ganada por mano (1 gana,
+    cuota de reparto si empata, 0 pierde). La varianza sale de los conteos.
+    """
+    total = conteo["ganadas"] + conteo["empatadas"] + conteo["perdidas"]
+    media = (conteo["ganadas"] + conteo["reparto"]) / total
+    varianza = max((conteo["ganadas"] + conteo["reparto2"]) / total - media*media, 0.0)
+    return media, z * sqrt(varianza / total)
+
+
+# ======================================================
+# MONTE CARLO
+# ======================================================
+def _sortear_rangos(rng, usadas, rangos, n):
+    """
+    Manos rivales (n, r, 2) tomadas de sus rangos (array de combos, o None
+    para una mano aleatoria). Las filas donde dos rivales comparten carta se
+    vuelven a sortear.
+    """
+    resto = mazo_restante(usadas)
+    todos = resto[np.array(list(combinations(range(len(resto)), 2)))]
+    muertas = np.zeros(52, dtype=bool)
+    muertas[usadas] = True
+
+    combos = []
+    for rango in rangos:
+        if rango is None:
+            combos.append(todos)
+            continue
+        vivos = rango[~muertas[rango].any(axis=1)]
+        if not len(vivos):
+            raise ValueError("Un rango rival no tiene combos compatibles con las cartas vistas")
+        combos.append(vivos)
+
+    manos = np.stack([c[rng.integers(0, len(c), n)] for c in combos], axis=1)
+    pendientes = np.arange(n)
+    for _ in range(1000):
+        bits = np.left_shift(1, manos[pendientes].reshape(len(pendientes), -1))
+        repetidas = bits.sum(axis=1) != np.bitwise_or.reduce(bits, axis=1)
+        pendientes = pendientes[repetidas]
+        if not pendientes.size:
+            return manos
+        for i, c in enumerate(combos):
+            manos[pendientes, i] = c[rng.integers(0, len(c), pendientes.size)]
+    raise ValueError("Los rangos de los rivales son incompatibles entre sí")
+
+
+def _sortear_runout(rng, usadas, manos, faltan):
+    """Cartas de mesa que faltan, evitando en cada fila las de los rivales."""
+    n = len(manos)
+    if not faltan:
+        return np.empty((n, 0), dtype=np.int64)
+    claves = rng.random((n, 52))
+    claves[:, usadas] = 2.0
+    np.put_along_axis(claves, manos.reshape(n, -1), 2.0, axis=1)
+    return np.argpartition(claves, faltan - 1, axis=1)[:, :faltan]
+
+
+def simular_bloque(user, mesa, n, rng, rivales=1, rangos=None):
+    """
+    Simula n repartos (manos de `rivales` rivales y runout) para una mano.
+    `user` y `mesa` son listas de enteros; `rangos` es None (rivales
+    aleatorios) o una lista con un array de combos (o None) por rival.
+    Devuelve un conteo.
+    """
+    faltan = 5 - len(mesa)
+    if rangos is None:
+        resto = mazo_restante(user + mesa)
+        cartas = sortear(rng, resto, n, 2*rivales + faltan)
+        manos = cartas[:, :2*rivales].reshape(n, rivales, 2)
+        runout = cartas[:, 2*rivales:]
+    else:
+        manos = _sortear_rangos(rng, user + mesa, rangos, n)
+        runout = _sortear_runout(rng, user + mesa, manos, faltan)
+
+    fijas_user = np.broadcast_to(np.array(user + mesa, dtype=np.int64), (n, len(user) + len(mesa)))
+    fijas_mesa = np.broadcast_to(np.array(mesa, dtype=np.int64), (n, len(mesa)))
+    vu = evaluar_lote(np.hstack([fijas_user, runout]))
+
+    # Todas las manos rivales en un único lote de n * rivales filas
+    comunes = np.hstack([fijas_mesa, runout])
+    comunes = np.broadcast_to(comunes[:, None, :], (n, rivales, comunes.shape[1]))
+    vr = evaluar_lote(np.concatenate([manos, comunes], axis=2).reshape(n*rivales, -1))
+
+    return contar(vu, vr.reshape(n, rivales))
+
+
+def simular(user, mesa, n, rng, rivales=1, rangos=None):
+    """Igual que `simular_bloque`, pero por bloques de TAM_BLOQUE filas."""
+    conteo = conteo_vacio()
+    hechas = 0
+    while hechas < n:
+        m = min(TAM_BLOQUE // rivales, n - hechas)
+        acumular(conteo, simular_bloque(user, mesa, m, rng, rivales, rangos))
+        hechas += m
+    return conteo
+
+
+# ======================================================
+# POOL DE PROCESOS
+# ======================================================
+def semilla_de(seed):
+    """SeedSequence a partir de None, un entero, una SeedSequence o un Generator."""
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(int(seed.integers(2**63)))
+    return np.random.SeedSequence(seed)
+
+
+def usar_pool(n):
+    """Si conviene repartir n simulaciones en el pool de procesos."""
+    return n >= UMBRAL_PARALELO and PROCESOS > 1
+
+
+def _pool_procesos():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PROCESOS)
+    return _pool
+
+
+def _simular_tarea(args):
+    user, mesa, n, semilla, rivales, rangos = args
+    return simular(user, mesa, n, np.random.default_rng(semilla), rivales, rangos)
+
+
+def simular_paralelo(user, mesa, n, seed=None, rivales=1, rangos=None, procesos=PROCESOS):
+    """
+    Reparte n simulaciones en tareas de un bloque, cada una con su propio
+    flujo aleatorio (SeedSequence.spawn). Para una semilla dada el resultado
+    no depende del número de procesos.
+    """
+    tam = TAM_BLOQUE // rivales
+    hijos = semilla_de(seed).spawn(ceil(n / tam))
+    tareas = [
+        (user, mesa, min(tam, n - i*tam), hijo, rivales, rangos)
+        for i, hijo in enumerate(hijos)
+    ]
+
+    if procesos > 1:
+        resultados = _pool_procesos().map(_simular_tarea, tareas)
+    else:
+        resultados = map(_simular_tarea, tareas)
+
+    conteo = conteo_vacio()
+    for parcial in resultados:
+        acumular(conteo, parcial)
+    return conteo
+
+
+# ======================================================
+# MODO ADAPTATIVO
+# ======================================================
+def simular_adaptativo(user, mesa, rng, precision=None, tiempo_max=None, rivales=1,
+                       rangos=None, lote=LOTE_ADAPTATIVO, max_muestras=MAX_MUESTRAS):
+    """
+    Simula por lotes hasta que el semiancho del IC 95% baja de `precision`,
+    se agota `tiempo_max` (segundos) o se llega a `max_muestras`.
+    Devuelve un conteo.
+    """
+    inicio = time.perf_counter()
+    conteo = conteo_vacio()
+    total = 0
+
+    while True:
+        acumular(conteo, simular_bloque(user, mesa, lote, rng, rivales, rangos))
+        total += lote
+
+        _, error = intervalo(conteo)
+        if precision is not None and error <= precision:
+            break
+        if tiempo_max is not None and time.perf_counter() - inicio >= tiempo_max:
+            break
+        if total >= max_muestras:
+            break
+
+        # Lotes crecientes: menos vueltas del bucle cuando hace falta precisión
+        lote = min(lote * 2, TAM_BLOQUE // rivales, max_muestras - total)
+
+    return conteo
+
+
+# ======================================================
+# ENUMERACIÓN EXACTA
+# ======================================================
+def combinaciones_restantes(user, mesa):
+    """Número de pares (mano rival, runout) posibles para la mesa dada."""
+    m = 52 - len(user) - len(mesa)
+    return comb(m, 2) * comb(m - 2, 5 - len(mesa))
+
+
+def enumerar(user, mesa):
+    """
+    Recorre todos los runouts y todas las manos rivales. Las sumas de la mesa
+    y de cada runout se calculan una vez y se combinan con las de cada par
+    rival, sin reevaluar las cartas compartidas.
+    Devuelve un conteo exacto contra un rival.
+    """
+    faltan = 5 - len(mesa)
+    resto = mazo_restante(user + mesa)
+
+    lista = list(combinations(resto.tolist(), faltan))
+    runouts = np.array(lista, dtype=np.int64).reshape(len(lista), faltan)
+    s_mesa = PESO_NP[mesa].sum() + PESO_NP[runouts].sum(axis=1)
+    b_mesa = BIT_CARTA_NP[mesa].sum() + BIT_CARTA_NP[runouts].sum(axis=1)
+
+    # Mano del usuario: una evaluación por runout
+    vu = evaluar_sumas(s_mesa + PESO_NP[user].sum(), b_mesa + BIT_CARTA_NP[user].sum())
+
+    pares = resto[np.array(list(combinations(range(len(resto)), 2)))]
+    s_par = PESO_NP[pares].sum(axis=1)
+    b_par = BIT_CARTA_NP[pares].sum(axis=1)
+
+    conteo = conteo_vacio()
+    paso = max(1, TAM_BLOQUE // len(pares))
+    for i in range(0, len(runouts), paso):
+        s_r, b_r, u = s_mesa[i:i+paso], b_mesa[i:i+paso], vu[i:i+paso]
+
+        # Solo pares rivales que no comparten cartas con el runout
+        fila, col = np.nonzero((b_r[:, None] & b_par[None, :]) == 0)
+        vr = evaluar_sumas(s_r[fila] + s_par[col], b_r[fila] + b_par[col])
+        acumular(conteo, contar(u[fila], vr[:, None]))
+
+    return conteo
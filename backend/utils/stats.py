@@ -1,232 +1,503 @@
-import pandas as pd
+"""
+Estadísticas y datos de los gráficos del dashboard.
+
+Todas las métricas salen de `agregar`, que recorre las columnas una sola vez
+y comparte entre métricas lo que se deriva de ellas (victoria, ganancia,
+tramos de agresividad y riesgo...). Cada función pública pide solo su
+métrica; `dashboard()` las calcula todas de una vez.
+"""
+import threading
+
 import numpy as np
-from collections import Counter
-from .process import cargar_dataset
+import pandas as pd
+
+from .dataset import COLUMNAS_EQUITY
+from .indices import filas_filtradas, normalizar_filtros
+from .metricas import cronometrado
+from .process import cargar_dataset, firma_dataset
 
 POSICIONES_ORDEN = ["UTG", "UTG+1", "MP", "LJ", "HJ", "CO", "BTN", "SB", "BB"]
 
+ETIQUETAS_AGRESIVIDAD = ["Muy baja", "Baja", "Media", "Alta", "Muy alta"]
+ETIQUETAS_RIESGO = ["Muy bajo", "Bajo", "Medio", "Alto", "Muy alto"]
+
+# Columnas que usa cada métrica (con los nombres alternativos del CSV antiguo)
+COLUMNAS_METRICA = {
+    "estadisticas": ["resultado_usuario", "bote_final", "ganancia_usuario",
+                     "puntos_estrategia.agresividad", "puntos_estrategia.riesgo"],
+    "winrate_posicion": ["resultado_usuario", "posicion_usuario"],
+    "histograma_botes": ["bote_final"],
+    "agresividad_profit": ["resultado_usuario", "puntos_estrategia.agresividad", "agresividad"],
+    "frecuencia_categorias": ["categoria_mano_usuario", "categoria_mano"],
+    "riesgo_winrate": ["resultado_usuario", "puntos_estrategia.riesgo", "riesgo"],
+    "bote_agresividad": ["bote_final", "puntos_estrategia.agresividad", "agresividad"],
+    "timeline_profit": ["mano_id", "ganancia_usuario", "bote_final", "resultado_usuario"],
+    "equity_realizacion": ["resultado_usuario", "ganancia_usuario", *COLUMNAS_EQUITY],
+}
+METRICAS = list(COLUMNAS_METRICA)
+
+# Puntos por defecto de la curva de profit acumulado (el gráfico no muestra más)
+PUNTOS_TIMELINE = 2000
+PUNTOS_MINIMOS = 8
+
+# Tramos de equity (de 10 puntos) del gráfico de realización
+TRAMOS_EQUITY = 10
+ETIQUETAS_EQUITY = [f"{i * 10}-{(i + 1) * 10}%" for i in range(TRAMOS_EQUITY)]
+
 
 # =====================================================
-# 1. ESTADÍSTICAS GENERALES
+# COLUMNAS DERIVADAS (UNA VEZ POR AGREGACIÓN)
 # =====================================================
-def estadisticas_generales():
-    df = cargar_dataset()
+def _columna(df, *nombres):
+    for nombre in nombres:
+        if nombre in df:
+            return df[nombre]
+    raise KeyError(nombres[0])
 
-    if df.empty:
-        return {
-            "total_manos": 0,
-            "ganadas": 0,
-            "perdidas": 0,
-            "tasa_victoria": 0.0,
-            "bote_promedio": 0.0,
-            "agresividad_media": 0.0,
-            "riesgo_medio": 0.0,
-            "total_ganado": 0,
-            "total_perdido": 0,
-            "profit_neto": 0,
-            "promedio_ganado": 0,
-            "promedio_perdido": 0
-        }
-
-    total_manos = len(df)
-    total_ganadas = (df["resultado_usuario"] == "gano").sum()
-    total_perdidas = (df["resultado_usuario"] == "perdio").sum()
-
-    tasa_victoria = round(total_ganadas / total_manos * 100, 2)
-
-    bote_promedio = round(df["bote_final"].mean(), 2)
-
-    # COLUMNA CORRECTA DESDE JSON NORMALIZADO
-    agresividad_media = round(df["puntos_estrategia.agresividad"].mean(), 3)
-    riesgo_medio      = round(df["puntos_estrategia.riesgo"].mean(), 3)
-
-    ganancias = df["ganancia_usuario"]
-    total_ganado = ganancias[ganancias > 0].sum()
-    total_perdido = -ganancias[ganancias < 0].sum()
-    profit_neto = total_ganado - total_perdido
-
-    promedio_ganado = round(ganancias[ganancias > 0].mean(), 2) if (ganancias > 0).any() else 0
-    promedio_perdido = round((-ganancias[ganancias < 0]).mean(), 2) if (ganancias < 0).any() else 0
 
-    return {
-        "total_manos": int(total_manos),
-        "ganadas": int(total_ganadas),
-        "perdidas": int(total_perdidas),
-        "tasa_victoria": tasa_victoria,
-        "bote_promedio": bote_promedio,
-        "agresividad_media": agresividad_media,
-        "riesgo_medio": riesgo_medio,
-        "total_ganado": int(total_ganado),
-        "total_perdido": int(total_perdido),
-        "profit_neto": int(profit_neto),
-        "promedio_ganado": promedio_ganado,
-        "promedio_perdido": promedio_perdido
-    }
+def _tramos(valores):
+    """Tramo 0..4 de cada valor (5 intervalos iguales, como pd.cut); -1 si falta."""
+    codigos = pd.cut(valores, bins=5, labels=False)
+    return np.nan_to_num(np.asarray(codigos, dtype=float), nan=-1).astype(np.intp)
 
-def calcular_estadisticas_basicas():
-    return estadisticas_generales()
+
+def _posiciones(df):
+    posicion = df["posicion_usuario"]
+    # Convertir posiciones numéricas (CSV) a nombres (JSON)
+    if pd.api.types.is_numeric_dtype(posicion):
+        return np.array([POSICIONES_ORDEN[int(i)] if int(i) < len(POSICIONES_ORDEN) else "N/A" for i in posicion], dtype=object)
+    # Categórica sobre los códigos del almacén: se agrupa sin armar strings
+    return posicion
+
+
+def _ganancia(df, d):
+    if "ganancia_usuario" in df:
+        return df["ganancia_usuario"].to_numpy()
+    return np.where(d("gano"), d("bote"), -d("bote"))
+
+
+DERIVADAS = {
+    "gano": lambda df, d: (df["resultado_usuario"] == "gano").to_numpy(),
+    "perdio": lambda df, d: (df["resultado_usuario"] == "perdio").to_numpy(),
+    "bote": lambda df, d: df["bote_final"].to_numpy(),
+    "ganancia": _ganancia,
+    "agresividad": lambda df, d: _columna(df, "puntos_estrategia.agresividad", "agresividad").to_numpy(dtype=float),
+    "riesgo": lambda df, d: _columna(df, "puntos_estrategia.riesgo", "riesgo").to_numpy(dtype=float),
+    "tramo_agresividad": lambda df, d: _tramos(d("agresividad")),
+    "tramo_riesgo": lambda df, d: _tramos(d("riesgo")),
+    "posicion": lambda df, d: _posiciones(df),
+    "categoria": lambda df, d: _columna(df, "categoria_mano_usuario", "categoria_mano"),
+    "orden_mano": lambda df, d: np.argsort(df["mano_id"].to_numpy(), kind="stable"),
+}
+
+
+def _media_por_grupo(valores, grupos, num_grupos):
+    """Media de `valores` en cada grupo 0..num_grupos-1 (None si está vacío)."""
+    validos = grupos >= 0
+    cuenta = np.bincount(grupos[validos], minlength=num_grupos)
+    suma = np.bincount(grupos[validos], weights=valores[validos], minlength=num_grupos)
+    return [s / c if c else None for s, c in zip(suma.tolist(), cuenta.tolist())], cuenta.tolist()
+
+
+def _redondear(x, decimales):
+    return round(x, decimales) if x is not None else None
 
 
 # =====================================================
-# 2. WINRATE POR POSICIÓN
+# MÉTRICAS
 # =====================================================
-def winrate_por_posicion():
-    df = cargar_dataset()
-    if df.empty:
-        return []
+def _estadisticas(d):
+    total_manos = len(d("gano"))
+    total_ganadas = int(d("gano").sum())
+    total_perdidas = int(d("perdio").sum())
 
-    df["victoria"] = (df["resultado_usuario"] == "gano").astype(int)
+    ganancias = d("ganancia")
+    positivas = ganancias[ganancias > 0]
+    negativas = -ganancias[ganancias < 0]
+    total_ganado = int(positivas.sum())
+    total_perdido = int(negativas.sum())
 
-    # Convertir posiciones numéricas (CSV) a nombres (JSON)
-    if pd.api.types.is_numeric_dtype(df["posicion_usuario"]):
-        df["posicion_nombre"] = df["posicion_usuario"].apply(
-            lambda i: POSICIONES_ORDEN[int(i)] if int(i) < len(POSICIONES_ORDEN) else "N/A"
-        )
-    else:
-        df["posicion_nombre"] = df["posicion_usuario"]
+    return {
+        "total_manos": total_manos,
+        "ganadas": total_ganadas,
+        "perdidas": total_perdidas,
+        "tasa_victoria": round(total_ganadas / total_manos * 100, 2),
+        "bote_promedio": round(float(d("bote").mean()), 2),
+        "agresividad_media": round(float(d("agresividad").mean()), 3),
+        "riesgo_medio": round(float(d("riesgo").mean()), 3),
+        "total_ganado": total_ganado,
+        "total_perdido": total_perdido,
+        "profit_neto": total_ganado - total_perdido,
+        "promedio_ganado": round(float(positivas.mean()), 2) if positivas.size else 0,
+        "promedio_perdido": round(float(negativas.mean()), 2) if negativas.size else 0,
+    }
 
-    tabla = (
-        df.groupby("posicion_nombre")["victoria"]
-        .agg(["mean", "count"])
-        .reset_index()
-    )
+
+def _winrate_posicion(d):
+    codigos, nombres = pd.factorize(d("posicion"))
+    medias, cuentas = _media_por_grupo(d("gano").astype(float), codigos, len(nombres))
 
     # Orden lógico
-    tabla["orden"] = tabla["posicion_nombre"].apply(lambda x: POSICIONES_ORDEN.index(x) if x in POSICIONES_ORDEN else 99)
-    tabla = tabla.sort_values("orden")
+    filas = sorted(
+        zip(nombres, medias, cuentas),
+        key=lambda f: (POSICIONES_ORDEN.index(f[0]) if f[0] in POSICIONES_ORDEN else 99, f[0]),
+    )
+    return [
+        {"posicion": nombre, "winrate": round(media * 100, 2), "hands": cuenta}
+        for nombre, media, cuenta in filas
+    ]
 
+
+def _histograma_botes(d):
+    counts, bins = np.histogram(d("bote"), bins=10)
+    return {"bins": bins, "counts": counts}
+
+
+def _winrate_por_tramo(d, tramo, etiquetas):
+    medias, _ = _media_por_grupo(d("gano").astype(float), d(tramo), len(etiquetas))
     return [
-        {
-            "posicion": row["posicion_nombre"],
-            "winrate": round(row["mean"] * 100, 2),
-            "hands": int(row["count"]),
-        }
-        for _, row in tabla.iterrows()
+        {"label": label, "winrate_promedio": _redondear(m * 100 if m is not None else None, 2)}
+        for label, m in zip(etiquetas, medias)
     ]
 
 
-# =====================================================
-# 3. HISTOGRAMA DE BOTES
-# =====================================================
-def histograma_botes():
-    df = cargar_dataset()
-    if df.empty:
-        return {"bins": [], "counts": []}
+def _frecuencia_categorias(d):
+    codigos, nombres = pd.factorize(d("categoria"))
+    cuentas = np.bincount(codigos[codigos >= 0], minlength=len(nombres))
+    return [{"categoria": c, "cantidad": int(n)} for c, n in zip(nombres, cuentas.tolist())]
+
+
+def _bote_agresividad(d):
+    medias, _ = _media_por_grupo(d("bote").astype(float), d("tramo_agresividad"), len(ETIQUETAS_AGRESIVIDAD))
+    return [
+        {"label": label, "bote_promedio": _redondear(m, 2)}
+        for label, m in zip(ETIQUETAS_AGRESIVIDAD, medias)
+    ]
+
+
+def _resumen_equity(equity, gano, ganancia):
+    """Equity media y winrate (%), realización (winrate / equity) y profit medio."""
+    if not len(equity):
+        return {"manos": 0, "equity_media": None, "winrate": None, "realizacion": None, "profit_medio": None}
+    media, winrate = float(equity.mean()), float(gano.mean())
+    return {
+        "manos": int(len(equity)),
+        "equity_media": round(media * 100, 2),
+        "winrate": round(winrate * 100, 2),
+        "realizacion": round(winrate / media, 3) if media else None,
+        "profit_medio": round(float(ganancia.mean()), 2),
+    }
 
-    counts, bins = np.histogram(df["bote_final"], bins=10)
-    return {"bins": bins.tolist(), "counts": counts.tolist()}
+
+def _equity_realizacion(d, df):
+    # Solo las calles ya calculadas (utils.equity_dataset); NaN = mano sin calcular o calle no vista
+    calles = [c for c in COLUMNAS_EQUITY if c in df]
+    sin_calcular = int(df[calles[0]].isna().sum()) if calles else len(df)
+    gano, ganancia = d("gano"), d("ganancia")
+
+    resultado = []
+    for columna in calles:
+        equity = df[columna].to_numpy(dtype=float)
+        validas = ~np.isnan(equity)
+        e, g, p = equity[validas], gano[validas], ganancia[validas]
+        tramo = np.minimum((e * TRAMOS_EQUITY).astype(np.intp), TRAMOS_EQUITY - 1)
+        resultado.append({
+            "calle": columna.split(".", 1)[1],
+            **_resumen_equity(e, g, p),
+            "tramos": [
+                {"label": label, **_resumen_equity(e[tramo == i], g[tramo == i], p[tramo == i])}
+                for i, label in enumerate(ETIQUETAS_EQUITY)
+            ],
+        })
+    return {"calles": resultado, "manos_sin_equity": sin_calcular}
+
+
+def _timeline_profit(d, df):
+    return _submuestrear(_serie_de(df, d), PUNTOS_TIMELINE)
+
+
+CALCULOS = {
+    "estadisticas": lambda d, df: _estadisticas(d),
+    "winrate_posicion": lambda d, df: _winrate_posicion(d),
+    "histograma_botes": lambda d, df: _histograma_botes(d),
+    "agresividad_profit": lambda d, df: _winrate_por_tramo(d, "tramo_agresividad", ETIQUETAS_AGRESIVIDAD),
+    "frecuencia_categorias": lambda d, df: _frecuencia_categorias(d),
+    "riesgo_winrate": lambda d, df: _winrate_por_tramo(d, "tramo_riesgo", ETIQUETAS_RIESGO),
+    "bote_agresividad": lambda d, df: _bote_agresividad(d),
+    "timeline_profit": _timeline_profit,
+    "equity_realizacion": _equity_realizacion,
+}
+
+VACIOS = {
+    "estadisticas": lambda: {
+        "total_manos": 0,
+        "ganadas": 0,
+        "perdidas": 0,
+        "tasa_victoria": 0.0,
+        "bote_promedio": 0.0,
+        "agresividad_media": 0.0,
+        "riesgo_medio": 0.0,
+        "total_ganado": 0,
+        "total_perdido": 0,
+        "profit_neto": 0,
+        "promedio_ganado": 0,
+        "promedio_perdido": 0
+    },
+    "winrate_posicion": list,
+    "histograma_botes": lambda: {"bins": [], "counts": []},
+    "agresividad_profit": list,
+    "frecuencia_categorias": list,
+    "riesgo_winrate": list,
+    "bote_agresividad": list,
+    "timeline_profit": lambda: {"mano_id": [], "profit_acumulado": []},
+    "equity_realizacion": lambda: {"calles": [], "manos_sin_equity": 0},
+}
 
 
 # =====================================================
-# 4. AGRESIVIDAD VS WINRATE
+# MOTOR DE AGREGACIÓN
 # =====================================================
-def agresividad_profit():
-    df = cargar_dataset()
+def agregar(df, metricas=METRICAS):
+    """
+    Calcula las métricas pedidas sobre `df` (compartido, no se modifica).
+    Cada columna derivada se calcula a lo sumo una vez y la usan todas las
+    métricas que la necesiten.
+    """
     if df.empty:
-        return []
+        return {m: VACIOS[m]() for m in metricas}
 
-    col_aggr = "puntos_estrategia.agresividad" if "puntos_estrategia.agresividad" in df else "agresividad"
+    d = _derivadas(df)
+    return {m: CALCULOS[m](d, df) for m in metricas}
 
-    df["victoria"] = (df["resultado_usuario"] == "gano").astype(int)
-    df["agresividad_rango"] = pd.cut(
-        df[col_aggr],
-        bins=5,
-        labels=["Muy baja", "Baja", "Media", "Alta", "Muy alta"]
-    )
 
-    resultados = []
-    for label, serie in df.groupby("agresividad_rango")["victoria"]:
-        resultados.append({
-            "label": str(label),
-            "winrate_promedio": round(serie.mean() * 100, 2)
-        })
+def _derivadas(df):
+    """Acceso memoizado a las columnas derivadas de `df`."""
+    memo = {}
+
+    def d(nombre):
+        if nombre not in memo:
+            memo[nombre] = DERIVADAS[nombre](df, d)
+        return memo[nombre]
+
+    return d
+
+
+def _dataset(columnas, filtros=None):
+    """Dataset compartido, o solo las filas que cumplen los filtros (vía índices)."""
+    df = cargar_dataset(columnas)
+    filas = filas_filtradas(filtros)
+    if filas is None:
+        return df
+    return df.take(filas).reset_index(drop=True)
+
 
-    return resultados
+def _metrica(nombre, filtros=None):
+    return agregar(_dataset(COLUMNAS_METRICA[nombre], filtros), [nombre])[nombre]
+
+
+@cronometrado("stats.dashboard")
+def dashboard(filtros=None):
+    """Todas las métricas del dashboard en una sola pasada sobre el dataset."""
+    # Sin filtros, la curva de profit sale de la serie ya cacheada
+    filtros = normalizar_filtros(filtros)
+    metricas = METRICAS if filtros else [m for m in METRICAS if m != "timeline_profit"]
+    columnas = list(dict.fromkeys(c for m in metricas for c in COLUMNAS_METRICA[m]))
+    resultado = agregar(_dataset(columnas, filtros), metricas)
+    if "timeline_profit" not in resultado:
+        resultado["timeline_profit"] = timeline_profit()
+    return resultado
 
 
 # =====================================================
-# 5. FRECUENCIA POR CATEGORÍA
+# 1. ESTADÍSTICAS GENERALES
 # =====================================================
-def frecuencia_categorias():
-    df = cargar_dataset()
-    if df.empty:
-        return []
-
-    col = "categoria_mano_usuario" if "categoria_mano_usuario" in df else "categoria_mano"
-    conteo = Counter(df[col])
+@cronometrado("stats.estadisticas_generales")
+def estadisticas_generales(filtros=None):
+    return _metrica("estadisticas", filtros)
 
-    return [{"categoria": c, "cantidad": int(n)} for c, n in conteo.items()]
+def calcular_estadisticas_basicas(filtros=None):
+    return estadisticas_generales(filtros)
 
 
 # =====================================================
-# 6. RIESGO VS WINRATE
+# 2. WINRATE POR POSICIÓN
 # =====================================================
-def riesgo_winrate():
-    df = cargar_dataset()
-    if df.empty:
-        return []
+@cronometrado("stats.winrate_por_posicion")
+def winrate_por_posicion(filtros=None):
+    return _metrica("winrate_posicion", filtros)
 
-    col_risk = "puntos_estrategia.riesgo" if "puntos_estrategia.riesgo" in df else "riesgo"
 
-    df["victoria"] = (df["resultado_usuario"] == "gano").astype(int)
-    df["riesgo_rango"] = pd.cut(
-        df[col_risk],
-        bins=5,
-        labels=["Muy bajo", "Bajo", "Medio", "Alto", "Muy alto"]
-    )
+# =====================================================
+# 3. HISTOGRAMA DE BOTES
+# =====================================================
+@cronometrado("stats.histograma_botes")
+def histograma_botes(filtros=None):
+    return _metrica("histograma_botes", filtros)
 
-    resultados = []
-    for label, serie in df.groupby("riesgo_rango")["victoria"]:
-        resultados.append({
-            "label": str(label),
-            "winrate_promedio": round(serie.mean() * 100, 2)
-        })
 
-    return resultados
+# =====================================================
+# 4. AGRESIVIDAD VS WINRATE
+# =====================================================
+@cronometrado("stats.agresividad_profit")
+def agresividad_profit(filtros=None):
+    return _metrica("agresividad_profit", filtros)
 
 
 # =====================================================
-# 7. BOTE VS AGRESIVIDAD
+# 5. FRECUENCIA POR CATEGORÍA
 # =====================================================
-def bote_agresividad():
-    df = cargar_dataset()
-    if df.empty:
-        return []
+@cronometrado("stats.frecuencia_categorias")
+def frecuencia_categorias(filtros=None):
+    return _metrica("frecuencia_categorias", filtros)
 
-    col_aggr = "puntos_estrategia.agresividad" if "puntos_estrategia.agresividad" in df else "agresividad"
 
-    df["agresividad_rango"] = pd.cut(
-        df[col_aggr],
-        bins=5,
-        labels=["Muy baja", "Baja", "Media", "Alta", "Muy alta"]
-    )
+# =====================================================
+# 6. RIESGO VS WINRATE
+# =====================================================
+@cronometrado("stats.riesgo_winrate")
+def riesgo_winrate(filtros=None):
+    return _metrica("riesgo_winrate", filtros)
 
-    return [
-        {
-            "label": str(label),
-            "bote_promedio": round(serie.mean(), 2)
-        }
-        for label, serie in df.groupby("agresividad_rango")["bote_final"]
-    ]
+
+# =====================================================
+# 7. BOTE VS AGRESIVIDAD
+# =====================================================
+@cronometrado("stats.bote_agresividad")
+def bote_agresividad(filtros=None):
+    return _metrica("bote_agresividad", filtros)
 
 
 # =====================================================
 # 8. PROFIT ACUMULADO
 # =====================================================
-def timeline_profit():
-    df = cargar_dataset()
-    if df.empty:
-        return {"mano_id": [], "profit_acumulado": []}
-
-    if "ganancia_usuario" in df:
-        df["profit"] = df["ganancia_usuario"]
+# La curva se sirve submuestreada: en cada tramo se conservan la mano de
+# mínimo y la de máximo profit, así los picos y caídas no desaparecen. Para
+# no recorrer la serie en cada zoom se precalcula una pirámide: en el nivel k
+# cada bloque de 2^k manos guarda el índice de su mínimo y de su máximo.
+
+_serie = {"firma": None, "serie": None}
+_lock_serie = threading.Lock()
+
+
+def _serie_profit(mano_ids, ganancias):
+    """Serie ordenada por mano_id con su suma acumulada y la pirámide de mín/máx."""
+    acumulado = np.cumsum(ganancias, dtype=np.int64)
+    indices = np.arange(len(acumulado), dtype=np.int32)
+    niveles = [(indices, indices)]
+    while len(niveles[-1][0]) > 1:
+        minimos, maximos = niveles[-1]
+        niveles.append((
+            _elegir_pares(minimos, acumulado, np.less_equal),
+            _elegir_pares(maximos, acumulado, np.greater_equal),
+        ))
+    return {"mano_id": np.asarray(mano_ids), "acumulado": acumulado, "niveles": niveles}
+
+
+def _elegir_pares(indices, acumulado, mejor):
+    """Une bloques de a dos quedándose con el índice cuyo valor gana según `mejor`."""
+    if len(indices) % 2:
+        indices = np.append(indices, indices[-1])
+    a, b = indices[0::2], indices[1::2]
+    return np.where(mejor(acumulado[a], acumulado[b]), a, b)
+
+
+def _extremos_rango(serie, inicio, fin):
+    """Índices del mínimo y del máximo en [inicio, fin), con O(log n) bloques."""
+    niveles, acumulado = serie["niveles"], serie["acumulado"]
+    candidatos = []
+    while inicio < fin:
+        # El bloque más grande que empieza en `inicio` y no se pasa de `fin`
+        k = (inicio & -inicio).bit_length() - 1 if inicio else len(niveles) - 1
+        while (1 << k) > fin - inicio:
+            k -= 1
+        candidatos += [niveles[k][0][inicio >> k], niveles[k][1][inicio >> k]]
+        inicio += 1 << k
+    candidatos = np.array(candidatos)
+    valores = acumulado[candidatos]
+    return [candidatos[np.argmin(valores)], candidatos[np.argmax(valores)]]
+
+
+def _submuestrear(serie, puntos, desde=None, hasta=None):
+    """
+    Curva entre las manos `desde` y `hasta` (inclusive) con a lo sumo unos
+    `puntos` puntos; sin presupuesto (None) se devuelve entera. El costo es
+    proporcional a los puntos devueltos, no al tamaño de la serie.
+    """
+    mano_ids = serie["mano_id"]
+    inicio = int(np.searchsorted(mano_ids, desde, "left")) if desde is not None else 0
+    fin = int(np.searchsorted(mano_ids, hasta, "right")) if hasta is not None else len(mano_ids)
+    fin = max(fin, inicio)
+    total = fin - inicio
+
+    if puntos is None or total <= puntos:
+        indices = np.arange(inicio, fin)
     else:
-        df["profit"] = df.apply(lambda r: r["bote_final"] if r["resultado_usuario"] == "gano" else -r["bote_final"], axis=1)
-
-    df = df.sort_values("mano_id")
-    df["profit_acumulado"] = df["profit"].cumsum()
+        # Tramos de 2^k manos alineados, con dos puntos (mín y máx) cada uno,
+        # más los extremos del rango y los tramos incompletos de los bordes
+        tramos = max((puntos - 6) // 2, 1)
+        k = max(int(np.ceil(np.log2(total / tramos))), 0)
+        primero = -(-inicio >> k)
+        ultimo = fin >> k
+        minimos, maximos = serie["niveles"][k]
+        partes = [[inicio, fin - 1], minimos[primero:ultimo], maximos[primero:ultimo]]
+        if inicio < primero << k:
+            partes.append(_extremos_rango(serie, inicio, min(primero << k, fin)))
+        if ultimo >= primero and ultimo << k < fin:
+            partes.append(_extremos_rango(serie, max(ultimo << k, inicio), fin))
+        indices = np.unique(np.concatenate([np.asarray(p, dtype=np.int64) for p in partes]))
 
     return {
-        "mano_id": df["mano_id"].tolist(),
-        "profit_acumulado": df["profit_acumulado"].tolist(),
+        # Arrays de NumPy: la capa de serialización los codifica sin pasar por listas
+        "mano_id": mano_ids[indices],
+        "profit_acumulado": serie["acumulado"][indices],
+        "total_manos": total,
+        "submuestreado": len(indices) < total,
     }
+
+
+def _serie_de(df, d=None):
+    if df.empty:
+        return _serie_profit(np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+    d = d or _derivadas(df)
+    orden = d("orden_mano")
+    return _serie_profit(df["mano_id"].to_numpy()[orden], d("ganancia")[orden])
+
+
+def _serie_vigente():
+    # Una serie por versión del dataset; se reconstruye cuando cambia la firma
+    firma = firma_dataset()
+    with _lock_serie:
+        if _serie["serie"] is None or _serie["firma"] != firma:
+            _serie.update(firma=firma, serie=_serie_de(cargar_dataset(COLUMNAS_METRICA["timeline_profit"])))
+        return _serie["serie"]
+
+
+@cronometrado("stats.timeline_profit")
+def timeline_profit(puntos=PUNTOS_TIMELINE, desde=None, hasta=None, filtros=None):
+    """
+    Profit acumulado por mano_id, submuestreado a `puntos` (None = todos) y
+    opcionalmente acotado al rango de manos [desde, hasta]. Con filtros la
+    serie se arma solo con las manos que los cumplen.
+    """
+    if puntos is not None and int(puntos) < PUNTOS_MINIMOS:
+        raise ValueError(f"puntos debe ser al menos {PUNTOS_MINIMOS}")
+    puntos = None if puntos is None else int(puntos)
+
+    if normalizar_filtros(filtros) is None:
+        serie = _serie_vigente()
+    else:
+        serie = _serie_de(_dataset(COLUMNAS_METRICA["timeline_profit"], filtros))
+    return _submuestrear(serie, puntos, desde, hasta)
+
+
+# =====================================================
+# 9. REALIZACIÓN DE EQUITY VS PROFIT
+# =====================================================
+@cronometrado("stats.equity_realizacion")
+def equity_realizacion(filtros=None):
+    """
+    Por calle y por tramo de equity: equity media, winrate real, realización
+    (winrate / equity) y profit medio. Lee la equity precalculada con
+    `python -m utils.equity_dataset`; las manos sin ella no cuentan.
+    """
+    return _metrica("equity_realizacion", filtros)
@@ -0,0 +1,185 @@
+"""
+Cola de trabajos en segundo plano para generar el dataset.
+
+/api/generar encola y responde al instante con el id del trabajo; el
+progreso y la cancelación se consultan aparte. Cada generación corre en un
+hilo del pool local del worker que la recibió; las escrituras del dataset
+van de a una también entre procesos y se publican de forma atómica al
+terminar (ver dataset.escribir_dataset).
+
+El estado de cada trabajo y su pedido de cancelación se guardan en
+data/estado/trabajos (ver utils.compartido), así que cualquier worker de
+gunicorn puede consultarlo o cancelarlo.
+"""
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from . import compartido
+from .generator import GeneracionCancelada, generar_dataset
+
+# Generaciones simultáneas por worker (cada una ya reparte su trabajo en procesos)
+TRABAJOS_SIMULTANEOS = int(os.environ.get("TRABAJOS_SIMULTANEOS", 1))
+
+# Tope de manos por generación (acota disco, memoria y tiempo de un trabajo)
+MAX_MANOS = int(os.environ.get("GENERAR_MAX_MANOS", 5_000_000))
+
+# Trabajos terminados que se recuerdan para consultar su estado
+MAX_TERMINADOS = 100
+
+ESTADOS_FINALES = ("terminado", "cancelado", "error")
+
+RE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+_pool = None
+
+
+def _pool_trabajos():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=TRABAJOS_SIMULTANEOS, thread_name_prefix="trabajo")
+    return _pool
+
+
+def _carpeta():
+    return compartido.directorio("trabajos")
+
+
+def _ruta(trabajo_id):
+    return _carpeta() / f"{trabajo_id}.json"
+
+
+def _marca(trabajo_id):
+    return compartido.Marca(_carpeta() / f"{trabajo_id}.cancelar")
+
+
+def _publico(trabajo):
+    # Un trabajo sin terminar cuyo proceso ya no existe no va a terminar nunca
+    if trabajo["estado"] not in ESTADOS_FINALES and not compartido.proceso_vivo(trabajo["_pid"]):
+        trabajo = {**trabajo, "estado": "error", "error": "El proceso que ejecutaba el trabajo terminó"}
+    return {k: v for k, v in trabajo.items() if not k.startswith("_")}
+
+
+def _leer(trabajo_id):
+    if not isinstance(trabajo_id, str) or not RE_ID.match(trabajo_id):
+        return None
+    return compartido.leer(_ruta(trabajo_id))
+
+
+def _actualizar(trabajo_id, **cambios):
+    with compartido.bloqueo(_carpeta()):
+        trabajo = _leer(trabajo_id)
+        if trabajo is not None:
+            trabajo.update(cambios)
+            compartido.guardar(_ruta(trabajo_id), trabajo)
+        return trabajo
+
+
+def _todos():
+    trabajos = (compartido.leer(ruta) for ruta in _carpeta().glob("*.json"))
+    return [t for t in trabajos if t is not None]
+
+
+def _podar():
+    # Con el bloqueo de la carpeta tomado
+    terminados = sorted(
+        (t for t in _todos() if t["estado"] in ESTADOS_FINALES),
+        key=lambda t: t["terminado"],
+    )
+    for t in terminados[:max(len(terminados) - MAX_TERMINADOS, 0)]:
+        compartido.borrar(_ruta(t["id"]), _marca(t["id"]).ruta)
+
+
+# ======================================================
+# EJECUCIÓN
+# ======================================================
+def _ejecutar(trabajo_id, num_manos, seed):
+    with compartido.bloqueo(_carpeta()):
+        trabajo = _leer(trabajo_id)
+        if trabajo is None or trabajo["estado"] != "en_cola":
+            return
+        trabajo.update(estado="en_curso", iniciado=time.time())
+        compartido.guardar(_ruta(trabajo_id), trabajo)
+
+    def progreso(hechas, total):
+        _actualizar(trabajo_id, manos_hechas=hechas, progreso=round(hechas / total, 4))
+
+    try:
+        resultado = generar_dataset(num_manos=num_manos, seed=seed, progreso=progreso, cancelado=_marca(trabajo_id))
+        final = {"estado": "terminado", "resultado": resultado}
+    except GeneracionCancelada:
+        final = {"estado": "cancelado"}
+    except Exception as e:
+        final = {"estado": "error", "error": str(e)}
+
+    with compartido.bloqueo(_carpeta()):
+        trabajo = _leer(trabajo_id)
+        if trabajo is not None:
+            trabajo.update(final, terminado=time.time())
+            compartido.guardar(_ruta(trabajo_id), trabajo)
+        compartido.borrar(_marca(trabajo_id).ruta)
+        _podar()
+
+
+# ======================================================
+# API
+# ======================================================
+def encolar_generacion(num_manos=5000, seed=None):
+    """Encola una generación y devuelve su estado inicial (con el id)."""
+    num_manos = int(num_manos)
+    if not 1 <= num_manos <= MAX_MANOS:
+        raise ValueError(f"num_manos debe estar entre 1 y {MAX_MANOS}")
+    if seed is not None:
+        seed = int(seed)
+        if seed < 0:
+            raise ValueError("seed debe ser un entero no negativo")
+
+    trabajo_id = uuid.uuid4().hex
+    trabajo = {
+        "id": trabajo_id,
+        "tipo": "generar",
+        "estado": "en_cola",
+        "num_manos": num_manos,
+        "seed": seed,
+        "manos_hechas": 0,
+        "progreso": 0.0,
+        "creado": time.time(),
+        "iniciado": None,
+        "terminado": None,
+        "resultado": None,
+        "error": None,
+        "_pid": os.getpid(),
+    }
+    with compartido.bloqueo(_carpeta()):
+        compartido.guardar(_ruta(trabajo_id), trabajo)
+    _pool_trabajos().submit(_ejecutar, trabajo_id, num_manos, seed)
+    return _publico(trabajo)
+
+
+def estado_trabajo(trabajo_id):
+    trabajo = _leer(trabajo_id)
+    return _publico(trabajo) if trabajo is not None else None
+
+
+def listar_trabajos():
+    return [_publico(t) for t in sorted(_todos(), key=lambda t: t["creado"])]
+
+
+def cancelar_trabajo(trabajo_id):
+    """
+    Cancela un trabajo en cola (no llega a correr) o en curso (se detiene en
+    el próximo bloque y el dataset anterior queda intacto), desde cualquier
+    worker. None si no existe; si no, su estado.
+    """
+    with compartido.bloqueo(_carpeta()):
+        trabajo = _leer(trabajo_id)
+        if trabajo is None:
+            return None
+        if trabajo["estado"] == "en_cola":
+            trabajo.update(estado="cancelado", terminado=time.time())
+            compartido.guardar(_ruta(trabajo_id), trabajo)
+        elif trabajo["estado"] == "en_curso":
+            _marca(trabajo_id).set()
+        return _publico(trabajo)
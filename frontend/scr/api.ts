@@ -10,18 +10,58 @@ async function fetchJSON(url: string, options: any = {}) {
     return res.json();
 }
 
+/* ============================================================
+   DASHBOARD: UNA SOLA PETICIÓN PARA ESTADÍSTICAS Y GRÁFICOS
+============================================================ */
+let dashboardPendiente: Promise<any> | null = null;
+
+export function obtenerDashboard(refrescar = false) {
+    if (refrescar || !dashboardPendiente) {
+        dashboardPendiente = fetchJSON(`${BASE_URL}/dashboard`);
+        // si falla, el próximo llamado vuelve a intentar
+        dashboardPendiente.catch(() => { dashboardPendiente = null; });
+    }
+    return dashboardPendiente;
+}
+
 /* ============================================================
    ESTADÍSTICAS GENERALES
 ============================================================ */
 export async function obtenerEstadisticas() {
-    return fetchJSON(`${BASE_URL}/estadisticas`);
+    return (await obtenerDashboard()).estadisticas;
+}
+
+/* ============================================================
+   GENERACIÓN (TRABAJO EN SEGUNDO PLANO)
+============================================================ */
+export async function obtenerTrabajo(id: string) {
+    return fetchJSON(`${BASE_URL}/trabajos/${id}`);
+}
+
+export async function cancelarTrabajo(id: string) {
+    return fetchJSON(`${BASE_URL}/trabajos/${id}/cancelar`, { method: "POST" });
 }
 
-export async function generarDataset() {
-    return fetchJSON(`${BASE_URL}/generar`, {
+// Encola la generación y espera a que termine consultando el progreso
+export async function generarDataset(
+    opciones: { num_manos?: number; seed?: number } = {},
+    alProgresar?: (trabajo: any) => void
+) {
+    const res = await fetchJSON(`${BASE_URL}/generar`, {
         method: "POST",
-        body: JSON.stringify({})
+        body: JSON.stringify(opciones)
     });
+
+    let trabajo = res.trabajo;
+    while (!["terminado", "cancelado", "error"].includes(trabajo.estado)) {
+        await new Promise(r => setTimeout(r, 500));
+        trabajo = await obtenerTrabajo(trabajo.id);
+        alProgresar?.(trabajo);
+    }
+    if (trabajo.estado === "error") throw new Error(trabajo.error);
+
+    dashboardPendiente = null;
+    return trabajo;
 }
 
 /* ============================================================
@@ -31,12 +71,24 @@ export async function analizarMano(payload: {
     cartas_usuario: string[];
     cartas_comunitarias?: string[];   // ahora OPCIONAL pero permitido
     posicion: string;
+    n?: number;       // simulaciones Monte Carlo por fase
+    seed?: number;    // semilla para resultados reproducibles
+    precision?: number;       // modo adaptativo: semiancho del IC 95%
+    tiempo_max_ms?: number;   // modo adaptativo: tiempo máximo por fase
+    rivales?: number;                             // 1..8 rivales
+    rangos?: string | (string | string[] | null)[];  // "top 15%", "AKs,QQ", uno por rival...
 }) {
     // aseguramos que nunca vaya undefined
     const fixedPayload = {
         cartas_usuario: payload.cartas_usuario,
         cartas_comunitarias: payload.cartas_comunitarias ?? [],
-        posicion: payload.posicion
+        posicion: payload.posicion,
+        n: payload.n,
+        seed: payload.seed,
+        precision: payload.precision,
+        tiempo_max_ms: payload.tiempo_max_ms,
+        rivales: payload.rivales,
+        rangos: payload.rangos
     };
 
     return fetchJSON(`${BASE_URL}/analizar`, {
@@ -45,12 +97,52 @@ export async function analizarMano(payload: {
     });
 }
 
+// Misma petición que analizarMano, pero por Server-Sent Events: alEvento
+// recibe cada estimación de equity ("equity") y cada fase terminada ("fase");
+// devuelve el resultado completo. Cancelar con `senal` corta la simulación.
+export async function analizarManoProgresivo(
+    payload: Parameters<typeof analizarMano>[0] & { etapas?: number[] },
+    alEvento: (tipo: string, datos: any) => void,
+    senal?: AbortSignal
+) {
+    const res = await fetch(`${BASE_URL}/analizar-fases/stream`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ ...payload, cartas_comunitarias: payload.cartas_comunitarias ?? [] }),
+        signal: senal
+    });
+    if (!res.ok || !res.body) throw new Error("Error en la solicitud: analizar-fases/stream");
+
+    const lector = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    let pendiente = "";
+    for (;;) {
+        const { value, done } = await lector.read();
+        if (done) throw new Error("El análisis terminó sin resultado");
+        pendiente += value;
+
+        // Eventos separados por línea en blanco; las líneas ":" son solo latidos
+        let fin;
+        while ((fin = pendiente.indexOf("\n\n")) >= 0) {
+            const bloque = pendiente.slice(0, fin);
+            pendiente = pendiente.slice(fin + 2);
+            const tipo = bloque.match(/^event: (.*)$/m)?.[1];
+            const datos = bloque.match(/^data: (.*)$/m)?.[1];
+            if (!tipo || datos === undefined) continue;
+
+            const evento = JSON.parse(datos);
+            if (tipo === "error") throw new Error(evento.error);
+            if (tipo === "resultado") return evento;
+            alEvento(tipo, evento);
+        }
+    }
+}
+
 /* ============================================================
    GRÁFICOS – FORMATO COMPATIBLE CON CHART.JS
 ============================================================ */
 
 export async function obtenerWinratePosicion() {
-    const data = await fetchJSON(`${BASE_URL}/charts/winrate-posicion`);
+    const data = (await obtenerDashboard()).winrate_posicion;
 
     return {
         tipo: "bar",
@@ -69,7 +161,7 @@ export async function obtenerWinratePosicion() {
 }
 
 export async function obtenerHistogramaBotes() {
-    const data = await fetchJSON(`${BASE_URL}/charts/histograma-botes`);
+    const data = (await obtenerDashboard()).histograma_botes;
 
     return {
         tipo: "bar",
@@ -88,7 +180,7 @@ export async function obtenerHistogramaBotes() {
 }
 
 export async function obtenerAgresividadProfit() {
-    const data = await fetchJSON(`${BASE_URL}/charts/agresividad-profit`);
+    const data = (await obtenerDashboard()).agresividad_profit;
 
     return {
         tipo: "bar",
@@ -107,7 +199,7 @@ export async function obtenerAgresividadProfit() {
 }
 
 export async function obtenerFrecuenciaCategorias() {
-    const data = await fetchJSON(`${BASE_URL}/charts/frecuencia-categorias`);
+    const data = (await obtenerDashboard()).frecuencia_categorias;
 
     return {
         tipo: "bar",
@@ -126,7 +218,7 @@ export async function obtenerFrecuenciaCategorias() {
 }
 
 export async function obtenerRiesgoWinrate() {
-    const data = await fetchJSON(`${BASE_URL}/charts/riesgo-winrate`);
+    const data = (await obtenerDashboard()).riesgo_winrate;
 
     return {
         tipo: "line",
@@ -145,7 +237,7 @@ export async function obtenerRiesgoWinrate() {
 }
 
 export async function obtenerBoteAgresividad() {
-    const data = await fetchJSON(`${BASE_URL}/charts/bote-agresividad`);
+    const data = (await obtenerDashboard()).bote_agresividad;
 
     return {
         tipo: "line",
@@ -164,7 +256,7 @@ export async function obtenerBoteAgresividad() {
 }
 
 export async function obtenerTimelineProfit() {
-    const data = await fetchJSON(`${BASE_URL}/charts/timeline-profit`);
+    const data = (await obtenerDashboard()).timeline_profit;
 
     return {
         tipo: "line",
@@ -181,3 +273,25 @@ export async function obtenerTimelineProfit() {
         }
     };
 }
+
+// Requiere la equity precalculada en el backend (python -m utils.equity_dataset)
+export async function obtenerEquityRealizacion() {
+    const data = (await obtenerDashboard()).equity_realizacion;
+    const colores = ["#3498db", "#1abc9c", "#f39c12", "#e74c3c"];
+    const calles = data.calles ?? [];
+
+    return {
+        tipo: "line",
+        chart: {
+            data: {
+                labels: calles.length ? calles[0].tramos.map((t: any) => t.label) : [],
+                datasets: calles.map((c: any, i: number) => ({
+                    label: `Profit medio (${c.calle}, realización ${c.realizacion ?? "-"})`,
+                    data: c.tramos.map((t: any) => t.profit_medio),
+                    borderColor: colores[i % colores.length]
+                }))
+            },
+            options: { responsive: true, spanGaps: true }
+        }
+    };
+}
@@ -3,14 +3,15 @@ declare const Chart: any;
 import {
     obtenerEstadisticas,
     generarDataset,
-    analizarMano,
+    analizarManoProgresivo,
     obtenerWinratePosicion,
     obtenerHistogramaBotes,
     obtenerAgresividadProfit,
     obtenerFrecuenciaCategorias,
     obtenerRiesgoWinrate,
     obtenerBoteAgresividad,
-    obtenerTimelineProfit
+    obtenerTimelineProfit,
+    obtenerEquityRealizacion
 } from "./api.js";
 
 let statsDiv: HTMLElement;
@@ -150,6 +151,7 @@ async function cargarGraficoSeleccionado() {
     else if (tipo === "frecuencia-categorias") data = await obtenerFrecuenciaCategorias();
     else if (tipo === "riesgo-winrate") data = await obtenerRiesgoWinrate();
     else if (tipo === "bote-agresividad") data = await obtenerBoteAgresividad();
+    else if (tipo === "equity-realizacion") data = await obtenerEquityRealizacion();
     else data = await obtenerTimelineProfit();
 
     renderDynamicChart(data.chart, data.tipo);
@@ -189,10 +191,16 @@ document.addEventListener("DOMContentLoaded", () => {
         const posicion =
             (document.getElementById("posicion") as HTMLSelectElement).value;
 
-        const result = await analizarMano({
-            cartas_usuario: [carta1, carta2],
-            posicion
-        });
+        // Cada fase se muestra con su equity provisional mientras se refina
+        document.getElementById("phases-panel")!.classList.remove("hidden");
+        const result = await analizarManoProgresivo(
+            { cartas_usuario: [carta1, carta2], posicion },
+            (tipo, datos) => {
+                if (tipo === "equity") {
+                    document.getElementById(`${datos.fase}-equity`)!.textContent = String(datos.equity);
+                }
+            }
+        );
 
         mostrarResultadosFase(result);
     });